@@ -91,28 +91,33 @@ with st.sidebar:
     st.title("CrowdLumen 🔊")
     st.markdown("### Audio Intelligence")
     
-    # Device Selector
-    devices = processor.get_devices()
-    
-    # Store selected device index in session state to persistent
-    if "device_index" not in st.session_state:
-        st.session_state.device_index = 0
+    # Device Selector (single-microphone mode; multi-zone setups come from ZONES)
+    if processor.zones:
+        st.caption(f"{len(processor.zone_names)} zones on devices "
+                   f"{', '.join(str(d) for d, _ in processor.devices)} (ZONES config)")
+        selected_idx = None
+    else:
+        devices = processor.get_devices()
         
-    device_options = {d.split(':')[0]: d for d in devices}
-    sorted_indices = sorted([int(k) for k in device_options.keys()])
-    
-    selected_idx = st.selectbox(
-        "Input Device", 
-        sorted_indices, 
-        format_func=lambda i: device_options[str(i)],
-        index=0 if 0 in sorted_indices else 0
-    )
+        # Store selected device index in session state to persistent
+        if "device_index" not in st.session_state:
+            st.session_state.device_index = 0
+            
+        device_options = {d.split(':')[0]: d for d in devices}
+        sorted_indices = sorted([int(k) for k in device_options.keys()])
+        
+        selected_idx = st.selectbox(
+            "Input Device", 
+            sorted_indices, 
+            format_func=lambda i: device_options[str(i)],
+            index=0 if 0 in sorted_indices else 0
+        )
     
     # Gain Control
     gain = st.slider("Mic Sensitivity (Gain)", 1.0, 50.0, 5.0, help="Increase if waveform is flat")
     
     # Update processor if changed
-    if selected_idx != st.session_state.device_index:
+    if selected_idx is not None and selected_idx != st.session_state.device_index:
         processor.stop()
         processor.start(device_index=selected_idx, input_gain=gain)
         st.session_state.device_index = selected_idx
@@ -124,8 +129,9 @@ with st.sidebar:
     
     # Debug
     with st.expander("System Health"):
-        st.write(f"Frames: {processor.frames_processed}")
-        st.write(f"Buffer: {len(processor.audio_buffer)}")
+        st.write(f"Frames: {processor.frames_processed} | Zones: {len(processor.zone_names)}")
+        st.write(f"Buffer: {processor.buffered_seconds():.1f} s")
+        st.write(f"Overflows: {processor.overflows} | Underruns: {processor.underruns}")
         st.write(f"Gain: {processor.input_gain}x")
         if st.button("RESTART ENGINE", type="primary"):
             processor.stop()
@@ -149,8 +155,12 @@ with metrics_col:
     db_metric = m2.empty()
     zc_metric = m3.empty()
     fx_metric = m4.empty()
+    spectrum_placeholder = st.empty()
 
-# Middle: Waveform
+# Zones (only shown with more than one microphone)
+zones_placeholder = st.empty()
+
+# Middle: Waveform (loudest zone)
 st.subheader("Live Audio Waveform")
 chart_placeholder = st.empty()
 
@@ -171,11 +181,14 @@ if st.button("Stop Monitoring"):
 
 while True:
     # 1. Get Data
-    wave, metrics = processor.get_data()
+    wave, metrics = processor.get_data(window=4096) # Last 0.1s approx, zero-copy view
     
     # 2. Update Status
     status = metrics["status"]
     reason = metrics["reason"]
+    if metrics["alarm_since"]:
+        # Alarms are held for ALARM_HOLD s, so show when this one fired
+        reason = f"{reason} · since {time.strftime('%H:%M:%S', time.localtime(metrics['alarm_since']))}"
     
     status_html = f"""
     <div>
@@ -191,15 +204,27 @@ while True:
     db_metric.metric("Intensity (dB)", f"{metrics['db']:.1f}")
     zc_metric.metric("Zero-Crossing", f"{metrics['zcr']:.3f}")
     fx_metric.metric("Spectral Flux", f"{metrics['flux']:.3f}")
+    bands = " · ".join(f"{name} {level:.0f} dB" for name, level in metrics["bands"].items())
+    where = ""
+    if len(metrics["zones"]) > 1:
+        where = f"Loudest zone: {metrics['loudest_zone']} · Reporting: {metrics['zone']} · "
+    spectrum_placeholder.caption(
+        f"{where}Onset {metrics['onset']:.1f} dB · Centroid {metrics['centroid']:.0f} Hz · "
+        f"Rolloff {metrics['rolloff']:.0f} Hz · {bands}")
+    
+    # Zone table: every microphone at a glance, loudest first
+    if len(metrics["zones"]) > 1:
+        zone_rows = sorted(metrics["zones"], key=lambda z: z["rms"], reverse=True)
+        zones_placeholder.dataframe(
+            pd.DataFrame([{"Zone": z["name"], "Status": z["status"], "dB": round(z["db"], 1),
+                           "RMS": round(z["rms"], 3), "Reason": z["reason"]} for z in zone_rows]),
+            hide_index=True, use_container_width=True)
     
     # 4. Update Waveform
     # Downsample for performance (N samples to ~500 points)
     if len(wave) > 0:
-        # Take last N samples to show "Live" window
-        display_wave = wave[-4096:] # Last 0.1s approx
-        
         # Simple decimation for plotting speed
-        decimated = display_wave[::8]
+        decimated = wave[::8]
         
         # Use Area Chart for 'tech' look
         chart_data = pd.DataFrame(decimated, columns=["Amplitude"])
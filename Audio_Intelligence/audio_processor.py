@@ -3,38 +3,178 @@ import numpy as np
 import threading
 import time
 # import librosa - Removed to prevent threading/performance crashes in callback
-from collections import deque
+from features import STFTEngine
 
 # --- CONFIGURATION ---
-CHUNK = 4096 # Larger chunk for better freq resolution
+CHUNK = 4096 # Analysis window: larger for better freq resolution
+HOP = 512 # Capture / decision step in low-latency mode (11.6 ms at 44.1 kHz)
+LOW_LATENCY = True # Decide every HOP over a sliding CHUNK window; False = one decision per CHUNK
 FORMAT = pyaudio.paInt16
-CHANNELS = 1
 RATE = 44100
-BUFFER_SECONDS = 5
-BUFFER_SECONDS = 5
-HISTORY_LEN = 100
-BUFFER_SECONDS = 5
-HISTORY_LEN = 100
+BUFFER_SECONDS = 5 # Processed audio history kept for the UI
 SMOOTHING_WINDOW = 3 # Reduced for faster response
+SMOOTHED_KEYS = ("rms", "db", "zcr", "flux")
+ONSET_THRESHOLD = 6.0 # Mean log-mel rise (dB) in one hop that counts as an impact
+RING_SECONDS = 2 # Raw capture headroom if analysis falls behind
+UNDERRUN_CHUNKS = 2 # Analysis waiting this many chunk durations for data counts as an underrun
+DC_ALPHA = 0.01 # Running DC estimate update per block (low-latency blocks are too short to average)
+RMS_CRITICAL = 0.5
+RMS_WARNING = 0.2
+ALARM_HOLD = 2.0 # Seconds a WARNING / CRITICAL (and its reason) stays up after its last hop,
+                 # so a one-hop alarm is still on screen at the dashboard's refresh rate
+# Microphone zones, analyzed together (one batched FFT per hop for all of them).
+# Each zone is one channel of one input device, e.g. an 8-channel interface plus a USB mic:
+#   [{"name": "Gate A", "device": 2, "channel": 0}, {"name": "Gate B", "device": 2, "channel": 1}, ...,
+#    {"name": "Stage", "device": 5, "channel": 0, "gain": 2.0}]
+# Empty = a single zone on the device selected in the dashboard.
+ZONES = []
+STATUS_LEVELS = ("NORMAL", "WARNING", "CRITICAL")
+REASONS = ("Environment stable", "Elevated volume detected", "High intensity event (Explosion/Scream)",
+           "High-frequency panic noise", "Sudden transient impact")
+
+
+class RawRing:
+    """
+    Single-producer / single-consumer ring of raw int16 samples.
+
+    The PortAudio callback is the only writer and the analysis worker the only
+    reader. Each side advances its own counter after copying, so no lock is
+    taken on the real-time path. A block that does not fit is dropped and
+    counted as an overflow instead of overwriting unread audio.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.written = 0    # Total samples written (producer only)
+        self.consumed = 0   # Total samples read (consumer only)
+        self.overflows = 0
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity - (self.written - self.consumed):
+            self.overflows += 1
+            return False
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.written += n # Publish only after the copy
+        return True
+
+    def available(self):
+        return self.written - self.consumed
+
+    def read_into(self, out):
+        """Copies the next len(out) samples into out (converting dtype) and consumes them."""
+        n = len(out)
+        start = self.consumed % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:] = self.data[:n - first]
+        self.consumed += n
+
+    def reset(self):
+        self.written = 0
+        self.consumed = 0
+
+
+class HistoryRing:
+    """
+    Fixed-size float32 sample history (channels x capacity), preallocated once.
+
+    Every sample is written twice (at i and i + capacity), so the newest n
+    samples are always one contiguous slice: latest(n) is a view, never a copy.
+    A view reflects later writes, so copy it if it must stay unchanged.
+    """
+    def __init__(self, capacity, channels=1):
+        self.capacity = capacity
+        self.data = np.zeros((channels, 2 * capacity), dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+
+    def append(self, samples):
+        """samples: (channels, n) block."""
+        n = min(samples.shape[-1], self.capacity)
+        samples = samples[:, -n:]
+        cap = self.capacity
+        first = min(n, cap - self.pos)
+        rest = n - first
+        self.data[:, self.pos:self.pos + first] = samples[:, :first]
+        self.data[:, self.pos + cap:self.pos + cap + first] = samples[:, :first]
+        self.data[:, :rest] = samples[:, first:]
+        self.data[:, cap:cap + rest] = samples[:, first:]
+        self.filled = min(cap, self.filled + n)
+        self.pos = (self.pos + n) % cap
+
+    def latest(self, n=None):
+        """(channels, n) view of the newest samples."""
+        n = self.filled if n is None else min(n, self.filled)
+        end = self.pos + self.capacity
+        return self.data[:, end - n:end]
+
+
+class MetricSmoother:
+    """Moving average of SMOOTHED_KEYS per zone over the last `window` updates, O(1) per update."""
+    def __init__(self, window=SMOOTHING_WINDOW, channels=1, keys=SMOOTHED_KEYS):
+        self.keys = keys
+        self.values = np.zeros((window, channels, len(keys)))
+        self.total = np.zeros((channels, len(keys)))
+        self.pos = 0
+        self.count = 0
+
+    def update(self, new):
+        """new: (channels, len(keys)) values; returns the smoothed array of the same shape."""
+        self.total += new - self.values[self.pos]
+        self.values[self.pos] = new
+        self.pos = (self.pos + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+        return self.total / self.count
+
+
+class FeatureWindow:
+    """Per-hop STFT features of every channel over the last `size` hops (one analysis window), preallocated."""
+    KEYS = ("flux", "onset", "centroid", "rolloff")
+
+    def __init__(self, size, channels, n_bands):
+        self.size = size
+        self.values = {key: np.zeros((channels, size), dtype=np.float32) for key in self.KEYS}
+        self.bands = np.zeros((channels, size, n_bands), dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+
+    def push(self, frames):
+        n = min(frames["flux"].shape[1], self.size)
+        idx = (self.pos + np.arange(n)) % self.size
+        for key in self.KEYS:
+            self.values[key][:, idx] = frames[key][:, -n:]
+        self.bands[:, idx] = frames["bands"][:, -n:]
+        self.pos = (self.pos + n) % self.size
+        self.filled = min(self.size, self.filled + n)
+
+    def get(self, key):
+        """(channels, filled) values."""
+        return self.values[key][:, :self.filled]
+
+    def reset(self):
+        self.pos = 0
+        self.filled = 0
+
 
 class AudioProcessor:
-    def __init__(self):
+    def __init__(self, zones=None):
         self.p = pyaudio.PyAudio()
-        self.stream = None
+        self.streams = []
         self.running = False
-        self.lock = threading.Lock()
-        
-        # Audio Buffer (Circular)
-        # Store raw float data for processing
-        self.buffer_size = int(RATE / CHUNK * BUFFER_SECONDS)
-        self.audio_buffer = deque(maxlen=self.buffer_size)
-        
-        # Metrics History
-        self.metrics_history = deque(maxlen=HISTORY_LEN)
-        
+        self.zones = ZONES if zones is None else zones # Empty = one zone on the device picked in start()
+        self.step = HOP if LOW_LATENCY else CHUNK # Samples captured / analyzed per block
+        self.worker = None
+        self.worker_running = False
+
         # State
         self.frames_processed = 0
         self.input_gain = 5.0 # Default gain boost
+        self.input_overflows = 0 # PortAudio reported lost input (driver side)
+        self.underruns = 0 # Analysis starved of audio (stream stalled or stopped delivering)
         
         # ML / Baseline State
         # We will maintain a 'normal' MFCC profile
@@ -47,14 +187,75 @@ class AudioProcessor:
             "db": -90.0,
             "zcr": 0.0,
             "flux": 0.0,
+            "onset": 0.0,
+            "centroid": 0.0,
+            "rolloff": 0.0,
+            "bands": {},
             "threat_score": 0.0,
             "status": "NORMAL",
-            "reason": "Initializing..."
+            "reason": "Initializing...",
+            "alarm_since": None,
+            "zone": None,
+            "loudest_zone": None,
+            "zones": []
         }
-        
-        # Metric buffering for smoothing
-        self.metric_buffer = deque(maxlen=SMOOTHING_WINDOW)
+        self.smoothed_metrics = self.latest_metrics
         self.last_error = None
+        self._configure(self.zones or [{"name": "Mic", "device": None, "channel": 0}])
+
+    def _configure(self, zones):
+        """
+        Sizes every buffer for the zone list. Each device is opened once with
+        enough channels for all its zones and gets its own raw ring; the worker
+        stacks the zones of all devices into one (zones x samples) block.
+        """
+        self.zone_names = [z.get("name", f"Zone {i + 1}") for i, z in enumerate(zones)]
+        self.zone_gain = np.array([z.get("gain", 1.0) for z in zones], dtype=np.float32)[:, None]
+        n_zones = len(zones)
+
+        channels_of = {}
+        for z in zones:
+            device = z.get("device")
+            channels_of[device] = max(channels_of.get(device, 0), z.get("channel", 0) + 1)
+        self.devices = list(channels_of.items()) # [(device_index, channels opened)]
+        offsets = np.cumsum([0] + [n for _, n in self.devices])
+        position = {device: i for i, (device, _) in enumerate(self.devices)}
+        # Column of each zone in the side-by-side (samples x all device channels) block
+        self.zone_columns = np.array([offsets[position[z.get("device")]] + z.get("channel", 0) for z in zones])
+        self.total_channels = int(offsets[-1])
+
+        # Raw capture rings: each callback only copies into its own, the worker analyzes
+        self.rings = [RawRing(RATE * RING_SECONDS * n) for _, n in self.devices]
+        self.raw = np.zeros((self.step, self.total_channels), dtype=np.float32) # Interleaved blocks, reused
+        self.raw_views = [self.raw[:, a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+        self.raw_flat = [np.zeros(self.step * n, dtype=np.float32) for _, n in self.devices]
+        # (zones x samples) block handed to the analysis without allocating per hop: a
+        # strided view of raw when the zone columns are contiguous (e.g. one zone per channel
+        # of each device, in order), else the transpose of a buffer the columns are gathered into
+        first = int(self.zone_columns[0])
+        if np.array_equal(self.zone_columns, np.arange(first, first + n_zones)):
+            self.zone_gather = None
+            self.zone_block = self.raw[:, first:first + n_zones].T
+        else:
+            self.zone_gather = np.zeros((self.step, n_zones), dtype=np.float32)
+            self.zone_block = self.zone_gather.T
+
+        # Audio History (Circular, preallocated; the UI gets zero-copy views)
+        self.history = HistoryRing(RATE * BUFFER_SECONDS, n_zones)
+        self.work = np.zeros((n_zones, self.step), dtype=np.float32) # Processed block, reused
+        self.dc = np.zeros((n_zones, 1), dtype=np.float32)
+        self.stft = STFTEngine(RATE, hop=HOP) # Overlapping-window features (features.py)
+        self.recent = FeatureWindow(CHUNK // HOP, n_zones, len(self.stft.band_names))
+        # Smoothed values for the UI, maintained incrementally
+        # (over the same span of audio whatever the block size)
+        self.smoother = MetricSmoother(SMOOTHING_WINDOW * CHUNK // self.step, n_zones)
+        self.loudest = 0
+        # Alarm hold per zone: level / reason shown, when the hold ends, when the alarm fired
+        self.held_level = np.zeros(n_zones, dtype=np.int8)
+        self.held_reason = np.zeros(n_zones, dtype=np.int8)
+        self.held_until = np.zeros(n_zones)
+        self.fired_at = np.zeros(n_zones)
+        self.shown_level = np.zeros(n_zones, dtype=np.int8)
 
     def get_devices(self):
         """Return list of input devices."""
@@ -74,140 +275,247 @@ class AudioProcessor:
         if self.running:
             return
 
+        if not self.zones:
+            # Single-microphone mode: one zone on the selected device
+            self._configure([{"name": "Mic", "device": device_index, "channel": 0}])
+
         try:
-            self.stream = self.p.open(format=FORMAT,
-                                      channels=CHANNELS,
-                                      rate=RATE,
-                                      input=True,
-                                      input_device_index=device_index,
-                                      frames_per_buffer=CHUNK,
-                                      stream_callback=self._audio_callback)
-            self.stream.start_stream()
+            for ring in self.rings:
+                ring.reset()
+            self.stft.reset()
+            self.recent.reset()
+            for (device, channels), ring in zip(self.devices, self.rings):
+                self.streams.append(self.p.open(format=FORMAT,
+                                                channels=channels,
+                                                rate=RATE,
+                                                input=True,
+                                                input_device_index=device,
+                                                frames_per_buffer=self.step,
+                                                stream_callback=self._make_callback(ring)))
+            self.worker_running = True
+            self.worker = threading.Thread(target=self._analysis_loop, daemon=True)
+            self.worker.start()
+            for stream in self.streams:
+                stream.start_stream()
             self.running = True
-            print(f"Audio started on device {device_index} with gain {self.input_gain}")
+            print(f"Audio started on devices {[d for d, _ in self.devices]} "
+                  f"({len(self.zone_names)} zones) with gain {self.input_gain}")
         except Exception as e:
             print(f"Error starting audio: {e}")
+            self.stop()
             self.latest_metrics["reason"] = f"Device Error: {str(e)}"
             self.latest_metrics["status"] = "CRITICAL"
 
     def stop(self):
-        if self.stream:
-            if self.stream.is_active():
-                self.stream.stop_stream()
-            self.stream.close()
-            self.stream = None
+        for stream in self.streams:
+            if stream.is_active():
+                stream.stop_stream()
+            stream.close()
+        self.streams = []
+        self.worker_running = False
+        if self.worker:
+            self.worker.join(timeout=1.0)
+            self.worker = None
         self.running = False
 
-    def _audio_callback(self, in_data, frame_count, time_info, status):
+    @property
+    def overflows(self):
+        """Blocks lost before analysis: dropped on a full ring or by the driver."""
+        return sum(ring.overflows for ring in self.rings) + self.input_overflows
+
+    def _make_callback(self, ring):
+        def callback(in_data, frame_count, time_info, status):
+            # Real-time thread: copy the raw (interleaved) samples and return, nothing else
+            if status & pyaudio.paInputOverflow:
+                self.input_overflows += 1
+            ring.write(np.frombuffer(in_data, dtype=np.int16))
+            return (in_data, pyaudio.paContinue)
+        return callback
+
+    def _analysis_loop(self):
+        """Consumes the raw rings one block (HOP or CHUNK) at a time at its own pace."""
+        chunk_seconds = CHUNK / RATE
+        waiting_since = time.monotonic()
+        starved = False
+        while self.worker_running:
+            # Every device must have delivered the block (devices run on their own clocks)
+            if any(ring.available() < len(flat) for ring, flat in zip(self.rings, self.raw_flat)):
+                if not starved and time.monotonic() - waiting_since > UNDERRUN_CHUNKS * chunk_seconds:
+                    self.underruns += 1
+                    starved = True
+                time.sleep(self.step / RATE / 4)
+                continue
+            waiting_since = time.monotonic()
+            starved = False
+
+            # Deinterleave: all device channels side by side, then one column per zone
+            for ring, flat, view in zip(self.rings, self.raw_flat, self.raw_views):
+                ring.read_into(flat)
+                view[:] = flat.reshape(self.step, -1)
+            if self.zone_gather is not None:
+                # mode="clip" lets take() write straight into out (indices are always valid)
+                np.take(self.raw, self.zone_columns, axis=1, out=self.zone_gather, mode="clip")
+            self._process_block(self.zone_block)
+
+    def _process_block(self, block):
+        """block: (zones, HOP or CHUNK) raw int16 sample values (as float32)."""
         try:
-            # 1. Convert Bytes to Int16
-            audio_data_int = np.frombuffer(in_data, dtype=np.int16)
+            # 1-2. Normalize to Float (-1.0 to 1.0) and Apply Gain, in place
+            audio_data_float = self.work
+            np.multiply(block, self.zone_gain * (self.input_gain / 32768.0), out=audio_data_float)
+            np.clip(audio_data_float, -1.0, 1.0, out=audio_data_float)
             
-            # 2. Normalize to Float (-1.0 to 1.0)
-            audio_data_float = audio_data_int / 32768.0
+            # 3. Remove DC Offset (per zone)
+            if LOW_LATENCY:
+                self.dc += DC_ALPHA * (audio_data_float.mean(axis=1, keepdims=True) - self.dc)
+                audio_data_float -= self.dc
+            else:
+                audio_data_float -= audio_data_float.mean(axis=1, keepdims=True)
             
-            # 3. Apply Gain
-            audio_data_float = audio_data_float * self.input_gain
-            audio_data_float = np.clip(audio_data_float, -1.0, 1.0)
+            # 4. Storage (single writer; readers take views without locking)
+            self.history.append(audio_data_float)
+            self.frames_processed += 1
             
-            # 4. Remove DC Offset
-            audio_data_float = audio_data_float - np.mean(audio_data_float)
-            
-            # 5. Thread-safe storage
-            with self.lock:
-                self.audio_buffer.append(audio_data_float)
-                self.frames_processed += 1
-            
-            # 6. Compute Metrics Async (or sync here since it's fast enough for 4096 samples)
-            self._compute_metrics(audio_data_float)
+            # 5. Compute Metrics (analysis thread, so heavier models cannot stall capture)
+            # over the last CHUNK samples, a view into the history ring
+            self._compute_metrics(self.history.latest(CHUNK), audio_data_float)
             
         except Exception as e:
             self.last_error = str(e)
-            print(f"Callback Error: {e}")
-            
-        return (in_data, pyaudio.paContinue)
+            print(f"Analysis Error: {e}")
 
-    def _compute_metrics(self, y):
+    def _compute_metrics(self, y, block):
         """
         Compute rigorous audio features using pure NumPy for stability.
+        y: (zones, CHUNK) analysis windows; block: (zones, n) samples new since the last call.
+        Every feature and rule is evaluated for all zones at once.
         """
-        # RMS
-        rms = np.sqrt(np.mean(y**2))
+        # RMS (window, and of the newest block for the loud-event fast path)
+        rms = np.sqrt(np.mean(y**2, axis=1))
+        block_rms = np.sqrt(np.mean(block**2, axis=1))
         # Convert to roughly SPL (Sound Pressure Level) with offset
         # -90dBFS (silence) becomes 30dB, 0dBFS (max) becomes 120dB
         db = (20 * np.log10(rms + 1e-9)) + 120
-        db = max(0.0, db) # Ensure positive
+        db = np.maximum(0.0, db) # Ensure positive
         
         # ZCR
-        zcr = ((y[:-1] * y[1:]) < 0).sum() / len(y)
+        zcr = ((y[:, :-1] * y[:, 1:]) < 0).sum(axis=1) / y.shape[1]
         
-        # Spectral Flux (Using numpy FFT)
-        spectrum = np.abs(np.fft.rfft(y))
-        # Use standard deviation of spectrum as a proxy for "complexity/energy spread"
-        flux = np.std(spectrum)
+        # STFT features for every hop completed by the new block (one batched FFT for all zones);
+        # the window reports its strongest frame-to-frame change and average spectrum shape
+        frames = self.stft.process(block)
+        if frames is None:
+            return
+        self.recent.push(frames)
+        flux = self.recent.get("flux").max(axis=1)
+        onset = self.recent.get("onset").max(axis=1)
+        centroid = self.recent.get("centroid").mean(axis=1)
+        rolloff = self.recent.get("rolloff").mean(axis=1)
+        bands = self.recent.bands[:, :self.recent.filled].mean(axis=1)
         
         # --- NOISE GATE ---
         # If audio is very quiet, zero out complex metrics to prevent static noise readings
-        if rms < 0.02:
-            zcr = 0.0
-            flux = 0.0
-            db = max(30.0, db) # Floor dB at ambient room level
+        quiet = rms < 0.02
+        zcr[quiet] = 0.0
+        flux[quiet] = 0.0
+        onset[quiet] = 0.0
+        db[quiet] = np.maximum(30.0, db[quiet]) # Floor dB at ambient room level
         
-        # --- DETECTION LOGIC ---
-        status = "NORMAL"
-        reason = "Environment stable"
+        # --- DETECTION LOGIC --- (level indexes STATUS_LEVELS, reason indexes REASONS)
+        level = np.zeros(len(rms), dtype=np.int8)
+        reason = np.zeros(len(rms), dtype=np.int8)
         threat_score = 0.0
         
-        # 1. Volume Threshold
-        if rms > 0.5:
-            status = "CRITICAL"
-            reason = "High intensity event (Explosion/Scream)"
-        elif rms > 0.2:
-            status = "WARNING"
-            reason = "Elevated volume detected"
+        # 1. Volume Threshold (a single loud hop is enough: alarm within ~HOP of the event)
+        loudness = np.maximum(rms, block_rms)
+        warning = loudness > RMS_WARNING
+        level[warning], reason[warning] = 1, 1
+        critical = loudness > RMS_CRITICAL
+        level[critical], reason[critical] = 2, 2
             
         # 2. Panic Analysis (High ZCR + Volume)
-        if zcr > 0.25 and rms > 0.1:
-            status = "CRITICAL"
-            reason = "High-frequency panic noise"
-
-        # 3. Impact Analysis (Flux)
-        if flux > 5.0 and rms > 0.1:
-             if status == "NORMAL":
-                 status = "WARNING"
-                 reason = "Sudden transient impact"
+        panic = (zcr > 0.25) & (rms > 0.1)
+        level[panic], reason[panic] = 2, 3
+
+        # 3. Impact Analysis (Onset: sudden broadband rise, e.g. impacts, glass)
+        impact = (onset > ONSET_THRESHOLD) & (rms > 0.1) & (level == 0)
+        level[impact], reason[impact] = 1, 4
+
+        level, reason, since = self._hold(level, reason)
+
+        # Reported zone: the most severe, the loudest among equals
+        focus = int(np.lexsort((rms, level))[-1])
+        self.loudest = int(np.argmax(rms))
+        smooth = self.smoother.update(np.stack((rms, db, zcr, flux), axis=1))
+
+        # Per-zone summary (smoothed levels, current status) for the zone display
+        names = self.zone_names
+        zones = [{"name": names[i], "rms": r, "db": d, "zcr": z, "flux": f,
+                  "status": STATUS_LEVELS[l], "reason": REASONS[c], "alarm_since": a}
+                 for i, ((r, d, z, f), l, c, a) in enumerate(zip(smooth.tolist(), level.tolist(),
+                                                                  reason.tolist(), since))]
+        status = STATUS_LEVELS[level[focus]]
+        reason_text = REASONS[reason[focus]]
+        if len(names) > 1:
+            reason_text = f"{names[focus]}: {reason_text}"
         
-        # Update State
-        with self.lock:
-            self.latest_metrics = {
-                "rms": rms,
-                "db": db,
-                "zcr": zcr,
-                "flux": flux,
-                "threat_score": threat_score,
-                "status": status,
-                "reason": reason
-            }
-            
-            # Add to smoothing buffer
-            self.metric_buffer.append(self.latest_metrics)
-
-    def get_data(self):
-        """Get latest buffer and smoothed metrics for UI."""
-        with self.lock:
-            if not self.audio_buffer:
-                return np.zeros(CHUNK), self.latest_metrics
-            
-            # Flatten buffer
-            wave = np.concatenate(self.audio_buffer)
-            
-            # Compute Smoothed Metrics for UI stability
-            if len(self.metric_buffer) > 0:
-                smoothed = self.latest_metrics.copy()
-                smoothed['rms'] = np.mean([m['rms'] for m in self.metric_buffer])
-                smoothed['db'] = np.mean([m['db'] for m in self.metric_buffer])
-                smoothed['zcr'] = np.mean([m['zcr'] for m in self.metric_buffer])
-                smoothed['flux'] = np.mean([m['flux'] for m in self.metric_buffer])
-                return wave, smoothed
-            
-            return wave, self.latest_metrics
+        # Update State (new dicts are swapped in whole, so readers need no lock)
+        metrics = {
+            "rms": float(rms[focus]),
+            "db": float(db[focus]),
+            "zcr": float(zcr[focus]),
+            "flux": float(flux[focus]),
+            "onset": float(onset[focus]),
+            "centroid": float(centroid[focus]),
+            "rolloff": float(rolloff[focus]),
+            "bands": dict(zip(self.stft.band_names, bands[focus].tolist())),
+            "threat_score": threat_score,
+            "status": status,
+            "reason": reason_text,
+            "alarm_since": since[focus],
+            "zone": names[focus],
+            "loudest_zone": names[self.loudest],
+            "zones": zones
+        }
+        smoothed = dict(metrics)
+        smoothed.update(zip(SMOOTHED_KEYS, smooth[focus].tolist()))
+        self.smoothed_metrics = smoothed
+        self.latest_metrics = metrics
+
+    def _hold(self, level, reason):
+        """
+        Applies ALARM_HOLD per zone: an alarm stays at its highest level (with its
+        reason) until ALARM_HOLD seconds after the last hop that raised it.
+        Returns (level, reason, alarm_since) where alarm_since is the epoch time the
+        shown alarm first fired, or None while NORMAL.
+        """
+        now = time.time()
+        held = np.where(now < self.held_until, self.held_level, 0)
+        refresh = (level > 0) & (level >= held)
+        self.held_level[refresh] = level[refresh]
+        self.held_reason[refresh] = reason[refresh]
+        self.held_until[refresh] = now + ALARM_HOLD
+
+        shown = np.maximum(level, held)
+        self.fired_at[shown > self.shown_level] = now # New alarm, or escalation
+        self.shown_level = shown
+        reason = np.where(held > level, self.held_reason, reason)
+        since = [float(t) if l > 0 else None for t, l in zip(self.fired_at.tolist(), shown.tolist())]
+        return shown, reason, since
+
+    def buffered_seconds(self):
+        return self.history.filled / RATE
+
+    def get_data(self, window=None, zone=None):
+        """
+        Latest `window` samples (None = whole history) of one zone (index or
+        name; None = the loudest) as a zero-copy view, and smoothed metrics for
+        UI stability. Takes microseconds; never blocks the worker.
+        """
+        if self.history.filled == 0:
+            return np.zeros(CHUNK, dtype=np.float32), self.smoothed_metrics
+        if zone is None:
+            zone = self.loudest
+        elif isinstance(zone, str):
+            zone = self.zone_names.index(zone)
+        return self.history.latest(window)[zone], self.smoothed_metrics
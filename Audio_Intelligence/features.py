@@ -0,0 +1,134 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- CONFIGURATION ---
+RATE = 44100
+N_FFT = 2048        # Analysis window (46 ms at 44.1 kHz, ~21.5 Hz bins)
+HOP = 512           # Step between windows (11.6 ms, 75% overlap)
+N_MELS = 40
+FMIN = 20.0
+FMAX = 11025.0
+ROLLOFF = 0.85      # Fraction of spectral energy below the rolloff frequency
+BANDS = {           # Band energies reported per hop (Hz)
+    "low": (20, 250),       # Rumble, footsteps, explosions
+    "mid": (250, 2000),     # Voices
+    "high": (2000, 6000),   # Screams, alarms
+    "air": (6000, 11025),   # Glass breaking, hiss
+}
+EPS = 1e-10
+
+
+def hz_to_mel(f):
+    return 2595.0 * np.log10(1.0 + np.asarray(f) / 700.0)
+
+
+def mel_to_hz(m):
+    return 700.0 * (10.0 ** (np.asarray(m) / 2595.0) - 1.0)
+
+
+def mel_filterbank(rate=RATE, n_fft=N_FFT, n_mels=N_MELS, fmin=FMIN, fmax=FMAX):
+    """(n_mels, n_fft // 2 + 1) triangular filters evenly spaced on the mel scale."""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / rate)
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (freqs - lower) / (center - lower)
+    falling = (upper - freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+
+
+class STFTEngine:
+    """
+    Streaming short-time Fourier features.
+
+    Feed it consecutive blocks of samples; it keeps the last N_FFT - HOP
+    samples between calls so windows overlap across block boundaries. All
+    windows completed by a block are framed as strided views and transformed
+    in one batched rfft; every feature is then a whole-array reduction, so
+    there is no Python work per frame. The window, mel filterbank and band
+    matrices are computed once.
+
+    Multichannel input (channels x samples) goes through the same single
+    rfft: every result then gains a leading channel axis.
+    """
+    def __init__(self, rate=RATE, n_fft=N_FFT, hop=HOP, n_mels=N_MELS, fmin=FMIN, fmax=FMAX,
+                 bands=BANDS, rolloff=ROLLOFF):
+        self.rate = rate
+        self.n_fft = n_fft
+        self.hop = hop
+        self.rolloff = rolloff
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32) # Periodic Hann
+        self.scale = np.float32(2.0 / self.window.sum()) # Full-scale sine -> magnitude 1
+        self.freqs = np.fft.rfftfreq(n_fft, 1.0 / rate).astype(np.float32)
+        self.mel_fb = mel_filterbank(rate, n_fft, n_mels, fmin, fmax)
+        self.band_names = list(bands)
+        self.band_fb = np.array([(self.freqs >= lo) & (self.freqs < hi) for lo, hi in bands.values()],
+                                dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.tail = None
+        self.prev_mag = None
+        self.prev_logmel = None
+
+    def process(self, samples):
+        """
+        Features of every hop completed by samples, as arrays with one row per frame:
+        rms, flux, onset, centroid (Hz), rolloff (Hz) and bands (frames x len(BANDS), dB).
+        samples may be (channels, n): results are then (channels, frames[, bands]).
+        Returns None if no new frame is complete yet.
+        """
+        y = np.asarray(samples, dtype=np.float32)
+        mono = y.ndim == 1
+        y = y.reshape(-1, y.shape[-1])
+        if self.tail is None or len(self.tail) != len(y):
+            # First call, or the channel count changed: start from silence
+            self.tail = np.zeros((len(y), self.n_fft - self.hop), dtype=np.float32)
+            self.prev_mag = None
+            self.prev_logmel = None
+        y = np.concatenate((self.tail, y), axis=1)
+        n_frames = 1 + (y.shape[1] - self.n_fft) // self.hop
+        if n_frames <= 0:
+            self.tail = y
+            return None
+        frames = sliding_window_view(y, self.n_fft, axis=1)[:, ::self.hop][:, :n_frames]
+        self.tail = y[:, n_frames * self.hop:].copy()
+        result = self.analyze(frames)
+        if mono:
+            result = {key: value[0] for key, value in result.items()}
+        return result
+
+    def analyze(self, frames):
+        """
+        Features for a (frames, N_FFT) or (channels, frames, N_FFT) batch,
+        continuing from the previous batch.
+        """
+        mag = np.abs(np.fft.rfft(frames * self.window, axis=-1)).astype(np.float32)
+        mag *= self.scale
+        power = mag * mag
+        logmel = 10.0 * np.log10(power @ self.mel_fb.T + EPS)
+
+        # Previous frame for every frame (the last one of the previous call for the first)
+        prev_mag = np.empty_like(mag)
+        prev_mag[..., 1:, :] = mag[..., :-1, :]
+        prev_mag[..., 0, :] = mag[..., 0, :] if self.prev_mag is None else self.prev_mag
+        prev_logmel = np.empty_like(logmel)
+        prev_logmel[..., 1:, :] = logmel[..., :-1, :]
+        prev_logmel[..., 0, :] = logmel[..., 0, :] if self.prev_logmel is None else self.prev_logmel
+        self.prev_mag = mag[..., -1, :].copy()
+        self.prev_logmel = logmel[..., -1, :].copy()
+
+        # Spectral flux: half-wave rectified rise in magnitude between consecutive frames
+        flux = np.maximum(mag - prev_mag, 0.0).sum(axis=-1)
+        # Onset strength: mean rise in log-mel energy (dB), insensitive to gain
+        onset = np.maximum(logmel - prev_logmel, 0.0).mean(axis=-1)
+
+        total = mag.sum(axis=-1)
+        centroid = (mag @ self.freqs) / (total + EPS)
+        cumulative = np.cumsum(power, axis=-1)
+        idx = (cumulative < self.rolloff * cumulative[..., -1:]).sum(axis=-1)
+        rolloff = self.freqs[np.minimum(idx, len(self.freqs) - 1)]
+        bands = 10.0 * np.log10(power @ self.band_fb.T + EPS)
+        rms = np.sqrt(np.mean(frames * frames, axis=-1))
+
+        return {"rms": rms, "flux": flux, "onset": onset, "centroid": centroid,
+                "rolloff": rolloff, "bands": bands}
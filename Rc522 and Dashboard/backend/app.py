@@ -97,6 +97,63 @@ def tap():
 
     return jsonify({"status": "error"}), 400
 
+# --- API: CAMERA COUNTS (Visual Intelligence tripwires) ---
+def parse_venue_counts(data):
+    """
+    Validated (venue_id, gate, entries, exits) rows of a venue_counts batch, or
+    (None, message) for a malformed one. Nothing is applied unless every item is valid.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('counts', []), list):
+        return None, "Expected {\"camera\": ..., \"counts\": [...]}"
+    rows = []
+    for i, item in enumerate(data.get('counts', [])):
+        if not isinstance(item, dict):
+            return None, f"counts[{i}] is not an object"
+        vid = item.get('venue_id')
+        vid = CURRENT_VENUE_ID if vid is None else vid
+        if isinstance(vid, bool) or not isinstance(vid, int) or vid not in VENUES:
+            return None, f"counts[{i}]: unknown venue_id {vid!r}"
+        counts = []
+        for key in ('entries', 'exits'):
+            n = item.get(key, 0)
+            if isinstance(n, bool) or not isinstance(n, int) or n < 0:
+                return None, f"counts[{i}]: {key} must be a non-negative integer"
+            counts.append(n)
+        rows.append((vid, str(item.get('gate', 'Gate')), *counts))
+    return rows, None
+
+@app.route('/api/venue_counts', methods=['POST'])
+def venue_counts():
+    # Batched anonymous entries/exits counted on camera gates:
+    # {"camera": 0, "counts": [{"gate": "Door A", "venue_id": 1, "entries": 3, "exits": 1}, ...]}
+    data = request.get_json(silent=True)
+    rows, error = parse_venue_counts(data)
+    if error:
+        return jsonify({"status": "error", "msg": error}), 400
+    camera = data.get('camera', 0)
+    updated = {}
+
+    for vid, gate, entries, exits in rows:
+        v = VENUES[vid]
+        v['count'] = max(0, v['count'] + entries - exits)
+        if entries and v['count'] > v['limit']:
+            OVER_CAPACITY_SILENCED[vid] = False
+
+        # One log line per direction and gate, not per person
+        for ttype, n in (("entry", entries), ("exit", exits)):
+            if n:
+                TAP_LOGS.insert(0, {
+                    "name": f"Camera {camera} - {gate} ({n})",
+                    "uid": "camera",
+                    "venue": v['name'],
+                    "type": ttype,
+                    "time": datetime.now().strftime("%H:%M:%S")
+                })
+        del TAP_LOGS[50:]
+        updated[vid] = v['count']
+
+    return jsonify({"status": "ok", "counts": updated})
+
 # --- API: STATUS ---
 @app.route('/api/status', methods=['GET'])
 def status():
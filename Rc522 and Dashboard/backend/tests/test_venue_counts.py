@@ -0,0 +1,56 @@
+import pytest
+
+import app as backend
+
+
+@pytest.fixture
+def client():
+    for v in backend.VENUES.values():
+        v['count'] = 0
+    backend.TAP_LOGS.clear()
+    return backend.app.test_client()
+
+
+def post(client, body):
+    return client.post('/api/venue_counts', json=body)
+
+
+def test_counts_are_added_to_the_venue(client):
+    res = post(client, {"camera": 0, "counts": [{"gate": "Door A", "venue_id": 2, "entries": 3, "exits": 1}]})
+    assert res.status_code == 200
+    assert res.get_json()["counts"] == {"2": 2}
+    assert backend.VENUES[2]['count'] == 2
+
+
+def test_missing_venue_means_the_current_venue(client):
+    post(client, {"counts": [{"gate": "Door A", "entries": 4}]})
+    assert backend.VENUES[backend.CURRENT_VENUE_ID]['count'] == 4
+
+
+@pytest.mark.parametrize("body", [
+    ["not", "an", "object"],
+    {"counts": "Door A"},
+    {"counts": ["Door A"]},
+    {"counts": [{"venue_id": "hall", "entries": 1}]},
+    {"counts": [{"venue_id": 99, "entries": 1}]},
+    {"counts": [{"venue_id": 1, "entries": "many"}]},
+    {"counts": [{"venue_id": 1, "exits": -2}]},
+    {"counts": [{"venue_id": 1, "entries": 1.5}]},
+])
+def test_malformed_batches_are_rejected(client, body):
+    res = post(client, body)
+    assert res.status_code == 400
+    assert res.get_json()["status"] == "error"
+    assert res.get_json()["msg"]
+
+
+def test_a_bad_item_rejects_the_whole_batch(client):
+    res = post(client, {"counts": [{"venue_id": 1, "entries": 5}, {"venue_id": 99, "entries": 1}]})
+    assert res.status_code == 400
+    assert backend.VENUES[1]['count'] == 0
+    assert backend.TAP_LOGS == []
+
+
+def test_non_json_body_is_rejected(client):
+    res = client.post('/api/venue_counts', data="entries=3", content_type="text/plain")
+    assert res.status_code == 400
@@ -0,0 +1,206 @@
+import cv2
+import numpy as np
+from threading import Lock
+
+# --- CONFIGURATION ---
+HUE_BINS = 16           # Chromatic bins: hue x saturation
+SAT_BINS = 4
+GRAY_BINS = 4           # Achromatic (dark / unsaturated) pixels binned by brightness instead
+SAT_MIN = 40            # Below this saturation, or VAL_MIN brightness, hue is meaningless
+VAL_MIN = 40
+PATCH_SIZE = (8, 16)    # (w, h) every person crop is resampled to before binning
+TORSO_BAND = (0.15, 0.65) # Vertical slice of the box used: skips head and floor / legs
+SIDE_MARGIN = 0.2       # Horizontal fraction trimmed on each side (background)
+
+# Cross-camera merging
+MERGE_DISTANCE = 60.0   # Max distance (target camera pixels) between a projected track and a match
+MERGE_MAX_APPEARANCE = 0.5 # Max appearance distance for a cross-camera match
+MERGE_APPEARANCE_WEIGHT = 0.5
+STICKY_BONUS = 0.3      # Cost discount for pairs already linked last update (keeps identities stable)
+
+
+def appearance_distance(A, B):
+    """
+    (N, M) distance in [0, 1] between two sets of embeddings.
+    Embeddings are square-rooted normalized histograms (unit L2 norm), so the
+    dot product is the Bhattacharyya coefficient: 0 = identical colors.
+    """
+    return np.clip(1.0 - A @ B.T, 0.0, 1.0)
+
+
+class AppearanceEncoder:
+    """
+    Cheap per-person color descriptor for re-identification.
+
+    Each box's torso region is resampled to a tiny PATCH_SIZE patch; all patches
+    are converted to HSV in one call and binned with a single bincount, so the
+    cost is dominated by one cv2.resize per person. Only run it on detection frames.
+    """
+    def __init__(self, patch_size=PATCH_SIZE, hue_bins=HUE_BINS, sat_bins=SAT_BINS, gray_bins=GRAY_BINS):
+        self.patch_size = patch_size
+        self.hue_bins = hue_bins
+        self.sat_bins = sat_bins
+        self.gray_bins = gray_bins
+        self.dim = hue_bins * sat_bins + gray_bins
+        self.patches = np.zeros((0, patch_size[1], patch_size[0], 3), dtype=np.uint8)
+
+    def encode(self, frame, rects):
+        """(N, dim) float32 embeddings for the boxes in rects (frame pixels)."""
+        n = len(rects)
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        pw, ph = self.patch_size
+        if len(self.patches) < n:
+            self.patches = np.zeros((max(n, 2 * len(self.patches)), ph, pw, 3), dtype=np.uint8)
+        patches = self.patches[:n]
+
+        fh, fw = frame.shape[:2]
+        for i, (x1, y1, x2, y2) in enumerate(rects):
+            bw, bh = x2 - x1, y2 - y1
+            left = max(0, int(x1 + bw * SIDE_MARGIN))
+            right = min(fw, int(x2 - bw * SIDE_MARGIN))
+            top = max(0, int(y1 + bh * TORSO_BAND[0]))
+            bottom = min(fh, int(y1 + bh * TORSO_BAND[1]))
+            if right <= left or bottom <= top:
+                patches[i] = 0
+                continue
+            patches[i] = cv2.resize(frame[top:bottom, left:right], (pw, ph), interpolation=cv2.INTER_AREA)
+
+        hsv = cv2.cvtColor(patches.reshape(n * ph, pw, 3), cv2.COLOR_BGR2HSV).reshape(n, ph * pw, 3)
+        hue = hsv[..., 0].astype(np.int32)
+        sat = hsv[..., 1].astype(np.int32)
+        val = hsv[..., 2].astype(np.int32)
+
+        # OpenCV 8-bit hue is 0..179
+        bins = (hue * self.hue_bins // 180) * self.sat_bins + sat * self.sat_bins // 256
+        gray = (sat < SAT_MIN) | (val < VAL_MIN)
+        bins = np.where(gray, self.hue_bins * self.sat_bins + val * self.gray_bins // 256, bins)
+        bins += np.arange(n, dtype=np.int32)[:, None] * self.dim
+
+        hist = np.bincount(bins.ravel(), minlength=n * self.dim).reshape(n, self.dim)
+        return np.sqrt(hist.astype(np.float32) / (ph * pw))
+
+
+def _inside(points, polygon):
+    """Boolean mask of points (N, 2) inside polygon (crossing-number test, vectorized)."""
+    poly = np.asarray(polygon, dtype=np.float32)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = poly[:, 0], poly[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    spans = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return ((spans & (x < x_cross)).sum(axis=1) % 2) == 1
+
+
+class Overlap:
+    """
+    Calibrated overlap between two cameras.
+    homography maps cam_a pixels to cam_b pixels (e.g. from cv2.findHomography on
+    four or more floor points seen by both); zone is the shared area in cam_a pixels.
+    """
+    def __init__(self, cam_a, cam_b, homography, zone):
+        self.cam_a = cam_a
+        self.cam_b = cam_b
+        self.homography = np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        self.zone = [tuple(p) for p in zone]
+
+
+class CrossCameraMerger:
+    """
+    Deduplicates people seen by more than one camera.
+
+    Each camera reports its tracker after every update. Tracks of cam_a inside an
+    overlap zone are projected into cam_b and matched against cam_b's tracks on
+    position plus cached appearance embeddings; matched cam_b tracks are links to
+    the cam_a identity and are not counted again. Works on tracker state only, so
+    no detection is rerun. Safe to update from several camera threads.
+    """
+    def __init__(self, overlaps, match_distance=MERGE_DISTANCE, max_appearance=MERGE_MAX_APPEARANCE,
+                 appearance_weight=MERGE_APPEARANCE_WEIGHT):
+        self.overlaps = [o if isinstance(o, Overlap) else Overlap(**o) for o in overlaps]
+        self.match_distance = match_distance
+        self.max_appearance = max_appearance
+        self.appearance_weight = appearance_weight
+        self.tracks = {}    # camera_id -> (ids, centroids, embeddings or None, has_embedding)
+        self.links = [{} for _ in self.overlaps] # Per overlap: (cam_b, id_b) -> (cam_a, id_a)
+        self.lock = Lock()
+
+    def update(self, camera_id, tracker):
+        """Records camera_id's live tracks and re-matches every overlap it is part of."""
+        slots = tracker.active_slots()
+        embeddings = tracker.embeddings[slots] if tracker.embeddings is not None else None
+        snapshot = (tracker.ids[slots].copy(), tracker.centroids[slots].astype(np.float32),
+                    embeddings, tracker.has_embedding[slots].copy())
+        with self.lock:
+            self.tracks[camera_id] = snapshot
+            for i, overlap in enumerate(self.overlaps):
+                if camera_id in (overlap.cam_a, overlap.cam_b):
+                    self.links[i] = self._match(overlap, self.links[i])
+
+    def _match(self, overlap, previous):
+        a = self.tracks.get(overlap.cam_a)
+        b = self.tracks.get(overlap.cam_b)
+        if a is None or b is None or not len(a[0]) or not len(b[0]):
+            return {}
+        ids_a, pts_a, emb_a, known_a = a
+        ids_b, pts_b, emb_b, known_b = b
+
+        shared = np.flatnonzero(_inside(pts_a, overlap.zone))
+        if not len(shared):
+            return {}
+        projected = cv2.perspectiveTransform(pts_a[shared].reshape(-1, 1, 2), overlap.homography).reshape(-1, 2)
+        D = np.hypot(projected[:, None, 0] - pts_b[None, :, 0], projected[:, None, 1] - pts_b[None, :, 1])
+        cost = D / self.match_distance
+        allowed = D <= self.match_distance
+
+        if emb_a is not None and emb_b is not None and emb_a.shape[1] == emb_b.shape[1]:
+            A = appearance_distance(emb_a[shared], emb_b)
+            both = known_a[shared][:, None] & known_b[None, :]
+            cost = cost + self.appearance_weight * np.where(both, A, 0.0)
+            allowed &= ~both | (A <= self.max_appearance)
+
+        # Keep last update's pairs together unless they clearly stopped matching
+        if previous:
+            row_of = {id_a: r for r, id_a in enumerate(ids_a[shared].tolist())}
+            col_of = {id_b: c for c, id_b in enumerate(ids_b.tolist())}
+            for (_, id_b), (_, id_a) in previous.items():
+                if id_a in row_of and id_b in col_of:
+                    cost[row_of[id_a], col_of[id_b]] -= STICKY_BONUS
+
+        # Greedy one-to-one assignment, cheapest pairs first
+        links = {}
+        used_rows = np.zeros(cost.shape[0], dtype=bool)
+        used_cols = np.zeros(cost.shape[1], dtype=bool)
+        for flat in np.argsort(cost, axis=None).tolist():
+            r, c = divmod(flat, cost.shape[1])
+            if used_rows[r] or used_cols[c] or not allowed[r, c]:
+                continue
+            used_rows[r] = used_cols[c] = True
+            links[(overlap.cam_b, int(ids_b[c]))] = (overlap.cam_a, int(ids_a[shared[r]]))
+        return links
+
+    def duplicates(self):
+        """Set of (camera_id, object_id) already counted by another camera."""
+        with self.lock:
+            return {key for links in self.links for key in links}
+
+    def unique_count(self):
+        """People across all cameras, each shared person counted once."""
+        with self.lock:
+            total = sum(len(t[0]) for t in self.tracks.values())
+            linked = {key for links in self.links for key in links}
+        return total - len(linked)
+
+    def global_id(self, camera_id, object_id):
+        """(camera_id, object_id) of the identity this track was merged into (itself if none)."""
+        key = (camera_id, object_id)
+        with self.lock:
+            seen = set()
+            while key not in seen:
+                seen.add(key)
+                parent = next((links[key] for links in self.links if key in links), None)
+                if parent is None:
+                    break
+                key = parent
+        return key
@@ -0,0 +1,103 @@
+import numpy as np
+from collections import deque
+from detector import HumanDetector
+
+# --- CONFIGURATION ---
+MODEL_TIERS = {"n": "yolov8n.pt", "s": "yolov8s.pt", "m": "yolov8m.pt"}
+# Quality ladder, best first: (model tier, inference image size, detect every Nth frame)
+QUALITY_LADDER = [
+    ("m", 640, 5),
+    ("m", 480, 5),
+    ("s", 640, 5),
+    ("s", 480, 6),
+    ("n", 480, 6),
+    ("n", 416, 8),
+    ("n", 320, 10),
+]
+LATENCY_BUDGET_MS = 150     # p95 end-to-end frame latency (capture -> processed) to hold
+WINDOW = 60                 # Frames per latency decision
+UPGRADE_MARGIN = 0.6        # Step up only when p95 is below this fraction of the budget
+COOLDOWN = 90               # Frames after a change before the next decision
+MEMORY_FRAMES = 1800        # How long a level that blew the budget stays off-limits
+
+
+class AutoTuner:
+    """
+    Keeps one camera inside its latency budget by stepping along QUALITY_LADDER.
+
+    Every model tier on the ladder is loaded up front, so a step is only a
+    reference swap on the CameraSystem. Hysteresis: degrade when p95 latency is
+    over budget, upgrade only when it is well under (UPGRADE_MARGIN), wait
+    COOLDOWN frames after every change, and do not retry a level that recently
+    blew the budget.
+    """
+    def __init__(self, detector_kwargs, ladder=QUALITY_LADDER, budget_ms=LATENCY_BUDGET_MS,
+                 start_level=0, window=WINDOW, upgrade_margin=UPGRADE_MARGIN, cooldown=COOLDOWN):
+        self.ladder = ladder
+        self.budget = budget_ms / 1000.0
+        self.upgrade_margin = upgrade_margin
+        self.cooldown = cooldown
+        self.samples = deque(maxlen=window)
+        self.level = min(max(start_level, 0), len(ladder) - 1)
+        self.frames = 0
+        self.changed_at = 0
+        self.over_budget = {} # level -> frame at which it last exceeded the budget
+        self.p95 = 0.0
+
+        # Preload every tier. Exported OpenVINO models have a fixed input size,
+        # so those are loaded per (tier, imgsz); PyTorch / dynamic ONNX take imgsz per call.
+        kwargs = dict(detector_kwargs)
+        kwargs.pop("model_path", None)
+        self.per_size = kwargs.get("backend") == "openvino"
+        self.detectors = {}
+        for tier, imgsz, _ in ladder:
+            key = self._key(tier, imgsz)
+            if key not in self.detectors:
+                self.detectors[key] = HumanDetector(model_path=MODEL_TIERS[tier], **dict(kwargs, imgsz=imgsz))
+
+    def _key(self, tier, imgsz):
+        return (tier, imgsz) if self.per_size else tier
+
+    def apply(self, cam):
+        """Points the camera at the detector / image size / interval of the current level."""
+        tier, imgsz, interval = self.ladder[self.level]
+        detector = self.detectors[self._key(tier, imgsz)]
+        if getattr(cam, "detector", None) is not None:
+            detector.confidence = cam.detector.confidence # Keep the operator's sensitivity
+        detector.imgsz = imgsz
+        cam.detector = detector
+        cam.detect_interval = interval
+
+    def observe(self, latency):
+        """Records one frame's end-to-end latency (seconds). Returns True if the level changed."""
+        self.frames += 1
+        self.samples.append(latency)
+        if len(self.samples) < self.samples.maxlen or self.frames - self.changed_at < self.cooldown:
+            return False
+
+        self.p95 = float(np.percentile(self.samples, 95))
+        if self.p95 > self.budget and self.level < len(self.ladder) - 1:
+            self.over_budget[self.level] = self.frames
+            return self._step(+1)
+
+        if self.p95 < self.budget * self.upgrade_margin and self.level > 0:
+            failed_at = self.over_budget.get(self.level - 1)
+            if failed_at is None or self.frames - failed_at > MEMORY_FRAMES:
+                return self._step(-1)
+        return False
+
+    def _step(self, direction):
+        self.level += direction
+        self.changed_at = self.frames
+        self.samples.clear()
+        tier, imgsz, interval = self.ladder[self.level]
+        print(f"AutoTune: {'degrading' if direction > 0 else 'upgrading'} to yolov8{tier} @ {imgsz}, "
+              f"detect every {interval} frames (p95 {self.p95 * 1000:.0f} ms, "
+              f"budget {self.budget * 1000:.0f} ms)")
+        return True
+
+    def status(self):
+        tier, imgsz, interval = self.ladder[self.level]
+        return {"level": self.level, "model": MODEL_TIERS[tier], "imgsz": imgsz,
+                "detect_interval": interval, "p95_ms": round(self.p95 * 1000, 1),
+                "budget_ms": round(self.budget * 1000)}
@@ -0,0 +1,254 @@
+"""
+Offline batch analysis of recorded video.
+
+Processes video files as fast as the CPU allows (no display), with optional
+motion-gated and batched detection, and writes per-frame crowd metrics and
+per-track positions/speeds to columnar files for incident review and for
+tuning SURGE_THRESHOLD_* / DENSITY_* against long footage.
+
+    python batch_analysis.py footage/*.mp4 --out results/run1 --format parquet
+"""
+import argparse
+import csv
+import os
+import time
+import cv2
+import numpy as np
+import camera_system as cs
+from detector import HumanDetector
+from tracker import CentroidTracker
+from appearance import AppearanceEncoder
+
+# --- CONFIGURATION ---
+DETECT_INTERVAL = 5       # Detect every Nth frame, track in between (as in CameraSystem)
+BATCH_SIZE = 8            # Frames per batched detector call
+MOTION_THRESHOLD = 0.01   # Fraction of changed pixels below which detection is skipped
+MOTION_SIZE = (160, 120)  # Resolution of the motion-gate difference image
+WRITE_CHUNK = 50000       # Rows buffered per column file flush
+
+FRAME_COLUMNS = ["video", "frame", "time_s", "detected", "person_count", "moving_count",
+                 "avg_speed", "chaos_metric", "threat_level"]
+TRACK_COLUMNS = ["video", "frame", "time_s", "track_id", "x", "y", "speed"]
+
+
+class MotionGate:
+    """
+    Skips detection when the scene has not changed since the last detection.
+    Compares a small grayscale copy of the frame with the one last sent to the detector.
+    """
+    def __init__(self, threshold=MOTION_THRESHOLD, size=MOTION_SIZE, pixel_delta=25):
+        self.threshold = threshold
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.reference = None
+
+    def changed(self, frame):
+        small = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self.reference is None:
+            self.reference = small
+            return True
+        diff = cv2.absdiff(small, self.reference)
+        if np.count_nonzero(diff > self.pixel_delta) / float(diff.size) < self.threshold:
+            return False
+        self.reference = small
+        return True
+
+
+class ColumnWriter:
+    """Buffers rows column-wise and appends them to a CSV or Parquet file in chunks."""
+    def __init__(self, path, columns, fmt="csv"):
+        self.path = path
+        self.columns = columns
+        self.fmt = fmt
+        self.buffers = {c: [] for c in columns}
+        self.rows = 0
+        self.parquet_writer = None
+        self.csv_file = None
+
+        if fmt == "csv":
+            self.csv_file = open(path, "w", newline="")
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(columns)
+        elif fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401 - optional dependency, only needed for Parquet output
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow); use --format csv")
+        else:
+            raise ValueError(f"Unknown output format '{fmt}'")
+
+    def extend(self, **columns):
+        """Append many rows at once: each keyword is one column (array or list)."""
+        n = None
+        for name in self.columns:
+            values = columns[name]
+            if np.isscalar(values) or isinstance(values, str):
+                continue
+            n = len(values)
+            break
+        for name in self.columns:
+            values = columns[name]
+            if np.isscalar(values) or isinstance(values, str):
+                self.buffers[name].extend([values] * n)
+            else:
+                self.buffers[name].extend(values.tolist() if hasattr(values, "tolist") else values)
+        self.rows += n
+        if len(self.buffers[self.columns[0]]) >= WRITE_CHUNK:
+            self.flush()
+
+    def append(self, **row):
+        for name in self.columns:
+            self.buffers[name].append(row[name])
+        self.rows += 1
+        if len(self.buffers[self.columns[0]]) >= WRITE_CHUNK:
+            self.flush()
+
+    def flush(self):
+        if not self.buffers[self.columns[0]]:
+            return
+        if self.fmt == "csv":
+            self.csv_writer.writerows(zip(*(self.buffers[c] for c in self.columns)))
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({c: self.buffers[c] for c in self.columns})
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        self.buffers = {c: [] for c in self.columns}
+
+    def close(self):
+        self.flush()
+        if self.csv_file:
+            self.csv_file.close()
+        if self.parquet_writer:
+            self.parquet_writer.close()
+
+
+def analyze_video(path, detector, frame_writer, track_writer, detect_interval=DETECT_INTERVAL,
+                  batch_size=BATCH_SIZE, motion_gate=True, analyzer_kwargs=None):
+    """
+    Runs detection, tracking and analysis over one video file. Returns frames processed.
+    Tracking, density, optical flow and classification are set up as in CameraSystem
+    (camera_system.build_analyzer); analyzer_kwargs override analyzer settings.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"Could not open {path}")
+        return 0
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    tracker = CentroidTracker(max_disappeared=15, speed_history=cs.SPEED_HISTORY_LEN)
+    analyzer, flow = cs.build_analyzer(**(analyzer_kwargs or {}))
+    encoder = AppearanceEncoder() if cs.APPEARANCE_TRACKING else None
+    gate = MotionGate() if motion_gate else None
+    video = os.path.basename(path)
+
+    frame_index = 0
+    rects = []
+    done = False
+    while not done:
+        # 1. Read a chunk of frames
+        frames = []
+        while len(frames) < batch_size:
+            ok, frame = cap.read()
+            if not ok:
+                done = True
+                break
+            frames.append(cv2.resize(frame, (cs.WIDTH, cs.HEIGHT)))
+        if not frames:
+            break
+
+        # 2. Pick the detection frames (interval + motion gate) and detect them in one batch
+        detect_idx = [i for i in range(len(frames))
+                      if (frame_index + i + 1) % detect_interval == 0
+                      and (gate is None or gate.changed(frames[i]))]
+        detections = dict(zip(detect_idx, detector.detect_batch([frames[i] for i in detect_idx])))
+
+        # 3. Track / analyze every frame in order
+        for i in range(len(frames)):
+            frame_index += 1
+            embeddings = None
+            if i in detections:
+                rects = detections[i]
+                if encoder is not None:
+                    embeddings = encoder.encode(frames[i], rects)
+            tracker.update(rects, embeddings)
+            metrics = analyzer.analyze(tracker, flow.update(frames[i]) if flow else None)
+            t = frame_index / fps
+
+            frame_writer.append(video=video, frame=frame_index, time_s=round(t, 3),
+                                detected=i in detections,
+                                person_count=metrics["person_count"],
+                                moving_count=metrics["moving_count"],
+                                avg_speed=round(metrics["avg_speed"], 3),
+                                chaos_metric=metrics["chaos_metric"],
+                                threat_level=metrics["threat_level"])
+
+            slots = tracker.active_slots()
+            if len(slots):
+                speeds = np.zeros(tracker.capacity, dtype=np.float32)
+                speed_slots, speed_values = tracker.mean_speeds()
+                speeds[speed_slots] = speed_values
+                track_writer.extend(video=video, frame=frame_index, time_s=round(t, 3),
+                                    track_id=tracker.ids[slots],
+                                    x=tracker.centroids[slots, 0],
+                                    y=tracker.centroids[slots, 1],
+                                    speed=np.round(speeds[slots], 3))
+
+    cap.release()
+    return frame_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CrowdLumen offline video batch analysis")
+    parser.add_argument("videos", nargs="+", help="Recorded video files")
+    parser.add_argument("--out", default="batch_results", help="Output path prefix")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--model", default=cs.MODEL_PATH)
+    parser.add_argument("--backend", default=cs.DETECTOR_BACKEND)
+    parser.add_argument("--confidence", type=float, default=0.35)
+    parser.add_argument("--detect-interval", type=int, default=DETECT_INTERVAL)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--no-motion-gate", action="store_true")
+    # Thresholds under tuning
+    parser.add_argument("--surge-warning", type=float, default=cs.SURGE_THRESHOLD_WARNING)
+    parser.add_argument("--surge-critical", type=float, default=cs.SURGE_THRESHOLD_CRITICAL)
+    parser.add_argument("--density-warning", type=int, default=cs.DENSITY_WARNING)
+    parser.add_argument("--density-critical", type=int, default=cs.DENSITY_CRITICAL)
+    args = parser.parse_args()
+
+    detector = HumanDetector(model_path=args.model, confidence=args.confidence, backend=args.backend,
+                             int8=cs.DETECTOR_INT8, imgsz=cs.DETECTOR_IMGSZ)
+    analyzer_kwargs = dict(surge_warning=args.surge_warning, surge_critical=args.surge_critical,
+                           density_warning=args.density_warning, density_critical=args.density_critical)
+
+    out_dir = os.path.dirname(args.out)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    try:
+        frame_writer = ColumnWriter(f"{args.out}_frames.{args.format}", FRAME_COLUMNS, args.format)
+        track_writer = ColumnWriter(f"{args.out}_tracks.{args.format}", TRACK_COLUMNS, args.format)
+    except RuntimeError as e:
+        print(e)
+        return
+
+    try:
+        for path in args.videos:
+            start = time.perf_counter()
+            n = analyze_video(path, detector, frame_writer, track_writer,
+                              detect_interval=max(1, args.detect_interval),
+                              batch_size=max(1, args.batch_size),
+                              motion_gate=not args.no_motion_gate,
+                              analyzer_kwargs=analyzer_kwargs)
+            elapsed = time.perf_counter() - start
+            print(f"{path}: {n} frames in {elapsed:.1f}s ({n / max(elapsed, 1e-9):.1f} fps)")
+    finally:
+        frame_writer.close()
+        track_writer.close()
+
+    print(f"Wrote {frame_writer.path} and {track_writer.path}")
+
+
+if __name__ == "__main__":
+    main()
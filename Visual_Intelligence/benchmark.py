@@ -0,0 +1,320 @@
+"""
+Visual pipeline benchmark suite.
+
+Times each stage separately (HumanDetector.detect, CentroidTracker.update,
+analyze_threats, draw_corners) and the full process_ai path on synthetic
+frames with a controlled number of people, synthetic centroid streams of
+10-5000 objects and recorded clips. Results (latency percentiles, FPS, peak
+memory) are written as JSON so runs can be compared between commits.
+
+    python benchmark.py --clip footage/gate.mp4 --out bench_main.json
+    python benchmark.py --stages track analyze --compare bench_main.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+import camera_system as cs
+from tracker import CentroidTracker
+
+try:
+    import resource # Unix only, used for peak RSS
+except ImportError:
+    resource = None
+
+# --- CONFIGURATION ---
+STAGES = ["detect", "track", "analyze", "draw", "process_ai"]
+PEOPLE_COUNTS = [0, 5, 20, 50]               # People drawn into synthetic frames
+OBJECT_COUNTS = [10, 100, 500, 1000, 5000]   # Objects in synthetic centroid streams
+FRAMES = 100          # Timed iterations per case
+WARMUP = 5            # Untimed iterations per case (model warm-up, caches)
+MEMORY_FRAMES = 10    # Iterations re-run under tracemalloc for peak allocation
+SEED = 1234
+
+
+# --- Synthetic inputs ---
+def synthetic_frames(people, frames=None, size=(cs.WIDTH, cs.HEIGHT), seed=SEED):
+    """Frames with `people` simple standing figures (head + body) walking slowly."""
+    frames = FRAMES if frames is None else frames # Read at call time: --frames rebinds FRAMES
+    rng = np.random.default_rng(seed + people)
+    w, h = size
+    background = rng.integers(60, 120, (h, w, 3), dtype=np.uint8)
+    heights = rng.integers(60, 160, people)
+    pos = np.column_stack([rng.uniform(0, w, people), rng.uniform(0, h - 40, people)])
+    step = rng.normal(0, 2.0, (people, 2))
+    colors = rng.integers(0, 255, (people, 3))
+
+    out = []
+    for _ in range(frames):
+        img = background.copy()
+        pos = np.clip(pos + step, 0, [w - 1, h - 1])
+        for (cx, feet), ph, color in zip(pos.astype(int), heights, colors):
+            c = tuple(int(v) for v in color)
+            head = max(4, int(ph * 0.12))
+            top = feet - int(ph)
+            cv2.circle(img, (cx, top + head), head, (90, 140, 190), -1)
+            cv2.rectangle(img, (cx - int(ph * 0.18), top + 2 * head), (cx + int(ph * 0.18), feet), c, -1)
+        out.append(img)
+    return out
+
+
+def synthetic_rects(objects, frames=None, speed=3.0, box=20, seed=SEED):
+    """Bounding-box streams for `objects` random walkers, as the detector would return them."""
+    frames = FRAMES if frames is None else frames
+    rng = np.random.default_rng(seed + objects)
+    pos = rng.uniform([0, 0], [cs.WIDTH, cs.HEIGHT], (objects, 2))
+    out = []
+    for _ in range(frames):
+        pos = pos + rng.normal(0, speed, pos.shape)
+        x, y = pos[:, 0].astype(int), pos[:, 1].astype(int)
+        out.append(list(zip(x - box, y - box, x + box, y + box)))
+    return out
+
+
+def clip_frames(path, frames=None):
+    frames = FRAMES if frames is None else frames
+    cap = cv2.VideoCapture(path)
+    out = []
+    while len(out) < frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        out.append(cv2.resize(frame, (cs.WIDTH, cs.HEIGHT)))
+    cap.release()
+    if not out:
+        print(f"Could not read frames from {path}")
+    return out
+
+
+# --- Measurement ---
+def summarize(stage, source, n, samples_ns, peak_bytes=None, **extra):
+    ms = np.asarray(samples_ns, dtype=np.float64) / 1e6
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    result = {
+        "stage": stage,
+        "input": source,
+        "n": n,
+        "samples": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "fps": round(1000.0 / float(ms.mean()), 1) if ms.mean() > 0 else None,
+        "peak_alloc_kb": round(peak_bytes / 1024.0, 1) if peak_bytes is not None else None,
+    }
+    result.update(extra)
+    print(f"{stage:>10} {source:>12} n={n:<5} p50={result['p50_ms']:.3f}ms "
+          f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms fps={result['fps']}")
+    return result
+
+
+def run_case(setup, step, inputs, memory=True):
+    """
+    Times step(state, item) over inputs after a short warm-up.
+    setup() builds fresh state; it is called again for the tracemalloc pass.
+    Returns (samples_ns, peak_bytes allocated above the starting point).
+    """
+    state = setup()
+    for item in inputs[:WARMUP]:
+        step(state, item)
+
+    state = setup()
+    samples = np.empty(len(inputs), dtype=np.int64)
+    for i, item in enumerate(inputs):
+        t0 = time.perf_counter_ns()
+        step(state, item)
+        samples[i] = time.perf_counter_ns() - t0
+
+    peak = None
+    if memory:
+        # Separate pass: tracemalloc slows every allocation, so it never overlaps timing
+        state = setup()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        for item in inputs[:MEMORY_FRAMES]:
+            step(state, item)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+    return samples, peak
+
+
+# --- Stages ---
+def bench_detect(cam, frame_sets):
+    results = []
+    for source, n, frames in frame_sets:
+        boxes = []
+        def step(_, frame):
+            boxes.append(len(cam.detector.detect(frame)))
+        samples, peak = run_case(lambda: None, step, frames)
+        results.append(summarize("detect", source, n, samples, peak,
+                                 mean_boxes=round(float(np.mean(boxes)), 1) if boxes else 0.0))
+    return results
+
+
+def bench_track(object_counts):
+    results = []
+    for n in object_counts:
+        rects = synthetic_rects(n)
+        new_tracker = lambda: CentroidTracker(max_disappeared=15, speed_history=cs.SPEED_HISTORY_LEN)
+        samples, peak = run_case(new_tracker, lambda t, r: t.update(r), rects)
+        results.append(summarize("track", "synthetic", n, samples, peak))
+    return results
+
+
+def bench_analyze(cam, object_counts):
+    results = []
+    for n in object_counts:
+        # The tracker is advanced outside the timed call so speed history and
+        # moving counts are realistic; only analyze_threats is measured.
+        rects = synthetic_rects(n, WARMUP + FRAMES + MEMORY_FRAMES)
+        cam.tracker = CentroidTracker(max_disappeared=15, speed_history=cs.SPEED_HISTORY_LEN)
+        samples = np.empty(FRAMES, dtype=np.int64)
+        peak = 0
+        for i, r in enumerate(rects):
+            cam.tracker.update(r)
+            if i < WARMUP + FRAMES:
+                t0 = time.perf_counter_ns()
+                cam.analyze_threats(cam.tracker.objects)
+                if i >= WARMUP:
+                    samples[i - WARMUP] = time.perf_counter_ns() - t0
+            else:
+                # Trailing memory pass, kept apart from the timed calls
+                tracemalloc.start()
+                base = tracemalloc.get_traced_memory()[0]
+                cam.analyze_threats(cam.tracker.objects)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+                tracemalloc.stop()
+        results.append(summarize("analyze", "synthetic", n, samples, peak))
+    return results
+
+
+def bench_draw(cam, object_counts):
+    results = []
+    canvas = np.zeros((cs.HEIGHT, cs.WIDTH, 3), dtype=np.uint8)
+    for n in object_counts:
+        rects = synthetic_rects(n)
+        # draw_overlay is the per-frame loop over draw_corners
+        samples, peak = run_case(lambda: None,
+                                 lambda _, r: cam.draw_overlay(canvas, r, "NORMAL"), rects)
+        results.append(summarize("draw", "synthetic", n, samples, peak))
+    return results
+
+
+def bench_process_ai(cam, frame_sets):
+    results = []
+    for source, n, frames in frame_sets:
+        def setup():
+            cam.tracker = CentroidTracker(max_disappeared=15, speed_history=cs.SPEED_HISTORY_LEN)
+            cam.frame_counter = 0
+            cam.last_rects = []
+            return cam
+
+        # process_ai draws into the frame, so give it a copy (copy cost is outside the sample)
+        samples, peak = run_case(setup, lambda c, f: c.process_ai(f), [f.copy() for f in frames])
+        results.append(summarize("process_ai", source, n, samples, peak))
+    return results
+
+
+# --- Reporting ---
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss // 1024 if platform.system() == "Darwin" else rss
+
+
+def compare(results, baseline_path):
+    """Prints p50/p95 change against a previous benchmark JSON."""
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["input"], r["n"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r["stage"], r["input"], r["n"]))
+        if old is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if old[key]:
+                change = (r[key] - old[key]) / old[key] * 100.0
+                print(f"{r['stage']:>10} {r['input']:>12} n={r['n']:<5} {key}: "
+                      f"{old[key]:.3f} -> {r[key]:.3f} ({change:+.1f}%)")
+
+
+def main():
+    global FRAMES
+    parser = argparse.ArgumentParser(description="CrowdLumen visual pipeline benchmark")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--people", nargs="+", type=int, default=PEOPLE_COUNTS)
+    parser.add_argument("--objects", nargs="+", type=int, default=OBJECT_COUNTS)
+    parser.add_argument("--clip", action="append", default=[], help="Recorded clip (repeatable)")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--compare", help="Previous benchmark JSON to diff against")
+    args = parser.parse_args()
+    FRAMES = max(args.frames, 1)
+
+    results = []
+    needs_cam = any(s in args.stages for s in ("detect", "analyze", "draw", "process_ai"))
+    cam = None
+    if needs_cam:
+        # Local, camera-less CameraSystem with the configured detector backend
+        cs.PIPELINE_MODE = False
+        cam = cs.CameraSystem(start_camera=False)
+
+    frame_sets = []
+    if any(s in args.stages for s in ("detect", "process_ai")):
+        frame_sets = [("synthetic", n, synthetic_frames(n, FRAMES)) for n in args.people]
+        frame_sets += [(path, 0, frames) for path in args.clip if (frames := clip_frames(path, FRAMES))]
+
+    if "detect" in args.stages:
+        results += bench_detect(cam, frame_sets)
+    if "track" in args.stages:
+        results += bench_track(args.objects)
+    if "analyze" in args.stages:
+        results += bench_analyze(cam, args.objects)
+    if "draw" in args.stages:
+        results += bench_draw(cam, args.objects)
+    if "process_ai" in args.stages:
+        results += bench_process_ai(cam, frame_sets)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "model": cs.MODEL_PATH,
+            "backend": getattr(cam.detector, "backend", None) if cam else None,
+            "imgsz": getattr(cam.detector, "imgsz", None) if cam else None,
+            "frames": FRAMES,
+        },
+        "peak_rss_kb": peak_rss_kb(),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out} (peak RSS {report['peak_rss_kb']} KiB)")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
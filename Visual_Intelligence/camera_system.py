@@ -1,8 +1,19 @@
 import cv2
 import time
-import numpy as np
+from threading import Lock
 from detector import HumanDetector
 from tracker import CentroidTracker
+from appearance import AppearanceEncoder
+from trajectory import TrajectoryRecorder
+from crowd_analyzer import CrowdAnalyzer
+from density import DensityGrid
+from flow import FlowEstimator
+from tripwire import TripwireCounter, TripwireReporter, BACKEND_URL
+from roi import RegionTiler
+from capture import ThreadedCamera
+from pipeline import VisualPipeline
+from autotune import AutoTuner
+from metrics import PipelineMetrics
 
 # --- CONFIGURATION ---
 WIDTH, HEIGHT = 640, 480
@@ -12,65 +23,145 @@ SURGE_THRESHOLD_CRITICAL = 25.0
 DENSITY_WARNING = 8
 DENSITY_CRITICAL = 12
 
-from threading import Thread
+# Spatial density: track positions binned into a decaying grid heatmap, plus
+# operator zones (display-pixel polygons) with their own capacity, e.g.
+# [{"name": "Exit A", "polygon": [(0, 300), (200, 300), (200, 480), (0, 480)], "capacity": 6}]
+DENSITY_GRID = (16, 12) # Columns, rows
+DENSITY_ZONES = []
+SHOW_DENSITY_HEATMAP = True
+
+# Optical-flow crowd motion (every frame, low resolution) for surge detection when
+# detection breaks down in dense crowds: "assist" (faster of tracks / flow),
+# "replace" (flow only) or "off". Off by default: check flow speeds against track
+# speeds on the venue's own cameras before relying on it.
+FLOW_MODE = "off"
+SHOW_FLOW_VECTORS = False
+
+# Virtual gates (display pixels, y pointing down). An entry is a crossing onto the side of
+# p1 -> p2 that the line reaches when turned clockwise on screen ((p2 - p1) x (c - p1) > 0);
+# the opposite crossing is an exit, and swapping p1 / p2 flips both. Examples: p1 (320, 0) ->
+# p2 (320, 480), drawn top to bottom, counts right-to-left movement on screen as entries;
+# p1 (0, 240) -> p2 (640, 240), drawn left to right, counts downward movement as entries.
+# Counts are posted in batches to the RFID backend (venue_id None = current venue), e.g.
+# [{"name": "Door A", "p1": (320, 0), "p2": (320, 480), "venue_id": 1}]
+TRIPWIRES = []
+TRIPWIRE_BACKEND_URL = BACKEND_URL # None = count locally only
+
+# Appearance embeddings (HSV color histograms, computed on detection frames only)
+# make tracking robust to people crossing paths, and let a CrossCameraMerger
+# (appearance.py) count people in the overlap of two cameras only once.
+APPEARANCE_TRACKING = True
+
+# Directory for the compact trajectory archive (trajectory.py); None = not recorded.
+# Query it later with trajectory.TrajectoryArchive(dir).query(t0, t1, region).
+TRAJECTORY_ARCHIVE = None
+
+# Detector / inference backend ("pytorch", "onnx" or "openvino"). ONNX / OpenVINO are
+# opt-in: they need requirements-optional.txt installed, and the first start
+# exports the model (cached in model_cache/ afterwards).
+MODEL_PATH = 'yolov8m.pt'
+DETECTOR_BACKEND = "pytorch"
+DETECTOR_INT8 = False
+DETECTOR_IMGSZ = 640
+DETECT_INTERVAL = 5 # Detect every Nth frame, track in between
+
+# Latency budget: with AUTOTUNE on, model tier (n/s/m), inference size and detection
+# interval are stepped along autotune.QUALITY_LADDER to hold the p95 frame latency
+# under LATENCY_BUDGET_MS. All tiers are preloaded. Not used in PIPELINE_MODE.
+AUTOTUNE = False
+LATENCY_BUDGET_MS = 150
+
+# Region-of-interest / tiled inference for wide-angle, high-resolution cameras.
+# With TILED_INFERENCE on, the camera is opened at CAPTURE_WIDTH x CAPTURE_HEIGHT and
+# detection runs on native-resolution tiles covering ROI_POLYGONS (native pixel
+# coordinates, e.g. [[(0, 400), (1920, 400), (1920, 1080), (0, 1080)]]; empty = whole frame).
+TILED_INFERENCE = False
+CAPTURE_WIDTH, CAPTURE_HEIGHT = 1920, 1080
+ROI_POLYGONS = []
+
+# Pipeline mode: resize, detection (separate process), tracking/analysis and
+# rendering run as concurrent stages instead of one after another per frame.
+PIPELINE_MODE = False
+
+CAPTURE_TIMEOUT = 1.0 # Seconds to wait for a new camera frame before reporting no signal
+JPEG_QUALITY = 80     # get_frame() encoding for feed / stream consumers
+JPEG_SIZE = None      # (width, height) to downscale to before encoding, None = as processed
+
+THREAT_COLORS = {
+    "NORMAL": "var(--status-normal)",
+    "WARNING": "var(--status-warning)",
+    "CRITICAL": "var(--status-critical)"
+}
+
+def build_analyzer(**overrides):
+    """
+    CrowdAnalyzer (with its DensityGrid) and FlowEstimator (None when flow is off) set up
+    from this module's settings. CameraSystem and batch_analysis.py both build theirs here,
+    so offline runs classify frames by the same rules as the live system. overrides replace
+    CrowdAnalyzer arguments, e.g. thresholds under tuning.
+    """
+    kwargs = dict(surge_warning=SURGE_THRESHOLD_WARNING,
+                  surge_critical=SURGE_THRESHOLD_CRITICAL,
+                  density_warning=DENSITY_WARNING,
+                  density_critical=DENSITY_CRITICAL,
+                  density=DensityGrid((WIDTH, HEIGHT), *DENSITY_GRID, zones=DENSITY_ZONES),
+                  flow_mode=FLOW_MODE)
+    kwargs.update(overrides)
+    flow = FlowEstimator((WIDTH, HEIGHT)) if kwargs["flow_mode"] != "off" else None
+    return CrowdAnalyzer(**kwargs), flow
 
-class ThreadedCamera:
-    def __init__(self, src=0, width=640, height=480):
-        self.src = src
-        self.width = width
-        self.height = height
-        self.cap = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
-        if not self.cap.isOpened():
-             self.cap = cv2.VideoCapture(self.src)
-        
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-        
-        self.grabbed, self.frame = self.cap.read()
-        self.stopped = False
-        self.update_thread = None
-
-    def start(self):
-        self.update_thread = Thread(target=self.update, args=())
-        self.update_thread.daemon = True
-        self.update_thread.start()
-        return self
-
-    def update(self):
-        while True:
-            if self.stopped:
-                return
-            
-            grabbed, frame = self.cap.read()
-            if grabbed:
-                self.grabbed = grabbed
-                self.frame = frame
-    
-    def read(self):
-        return self.grabbed, self.frame
-
-    def stop(self):
-        self.stopped = True
-        if self.update_thread:
-            self.update_thread.join()
-        self.cap.release()
 
 class CameraSystem:
-    def __init__(self):
+    def __init__(self, start_camera=True, camera_id=0, merger=None):
         self.camera_index = 0
+        self.camera_id = camera_id # Identity of this camera within a CrossCameraMerger
+        self.merger = merger
         self.stream = None # Threaded Camera
-        # Use Medium model for 'training' equivalent (better accuracy) but can be heavy.
-        # We will optimize by tracking more frames between detections.
-        self.detector = HumanDetector(model_path='yolov8m.pt', confidence=0.35) 
-        self.tracker = CentroidTracker(max_disappeared=15)
+        # Medium model for accuracy, tracked between detections; on CPU-only boxes it
+        # can run through an exported ONNX / OpenVINO (optionally INT8) backend.
+        detector_kwargs = dict(model_path=MODEL_PATH, confidence=0.35, backend=DETECTOR_BACKEND,
+                               int8=DETECTOR_INT8, imgsz=DETECTOR_IMGSZ)
+        self.pipeline = None
+        self.autotuner = None
+        self.detect_interval = DETECT_INTERVAL
+        if PIPELINE_MODE:
+            # The model lives in the detector process; self.detector is a settings handle
+            self.pipeline = VisualPipeline(
+                self, detector_kwargs, (WIDTH, HEIGHT),
+                detect_shape=(CAPTURE_HEIGHT, CAPTURE_WIDTH, 3) if TILED_INFERENCE else None,
+                roi_polygons=ROI_POLYGONS if TILED_INFERENCE else None,
+                appearance=APPEARANCE_TRACKING)
+            self.detector = self.pipeline.detector
+        elif AUTOTUNE:
+            self.detector = None
+            self.autotuner = AutoTuner(detector_kwargs, budget_ms=LATENCY_BUDGET_MS)
+            self.autotuner.apply(self)
+        else:
+            self.detector = HumanDetector(**detector_kwargs)
+        self.tracker = CentroidTracker(max_disappeared=15, speed_history=SPEED_HISTORY_LEN)
+        self.encoder = AppearanceEncoder() if APPEARANCE_TRACKING else None
+        self.trajectories = TrajectoryRecorder(TRAJECTORY_ARCHIVE) if TRAJECTORY_ARCHIVE else None
+        self.analyzer, self.flow = build_analyzer()
+        self.last_flow = None
+        self.tripwires = TripwireCounter(TRIPWIRES) if TRIPWIRES else None
+        self.tripwire_reporter = None
+        if self.tripwires and TRIPWIRE_BACKEND_URL:
+            self.tripwire_reporter = TripwireReporter(self.tripwires, url=TRIPWIRE_BACKEND_URL).start()
         
         # State
         self.frame_counter = 0
         self.last_rects = []
-        
-        # Analysis Data
-        self.prev_centroids = {}
-        self.object_speeds = {}
+        self.tiler = None # Built lazily for the native frame size
+        self.last_seq = 0 # Sequence number of the last camera frame processed
+        self.metrics = PipelineMetrics() # Per-stage timers, exposed in status_data["perf"] and /metrics
+
+        # Latest processed (BGR) frame, JPEG-encoded on demand once per frame
+        self.frame_seq = 0
+        self.latest_bgr = None
+        self.jpeg_lock = Lock()
+        self.jpeg_seq = -1
+        self.jpeg_bytes = None
+        self.read_lock = Lock() # Serializes read_jpeg() callers sharing this system
         
         # Public Metrics
         self.status_data = {
@@ -81,63 +172,198 @@ class CameraSystem:
             "reason": "System Initialized. Monitoring...",
             "history": [] # For graph
         }
+        self.view_status = self.status_data # Status of the frame read_jpeg() hands out
+        self.closed = False
         
-        self.open_camera(0)
+        if start_camera:
+            self.open_camera(0)
 
     def open_camera(self, index):
         if self.stream:
             self.stream.stop()
         try:
-            self.stream = ThreadedCamera(index, WIDTH, HEIGHT).start()
+            if TILED_INFERENCE:
+                self.stream = ThreadedCamera(index, CAPTURE_WIDTH, CAPTURE_HEIGHT, metrics=self.metrics).start()
+            else:
+                self.stream = ThreadedCamera(index, WIDTH, HEIGHT, metrics=self.metrics).start()
+            self.metrics.camera = self.stream
             self.camera_index = index
+            self.last_seq = 0
+            if self.pipeline:
+                if self.pipeline.stream is None:
+                    self.pipeline.start(self.stream)
+                else:
+                    self.pipeline.set_stream(self.stream)
         except Exception as e:
             print(f"Camera Error: {e}")
 
+    def close(self):
+        """Stops the camera and, in pipeline mode, the stage threads and detector process."""
+        self.closed = True
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.tripwire_reporter:
+            self.tripwire_reporter.stop()
+        if self.trajectories:
+            self.trajectories.close()
+        if self.stream:
+            self.stream.stop()
+            self.stream = None
+
     def read_processed_frame(self):
         """Returns (frame_rgb, status_data) for Streamlit"""
+        frame_bgr, status = self.process_next_frame()
+        if frame_bgr is None:
+            return None, status
+        # Convert to RGB for Streamlit/PIL
+        return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB), status
+
+    def read_jpeg(self, last_seq=None):
+        """
+        (seq, jpeg_bytes, status) like RemoteCameraSystem.read_jpeg, without an RGB copy:
+        the bytes are get_frame()'s, encoded once per frame. Viewers sharing this system
+        pass the seq they last showed; the first to ask processes the next camera frame
+        and the others get the same bytes. jpeg is None if no frame arrived in time.
+        """
+        with self.read_lock:
+            if last_seq is None or last_seq == self.frame_seq:
+                frame_bgr, self.view_status = self.process_next_frame()
+                if frame_bgr is None:
+                    return last_seq, None, self.view_status
+            return self.frame_seq, self.get_frame(), self.view_status
+
+    def process_next_frame(self):
+        """Processes the next camera frame. Returns (frame_bgr, status_data), frame None on timeout."""
         if not self.stream:
              return None, self.status_data
 
-        success, frame = self.stream.read()
-        if not success or frame is None:
+        if self.pipeline:
+            # Stages run on their own threads / process; just take the newest render
+            seq, frame_bgr, status = self.pipeline.read(self.last_seq, timeout=CAPTURE_TIMEOUT)
+            if frame_bgr is None:
+                return None, self.status_data
+            self.last_seq = seq
+            self.publish_frame(frame_bgr)
+            return frame_bgr, self.with_perf(status)
+
+        # Block until the camera publishes a frame we have not processed yet
+        packet = self.stream.read_next(self.last_seq, timeout=CAPTURE_TIMEOUT)
+        if packet is None:
             return None, self.status_data
+        self.last_seq = packet.seq
+        frame = packet.frame
 
-        # Resize & Process
+        # Resize & Process (keep the native frame for tiled detection)
+        native = frame
+        t0 = time.perf_counter()
         frame = cv2.resize(frame, (WIDTH, HEIGHT))
-        processed_frame = self.process_ai(frame)
-        
-        # Convert to RGB for Streamlit/PIL
-        frame_rgb = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-        return frame_rgb, self.status_data
+        self.metrics.observe("resize", time.perf_counter() - t0)
+        processed_frame = self.process_ai(frame, native if TILED_INFERENCE else None)
+        self.publish_frame(processed_frame)
+        self.metrics.frame_done(packet.timestamp)
+        if self.autotuner and self.autotuner.observe(time.time() - packet.timestamp):
+            self.autotuner.apply(self)
+
+        self.status_data = self.with_perf(self.status_data)
+        return processed_frame, self.status_data
+
+    def with_perf(self, status):
+        """status_data plus the current performance summary."""
+        self.metrics.set_status(status)
+        return dict(status, perf=self.metrics.snapshot())
+
+    def publish_frame(self, frame_bgr):
+        with self.jpeg_lock:
+            self.latest_bgr = frame_bgr
+            self.frame_seq += 1
 
     def get_frame(self):
-        """Used by the MJPEG streamer"""
-        # ... logic for MJPEG if needed, but we focus on Streamlit now ...
-        pass 
+        """
+        Latest processed frame as JPEG bytes (None before the first frame).
+        Encoded at most once per frame however many consumers ask for it.
+        """
+        with self.jpeg_lock:
+            if self.latest_bgr is None:
+                return None
+            if self.jpeg_seq != self.frame_seq:
+                frame = self.latest_bgr
+                if JPEG_SIZE is not None and (frame.shape[1], frame.shape[0]) != tuple(JPEG_SIZE):
+                    frame = cv2.resize(frame, tuple(JPEG_SIZE), interpolation=cv2.INTER_AREA)
+                t0 = time.perf_counter()
+                ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+                self.metrics.observe("encode", time.perf_counter() - t0)
+                if ok:
+                    self.jpeg_bytes = buf.tobytes()
+                    self.jpeg_seq = self.frame_seq
+            return self.jpeg_bytes
+
+    def detect(self, frame, native=None):
+        """Person boxes in display (WIDTH x HEIGHT) coordinates."""
+        if native is None:
+            return self.detector.detect(frame)
+
+        h, w = native.shape[:2]
+        if self.tiler is None or self.tiler.frame_shape != (h, w):
+            self.tiler = RegionTiler(native.shape, ROI_POLYGONS, tile_size=DETECTOR_IMGSZ)
 
-    def process_ai(self, frame):
+        # Detect at native resolution, then scale boxes down to the display frame
+        sx = frame.shape[1] / float(w)
+        sy = frame.shape[0] / float(h)
+        return [(int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))
+                for (x1, y1, x2, y2) in self.tiler.detect(self.detector, native)]
+
+    def process_ai(self, frame, native=None):
         self.frame_counter += 1
         
-        # 1. Detect (Every 5th frame instead of 3rd for speed + smoothness)
-        # Tracking handles the in-between frames efficiently.
-        if self.frame_counter % 5 == 0:
-            self.last_rects = self.detector.detect(frame)
+        # 1. Detect (Every DETECT_INTERVAL-th frame for speed + smoothness; the
+        # auto-tuner may widen it). Tracking handles the in-between frames efficiently.
+        metrics = self.metrics
+        t0 = time.perf_counter()
+        detected = self.frame_counter % self.detect_interval == 0
+        if detected:
+            self.last_rects = self.detect(frame, native)
+            t1 = time.perf_counter()
+            metrics.observe("detect", t1 - t0)
+            t0 = t1
         
         rects = self.last_rects
         
-        # 2. Track (Every frame for smoothness)
-        objects = self.tracker.update(rects)
+        # 2. Track (Every frame for smoothness). Appearance is only encoded for fresh
+        # detections; in between, the same boxes are re-matched on distance alone.
+        embeddings = None
+        if detected and self.encoder is not None:
+            embeddings = self.encoder.encode(frame, rects)
+        objects = self.tracker.update(rects, embeddings)
+        metrics.observe("track", time.perf_counter() - t0)
+
+        # 3. Crowd motion from optical flow (also every frame, no detector needed)
+        self.update_flow(frame)
         
-        # 3. Analyze
+        # 4. Analyze
+        t1 = time.perf_counter()
         self.analyze_threats(objects)
+        t2 = time.perf_counter()
+        metrics.observe("analyze", t2 - t1)
         
-        # 4. Draw Overlay (Professional Corners)
+        # 5. Draw Overlay (Professional Corners)
+        frame = self.draw_overlay(frame, rects, self.status_data["threat_level"])
+        metrics.observe("draw", time.perf_counter() - t2)
+        return frame
+
+    def draw_overlay(self, frame, rects, threat_level):
+        # Determine color based on threat
+        color = (0, 255, 0)
+        if threat_level == "WARNING": color = (0, 255, 255)
+        elif threat_level == "CRITICAL": color = (0, 0, 255)
+
+        if SHOW_DENSITY_HEATMAP:
+            self.analyzer.density.overlay(frame)
+        if SHOW_FLOW_VECTORS and self.flow is not None:
+            self.flow.overlay(frame)
+        if self.tripwires:
+            self.tripwires.overlay(frame)
+
         for (x1, y1, x2, y2) in rects:
-            # Determine color based on threat
-            color = (0, 255, 0)
-            if self.status_data["threat_level"] == "WARNING": color = (0, 255, 255)
-            elif self.status_data["threat_level"] == "CRITICAL": color = (0, 0, 255)
-            
             # Draw professional corners instead of full box
             self.draw_corners(frame, (x1, y1), (x2, y2), color)
             
@@ -162,92 +388,46 @@ class CameraSystem:
         cv2.line(img, (x2, y2), (x2 - d, y2), color, thickness)
         cv2.line(img, (x2, y2), (x2, y2 - d), color, thickness)
 
-    def analyze_threats(self, objects):
-        current_ids = list(objects.keys())
-        total_speed = 0
-        moving_people_count = 0
-        
-        # --- Speed Analysis ---
-        for obj_id, centroid in objects.items():
-            if obj_id in self.prev_centroids:
-                prev_c = self.prev_centroids[obj_id]
-                dist = np.linalg.norm(np.array(centroid) - np.array(prev_c))
-                
-                # Update history
-                if obj_id not in self.object_speeds:
-                    self.object_speeds[obj_id] = []
-                self.object_speeds[obj_id].append(dist)
-                if len(self.object_speeds[obj_id]) > SPEED_HISTORY_LEN:
-                    self.object_speeds[obj_id].pop(0)
-                
-                # Get smoothed speed
-                avg_obj_speed = np.mean(self.object_speeds[obj_id])
-                
-                # IGNORE MINOR MOVEMENT (Walking/Fidgeting)
-                if avg_obj_speed > 3.0: 
-                    total_speed += avg_obj_speed
-                    moving_people_count += 1
-            
-            self.prev_centroids[obj_id] = centroid
-
-        # Cleanup
-        for old_id in list(self.prev_centroids.keys()):
-            if old_id not in current_ids:
-                del self.prev_centroids[old_id]
-                if old_id in self.object_speeds:
-                    del self.object_speeds[old_id]
-
-        # --- Crowd Metrics ---
-        count = len(objects)
-        # Average speed of the *moving* crowd only (to catch surges)
-        avg_crowd_speed = (total_speed / moving_people_count) if moving_people_count > 0 else 0
-        
-        # Chaos Metric (Scaled 0-100 for UI)
-        chaos_val = min((avg_crowd_speed / 20.0) * 100, 100)
-        
-        # --- Threat Logic ---
-        threat = "NORMAL"
-        color = "var(--status-normal)"
-        reason = "Stable conditions. Movement is within normal limits."
-        
-        # 1. Check Surge (Speed)
-        if avg_crowd_speed > SURGE_THRESHOLD_CRITICAL and moving_people_count > 2:
-            threat = "CRITICAL"
-            color = "var(--status-critical)"
-            reason = "CRITICAL: RAPID CROWD SURGE DETECTED (High Velocity)"
-        elif avg_crowd_speed > SURGE_THRESHOLD_WARNING and moving_people_count > 2:
-            threat = "WARNING"
-            color = "var(--status-warning)"
-            reason = "WARNING: Crowd movement is accelerating abnormally."
-        
-        # 2. Check Density (Count) - Override if higher threat
-        elif count > DENSITY_CRITICAL:
-             if threat != "CRITICAL":
-                threat = "CRITICAL"
-                color = "var(--status-critical)"
-                reason = "CRITICAL: Severe Overcrowding. Capacity limit breached."
-        elif count > DENSITY_WARNING:
-             if threat == "NORMAL": # Don't downgrade a speed warning
-                threat = "WARNING"
-                color = "var(--status-warning)"
-                reason = "WARNING: Crowd density is high."
-        
-        # 3. Stability Check (If chaos is very low but count is high -> Stationary Crowd)
-        if threat == "NORMAL" and count > 0:
-            reason = f"Monitoring {count} individuals. Behavior is stable."
+    def update_flow(self, frame):
+        """Optical-flow summary for this (clean, display-size) frame, used by analyze_threats."""
+        if self.flow is None:
+            return
+        t0 = time.perf_counter()
+        self.last_flow = self.flow.update(frame)
+        self.metrics.observe("flow", time.perf_counter() - t0)
 
-        # History update
-        history = self.status_data.get("history", [])
-        history.append(int(chaos_val))
-        if len(history) > 50:
-            history.pop(0)
+    def analyze_threats(self, objects):
+        metrics = self.analyzer.analyze(self.tracker, self.last_flow)
+        if self.tripwires:
+            self.tripwires.update(self.tracker)
+        if self.merger:
+            self.merger.update(self.camera_id, self.tracker)
+        if self.trajectories:
+            self.trajectories.record(self.tracker)
 
         # Update State
         self.status_data = {
-            "threat_level": threat,
-            "threat_color": color,
-            "person_count": count,
-            "chaos_metric": int(chaos_val),
-            "reason": reason,
-            "history": history
+            "threat_level": metrics["threat_level"],
+            "threat_color": THREAT_COLORS[metrics["threat_level"]],
+            "person_count": metrics["person_count"],
+            "chaos_metric": metrics["chaos_metric"],
+            "reason": metrics["reason"],
+            "history": metrics["history"],
+            "density": metrics.get("density"),
+            "flow": metrics.get("flow"),
+            "surge_source": metrics["surge_source"],
+            "gates": self.tripwires.summary() if self.tripwires else [],
+            "autotune": self.autotuner.status() if self.autotuner else None,
+            "unique_count": self.merger.unique_count() if self.merger else None
         }
+
+    def detector_failed(self, message):
+        """
+        Flags status_data when detection is down (pipeline detector process error
+        or crash): the counts below are stale, not an empty scene.
+        """
+        self.status_data = dict(self.status_data,
+                                threat_level="CRITICAL",
+                                threat_color=THREAT_COLORS["CRITICAL"],
+                                reason=f"Detector Error: {message}",
+                                detector_error=message)
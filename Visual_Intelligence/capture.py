@@ -0,0 +1,221 @@
+import cv2
+import time
+import numpy as np
+from collections import deque
+from threading import Thread, Condition
+
+# --- CONFIGURATION ---
+RING_SIZE = 4               # Preallocated frame buffers per camera (min 3)
+POLICY_LATEST = "latest"    # Consumer only ever sees the newest frame; older ones are dropped
+POLICY_QUEUE = "queue"      # Consumer sees every frame in order; oldest dropped when the ring is full
+READ_RETRY_DELAY = 0.01     # Back-off after a failed grab on a live camera
+
+
+class FramePacket:
+    """One captured frame. `frame` is a view into the camera ring buffer."""
+    __slots__ = ("seq", "timestamp", "frame")
+
+    def __init__(self, seq, timestamp, frame):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.frame = frame
+
+
+class ThreadedCamera:
+    """
+    Background capture into a preallocated ring of frame buffers.
+
+    Every published frame gets a monotonic sequence number and a capture
+    timestamp. Consumers call read_next(last_seq) and block on a condition
+    until a newer frame exists, so a frame is never handed out twice. The
+    buffer returned to the consumer is not reused by the capture thread
+    until that consumer asks for its next frame.
+    """
+    def __init__(self, src=0, width=640, height=480, ring_size=RING_SIZE, policy=POLICY_LATEST, metrics=None):
+        if policy not in (POLICY_LATEST, POLICY_QUEUE):
+            raise ValueError(f"Unknown drop policy '{policy}'")
+        self.src = src
+        self.width = width
+        self.height = height
+        self.policy = policy
+        self.ring_size = max(3, ring_size)
+        self.is_file = isinstance(src, str)
+        self.metrics = metrics      # Optional PipelineMetrics; "capture" stage = grab + decode
+
+        if self.is_file:
+            self.cap = cv2.VideoCapture(self.src)
+        else:
+            self.cap = cv2.VideoCapture(self.src, cv2.CAP_DSHOW)
+            if not self.cap.isOpened():
+                self.cap = cv2.VideoCapture(self.src)
+
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+        self.cond = Condition()
+        self.ring = None
+        self.slot_seq = [0] * self.ring_size
+        self.slot_ts = [0.0] * self.ring_size
+        self.latest_slot = -1       # POLICY_LATEST: newest published slot
+        self.pending = deque()      # POLICY_QUEUE: published, not yet consumed slots
+        self.held = -1              # Slot currently lent to the consumer
+        self.write_slot = -1
+
+        # Sequence / health counters
+        self.seq = 0                # Last published sequence number
+        self.consumed_seq = 0       # Last sequence number handed to the consumer
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_failures = 0
+
+        self.stopped = False
+        self.update_thread = None
+
+        # Prime the ring with the first frame so the buffer shape is known
+        grabbed, frame = self.cap.read()
+        self.grabbed = grabbed
+        if grabbed:
+            self._allocate(frame)
+            self.ring[0][...] = frame
+            self.write_slot = 0
+            self._publish(0, time.time())
+
+    def _allocate(self, frame):
+        self.ring = np.empty((self.ring_size,) + frame.shape, dtype=frame.dtype)
+
+    def start(self):
+        self.update_thread = Thread(target=self.update, args=())
+        self.update_thread.daemon = True
+        self.update_thread.start()
+        return self
+
+    def _next_write_slot(self):
+        # Pick a buffer that is neither lent out nor waiting to be consumed
+        with self.cond:
+            for offset in range(1, self.ring_size + 1):
+                slot = (self.write_slot + offset) % self.ring_size
+                if slot == self.held:
+                    continue
+                if self.policy == POLICY_LATEST and slot == self.latest_slot:
+                    continue
+                if self.policy == POLICY_QUEUE and slot in self.pending:
+                    continue
+                return slot
+
+            # Queue full: drop the oldest unconsumed frame and reuse its buffer
+            slot = self.pending.popleft()
+            self.frames_dropped += 1
+            return slot
+
+    def _publish(self, slot, timestamp):
+        with self.cond:
+            self.seq += 1
+            self.frames_captured += 1
+            self.slot_seq[slot] = self.seq
+            self.slot_ts[slot] = timestamp
+            if self.policy == POLICY_LATEST:
+                # The previous latest frame was never read - it is now dropped
+                if self.latest_slot >= 0 and self.slot_seq[self.latest_slot] > self.consumed_seq:
+                    self.frames_dropped += 1
+                self.latest_slot = slot
+            else:
+                self.pending.append(slot)
+            self.cond.notify_all()
+
+    def update(self):
+        while not self.stopped:
+            if self.ring is None:
+                grabbed, frame = self.cap.read()
+                if grabbed:
+                    self._allocate(frame)
+                    self.ring[0][...] = frame
+                    self.write_slot = 0
+                    self._publish(0, time.time())
+                elif not self._handle_failure():
+                    return
+                continue
+
+            slot = self._next_write_slot()
+            buf = self.ring[slot]
+
+            # Decode straight into the ring buffer (no per-frame allocation)
+            t0 = time.perf_counter()
+            grabbed, frame = self.cap.read(buf)
+            timestamp = time.time()
+            if self.metrics is not None:
+                self.metrics.observe("capture", time.perf_counter() - t0)
+            if not grabbed:
+                if not self._handle_failure():
+                    return
+                continue
+
+            if frame is not buf:
+                if frame.shape != buf.shape:
+                    # Source resolution changed - rebuild the ring. The old array
+                    # stays alive for as long as the consumer holds a view into it.
+                    with self.cond:
+                        self._allocate(frame)
+                        self.latest_slot = -1
+                        self.pending.clear()
+                        self.held = -1
+                    buf = self.ring[slot]
+                np.copyto(buf, frame)
+
+            self.grabbed = True
+            self.write_slot = slot
+            self._publish(slot, timestamp)
+
+    def _handle_failure(self):
+        """Returns False when capture should end (end of a video file)."""
+        self.read_failures += 1
+        if self.is_file:
+            with self.cond:
+                self.stopped = True
+                self.cond.notify_all()
+            return False
+        time.sleep(READ_RETRY_DELAY)
+        return True
+
+    def _has_new(self, last_seq):
+        if self.policy == POLICY_LATEST:
+            return self.latest_slot >= 0 and self.slot_seq[self.latest_slot] > last_seq
+        return len(self.pending) > 0
+
+    def read_next(self, last_seq=0, timeout=1.0):
+        """
+        Blocks until a frame newer than last_seq is published.
+        Returns a FramePacket, or None on timeout / once the camera is stopped.
+        The packet's frame stays valid until the next read_next() call.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.stopped or self._has_new(last_seq), timeout):
+                return None
+            if not self._has_new(last_seq):
+                return None
+
+            if self.policy == POLICY_LATEST:
+                slot = self.latest_slot
+            else:
+                slot = self.pending.popleft()
+            self.held = slot
+            self.consumed_seq = self.slot_seq[slot]
+            return FramePacket(self.slot_seq[slot], self.slot_ts[slot], self.ring[slot])
+
+    def read(self):
+        """Non-blocking snapshot of the newest frame as (grabbed, frame_copy)."""
+        with self.cond:
+            if self.policy == POLICY_LATEST:
+                slot = self.latest_slot
+            else:
+                slot = self.pending[-1] if self.pending else -1
+            if self.ring is None or slot < 0:
+                return False, None
+            return self.grabbed, self.ring[slot].copy()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.update_thread:
+            self.update_thread.join()
+        self.cap.release()
@@ -0,0 +1,167 @@
+from collections import deque
+from density import LEVELS
+
+# --- CONFIGURATION ---
+SURGE_THRESHOLD_WARNING = 15.0   # Avg speed (pixels/frame) of the moving crowd
+SURGE_THRESHOLD_CRITICAL = 25.0
+DENSITY_WARNING = 8              # Number of people in view
+DENSITY_CRITICAL = 12
+MOVING_THRESHOLD = 3.0           # Below this a person is fidgeting / standing
+MIN_MOVING_PEOPLE = 3            # A surge needs at least this many movers
+CHAOS_FULL_SCALE = 20.0          # Avg speed that maps to chaos 100
+HISTORY_LEN = 50                 # Chaos samples kept for the trend graph
+FLOW_MODES = ("off", "assist", "replace")
+# Flow only signals a surge when it looks like a crowd moving together, not one large blob
+# (someone close to the lens, a passing vehicle): enough of the view moving, mostly in one
+# direction, with at least MIN_MOVING_PEOPLE people in view
+FLOW_MIN_AREA = 0.2              # Fraction of flow cells moving
+FLOW_MIN_COHERENCE = 0.7         # Agreement of the moving cells' directions (1 = all the same way)
+# Crowd speed is the mean over "moving" people only (a surge inside a standing crowd still
+# registers) or over "all" tracked people (a few walkers in a large still crowd do not)
+AVERAGE_MODES = ("moving", "all")
+
+
+class CrowdAnalyzer:
+    """
+    Shared crowd analysis engine for every visual front-end.
+    Reads smoothed per-track speeds from a CentroidTracker and classifies the
+    scene with whole-array NumPy operations, so cost per frame does not grow
+    with a Python loop over people. An optional DensityGrid adds spatial
+    density (hotspots, per-zone capacity) on top of the global head count.
+
+    Optical-flow crowd motion (flow.FlowEstimator) can feed surge detection:
+    "assist" takes the faster of tracks and flow, "replace" uses flow only
+    (for crowds too dense to detect reliably), "off" ignores it. Either way a
+    flow surge needs a coherent moving area and a crowd in view (flow_surge()).
+    """
+    def __init__(self,
+                 surge_warning=SURGE_THRESHOLD_WARNING,
+                 surge_critical=SURGE_THRESHOLD_CRITICAL,
+                 density_warning=DENSITY_WARNING,
+                 density_critical=DENSITY_CRITICAL,
+                 moving_threshold=MOVING_THRESHOLD,
+                 min_moving_people=MIN_MOVING_PEOPLE,
+                 chaos_full_scale=CHAOS_FULL_SCALE,
+                 history_len=HISTORY_LEN,
+                 density=None,
+                 flow_mode="off",
+                 flow_min_area=FLOW_MIN_AREA,
+                 flow_min_coherence=FLOW_MIN_COHERENCE,
+                 average_over="moving"):
+        if flow_mode not in FLOW_MODES:
+            raise ValueError(f"Unknown flow mode '{flow_mode}'")
+        if average_over not in AVERAGE_MODES:
+            raise ValueError(f"Unknown speed average '{average_over}'")
+        self.surge_warning = surge_warning
+        self.surge_critical = surge_critical
+        self.density_warning = density_warning
+        self.density_critical = density_critical
+        self.moving_threshold = moving_threshold
+        self.min_moving_people = min_moving_people
+        self.chaos_full_scale = chaos_full_scale
+        self.history = deque(maxlen=history_len)
+        self.density = density
+        self.flow_mode = flow_mode
+        self.flow_min_area = flow_min_area
+        self.flow_min_coherence = flow_min_coherence
+        self.average_over = average_over
+
+    def analyze(self, tracker, flow=None):
+        """
+        Returns a metrics dict:
+        {threat_level, person_count, moving_count, avg_speed, chaos_metric, reason, history, surge_source}
+        plus "density" (DensityGrid.update result) when a density grid is attached and
+        "flow" when a FlowEstimator.update() summary for this frame is passed in.
+        """
+        # --- Speed Analysis ---
+        _, speeds = tracker.mean_speeds()
+
+        # IGNORE MINOR MOVEMENT (Walking/Fidgeting)
+        moving = speeds[speeds > self.moving_threshold]
+        moving_count = len(moving)
+
+        # --- Crowd Metrics ---
+        count = tracker.count
+        if self.average_over == "all":
+            # Average speed over everyone tracked (standing people dilute a few walkers)
+            avg_speed = float(speeds.mean()) if len(speeds) > 0 else 0.0
+        else:
+            # Average speed of the *moving* crowd only (to catch surges)
+            avg_speed = float(moving.mean()) if moving_count > 0 else 0.0
+        surge = moving_count >= self.min_moving_people
+        surge_source = "tracks"
+
+        # --- Optical Flow (detector-free crowd motion) ---
+        if flow is not None and self.flow_mode != "off":
+            flow_surge = self.flow_surge(flow, count)
+            if self.flow_mode == "replace":
+                avg_speed, surge, surge_source = flow["speed"], flow_surge, "flow"
+            elif flow_surge and flow["speed"] > avg_speed:
+                avg_speed, surge, surge_source = flow["speed"], True, "flow"
+
+        # Chaos Metric (Scaled 0-100 for UI)
+        chaos_val = min((avg_speed / self.chaos_full_scale) * 100, 100)
+
+        # --- Spatial Density ---
+        density = None
+        if self.density is not None:
+            density = self.density.update(tracker.centroids[tracker.active_slots()])
+
+        threat, reason = self.classify(avg_speed, moving_count, count, density, surge)
+
+        self.history.append(int(chaos_val))
+
+        result = {
+            "threat_level": threat,
+            "person_count": count,
+            "moving_count": moving_count,
+            "avg_speed": avg_speed,
+            "chaos_metric": int(chaos_val),
+            "reason": reason,
+            "history": list(self.history),
+            "surge_source": surge_source
+        }
+        if density is not None:
+            result["density"] = density
+        if flow is not None:
+            result["flow"] = flow
+        return result
+
+    def flow_surge(self, flow, count):
+        """True when a FlowEstimator summary shows a crowd moving together."""
+        return (flow["moving_area"] >= self.flow_min_area
+                and flow["coherence"] >= self.flow_min_coherence
+                and count >= self.min_moving_people)
+
+    def classify(self, avg_speed, moving_count, count, density=None, surge=None):
+        """Threat level and operator-facing reason for one frame's crowd metrics."""
+        threat = "NORMAL"
+        reason = "Stable conditions. Movement is within normal limits."
+        if surge is None:
+            surge = moving_count >= self.min_moving_people
+
+        # 1. Check Surge (Speed)
+        if surge and avg_speed > self.surge_critical:
+            threat = "CRITICAL"
+            reason = "CRITICAL: RAPID CROWD SURGE DETECTED (High Velocity)"
+        elif surge and avg_speed > self.surge_warning:
+            threat = "WARNING"
+            reason = "WARNING: Crowd movement is accelerating abnormally."
+
+        # 2. Check Density (Count)
+        elif count > self.density_critical:
+            threat = "CRITICAL"
+            reason = "CRITICAL: Severe Overcrowding. Capacity limit breached."
+        elif count > self.density_warning:
+            threat = "WARNING"
+            reason = "WARNING: Crowd density is high."
+
+        # 3. Spatial density (hotspot / zone capacity) escalates a lower global level
+        if density is not None and LEVELS.index(density["level"]) > LEVELS.index(threat):
+            threat, reason = density["level"], density["reason"]
+
+        # 4. Stability Check (If chaos is very low but count is high -> Stationary Crowd)
+        if threat == "NORMAL" and count > 0:
+            reason = f"Monitoring {count} individuals. Behavior is stable."
+
+        return threat, reason
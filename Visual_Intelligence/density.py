@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+GRID_COLS, GRID_ROWS = 16, 12   # Heatmap cells across the display frame
+DECAY = 0.85                    # Weight of the previous heatmap each frame (exponential decay)
+CELL_WARNING = 2.5              # Smoothed people per cell that make a local hotspot
+CELL_CRITICAL = 4.0             # ... and a crush risk
+ZONE_WARNING_RATIO = 0.8        # Zone occupancy (of capacity) that raises a warning
+HEATMAP_ALPHA = 0.45
+
+LEVELS = ("NORMAL", "WARNING", "CRITICAL")
+
+
+class Zone:
+    """Operator-defined area (display-pixel polygon) with its own capacity."""
+    def __init__(self, name, polygon, capacity):
+        self.name = name
+        self.polygon = np.asarray(polygon, dtype=np.int32).reshape(-1, 2)
+        self.capacity = int(capacity)
+
+
+class DensityGrid:
+    """
+    Spatial crowd density for one camera.
+
+    Track positions are binned into a GRID_COLS x GRID_ROWS grid with one
+    bincount per frame and blended into a decaying heatmap, so a tight cluster
+    stands out even when the total head count is unremarkable. Zones are
+    rasterized once into boolean masks; per-zone counts are a single fancy-index
+    lookup of all positions.
+    """
+    def __init__(self, frame_size=(640, 480), cols=GRID_COLS, rows=GRID_ROWS, decay=DECAY,
+                 zones=None, cell_warning=CELL_WARNING, cell_critical=CELL_CRITICAL):
+        self.width, self.height = frame_size
+        self.cols = cols
+        self.rows = rows
+        self.decay = decay
+        self.cell_warning = cell_warning
+        self.cell_critical = cell_critical
+        self.heat = np.zeros((rows, cols), dtype=np.float32)
+
+        self.zones = [z if isinstance(z, Zone) else Zone(**z) for z in (zones or [])]
+        self.zone_masks = np.zeros((len(self.zones), self.height, self.width), dtype=bool)
+        for i, zone in enumerate(self.zones):
+            mask = np.zeros((self.height, self.width), dtype=np.uint8)
+            cv2.fillPoly(mask, [zone.polygon], 1)
+            self.zone_masks[i] = mask.astype(bool)
+        self.zone_capacity = np.array([max(z.capacity, 1) for z in self.zones], dtype=np.float32)
+        self.zone_heat = np.zeros(len(self.zones), dtype=np.float32)
+
+    def update(self, points):
+        """
+        points: (N, 2) array of x, y display coordinates.
+        Returns {level, reason, peak_cell, peak_cell_rc, zones: [...]}.
+        """
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        xs = np.clip(points[:, 0], 0, self.width - 1)
+        ys = np.clip(points[:, 1], 0, self.height - 1)
+
+        # 1. Bin every position in one pass and blend into the decaying heatmap
+        cells = (ys * self.rows // self.height) * self.cols + (xs * self.cols // self.width)
+        counts = np.bincount(cells, minlength=self.rows * self.cols).reshape(self.rows, self.cols)
+        self.heat *= self.decay
+        self.heat += (1.0 - self.decay) * counts
+
+        peak_index = int(self.heat.argmax())
+        peak = float(self.heat.flat[peak_index])
+
+        # 2. Per-zone counts: (zones, N) membership lookup, then a row sum
+        zone_counts = self.zone_masks[:, ys, xs].sum(axis=1) if len(self.zones) else np.zeros(0, int)
+        self.zone_heat *= self.decay
+        self.zone_heat += (1.0 - self.decay) * zone_counts
+        occupancy = zone_counts / self.zone_capacity
+
+        zones = []
+        for i, zone in enumerate(self.zones):
+            ratio = float(occupancy[i])
+            level = "CRITICAL" if ratio > 1.0 else "WARNING" if ratio >= ZONE_WARNING_RATIO else "NORMAL"
+            zones.append({"name": zone.name, "count": int(zone_counts[i]), "capacity": zone.capacity,
+                          "occupancy": round(ratio, 2), "smoothed": round(float(self.zone_heat[i]), 1),
+                          "level": level})
+
+        level, reason = self.classify(peak, zones)
+        return {
+            "level": level,
+            "reason": reason,
+            "peak_cell": round(peak, 2),
+            "peak_cell_rc": divmod(peak_index, self.cols),
+            "zones": zones,
+        }
+
+    def classify(self, peak, zones):
+        """Worst of the zone capacities and the densest grid cell."""
+        level, reason = "NORMAL", ""
+        for z in zones:
+            if LEVELS.index(z["level"]) > LEVELS.index(level):
+                level = z["level"]
+                if level == "CRITICAL":
+                    reason = f"CRITICAL: Zone '{z['name']}' over capacity ({z['count']}/{z['capacity']})."
+                else:
+                    reason = f"WARNING: Zone '{z['name']}' near capacity ({z['count']}/{z['capacity']})."
+
+        if peak > self.cell_critical and level != "CRITICAL":
+            level, reason = "CRITICAL", "CRITICAL: Dense cluster forming - crush risk in one area."
+        elif peak > self.cell_warning and level == "NORMAL":
+            level, reason = "WARNING", "WARNING: Crowd is bunching up in one area."
+        return level, reason
+
+    def overlay(self, frame, alpha=HEATMAP_ALPHA):
+        """Draws the heatmap and zone outlines onto frame (BGR, display size) in place."""
+        h, w = frame.shape[:2]
+        scaled = np.clip(self.heat * (255.0 / self.cell_critical), 0, 255).astype(np.uint8)
+        if scaled.max() > 8:
+            # Colour the small grid, then upscale (much cheaper than colouring every pixel)
+            colored = cv2.resize(cv2.applyColorMap(scaled, cv2.COLORMAP_JET), (w, h),
+                                 interpolation=cv2.INTER_LINEAR)
+            heat = cv2.resize(scaled, (w, h), interpolation=cv2.INTER_LINEAR)
+            _, mask = cv2.threshold(heat, 8, 255, cv2.THRESH_BINARY)
+
+            # Blend only where there is density so empty floor keeps its colours
+            blended = cv2.addWeighted(frame, 1.0 - alpha, colored, alpha, 0)
+            cv2.copyTo(blended, mask, frame)
+
+        for zone in self.zones:
+            cv2.polylines(frame, [zone.polygon], True, (255, 255, 255), 1)
+            x, y = zone.polygon[0]
+            cv2.putText(frame, zone.name, (int(x) + 4, int(y) + 14), cv2.FONT_HERSHEY_SIMPLEX, 0.45,
+                        (255, 255, 255), 1)
+        return frame
+
+    def reset(self):
+        self.heat[...] = 0
+        self.zone_heat[...] = 0
@@ -1,29 +1,249 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
+import os
+import shutil
+import time
+import model_registry
+
+# --- CONFIGURATION ---
+BACKENDS = ("pytorch", "onnx", "openvino")
+EXPORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
+DEFAULT_IMGSZ = 640
+
+
+def exported_model_path(model_path, backend, int8=False, imgsz=DEFAULT_IMGSZ, cache_dir=EXPORT_CACHE_DIR):
+    """Location of the cached export for a given weights file / backend combination."""
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    tag = f"{stem}_{imgsz}" + ("_int8" if int8 else "")
+    if backend == "onnx":
+        return os.path.join(cache_dir, f"{tag}.onnx")
+    if backend == "openvino":
+        # Ultralytics loads OpenVINO models from a directory ending in _openvino_model
+        return os.path.join(cache_dir, f"{tag}_openvino_model")
+    return model_path
+
+
+def resolve_model(model_path, backend="pytorch", int8=False, imgsz=DEFAULT_IMGSZ, cache_dir=EXPORT_CACHE_DIR):
+    """
+    Returns the weights path to load for the requested backend,
+    exporting (and caching on disk) the model the first time it is needed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {BACKENDS}")
+    if backend == "pytorch":
+        if int8:
+            print("INT8 is only available for the onnx/openvino backends, using FP32 PyTorch.")
+        return model_path
+
+    target = exported_model_path(model_path, backend, int8, imgsz, cache_dir)
+    if os.path.exists(target):
+        return target
+
+    # Heavy import only when an export is actually needed
+    from ultralytics import YOLO
+
+    os.makedirs(cache_dir, exist_ok=True)
+    print(f"Exporting {model_path} to {backend}{' (INT8)' if int8 else ''}, this only happens once...")
+
+    if backend == "onnx":
+        # Dynamic axes so the same file serves batched / tiled inference
+        exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if int8:
+            # Dynamic quantization: weights stored as INT8, activations quantized at run time
+            # with ranges computed per inference, so no calibration data is needed (but it
+            # is slower and less accurate than OpenVINO's calibrated static INT8)
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+        else:
+            shutil.move(exported, target)
+    else:
+        # OpenVINO runs its own post-training INT8 calibration when int8=True
+        exported = YOLO(model_path).export(format="openvino", imgsz=imgsz, int8=int8)
+        shutil.move(exported, target)
+
+    return target
+
 
 class HumanDetector:
-    def __init__(self, model_path='yolov8n.pt', confidence=0.3):
-        print(f"Loading YOLO model from {model_path}...")
-        self.model = YOLO(model_path)
+    def __init__(self, model_path='yolov8n.pt', confidence=0.3, backend="pytorch", int8=False,
+                 imgsz=DEFAULT_IMGSZ, cache_dir=EXPORT_CACHE_DIR):
+        self.backend = backend
+        self.int8 = int8
+        self.imgsz = imgsz
+
+        try:
+            weights = resolve_model(model_path, backend, int8, imgsz, cache_dir)
+        except Exception as e:
+            # Export tooling (onnx / openvino) missing or failed - stay functional on PyTorch
+            print(f"Backend '{backend}' unavailable ({e}), falling back to PyTorch.")
+            self.backend = "pytorch"
+            self.int8 = False
+            weights = model_path
+
+        # Shared, pre-warmed model: loaded once per process, then instant for every
+        # session / CameraSystem that asks for the same weights
+        self.entry = model_registry.get_model(weights, task="detect", imgsz=imgsz)
+        self.model = self.entry.model
+        self.model_path = weights
         self.confidence = confidence
         # COCO class 0 is 'person'
-        self.target_class = 0 
+        self.target_class = 0
 
     def detect(self, frame):
         """
         Detects humans in the frame.
         Returns a list of bounding boxes [(x1, y1, x2, y2), ...]
         """
-        # Optimize: restrict to class 0 (person) directly in inference
-        results = self.model(frame, verbose=False, stream=True, classes=[0], conf=self.confidence)
         rects = []
-        
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # No need to check class here if we filtered in model()
-                x1, y1, x2, y2 = box.xyxy[0]
-                rects.append((int(x1), int(y1), int(x2), int(y2)))
-        
+        # The model is shared process-wide; one inference at a time
+        with self.entry.lock:
+            # Optimize: restrict to class 0 (person) directly in inference
+            results = self.model(frame, verbose=False, stream=True, classes=[0], conf=self.confidence,
+                                 imgsz=self.imgsz)
+
+            for result in results:
+                boxes = result.boxes
+                for box in boxes:
+                    # No need to check class here if we filtered in model()
+                    x1, y1, x2, y2 = box.xyxy[0]
+                    rects.append((int(x1), int(y1), int(x2), int(y2)))
+
         return rects
+
+    def detect_batch(self, frames, with_scores=False):
+        """
+        Detects humans in a list of frames with one batched inference call.
+        Returns one entry per frame: a list of boxes, or with_scores=True a pair
+        of arrays (boxes (N, 4) float32 xyxy, scores (N,) float32).
+        """
+        if len(frames) == 0:
+            return []
+        out = []
+        with self.entry.lock:
+            results = self.model(list(frames), verbose=False, stream=True, classes=[0],
+                                 conf=self.confidence, imgsz=self.imgsz)
+            for result in results:
+                boxes = result.boxes
+                xyxy = boxes.xyxy.cpu().numpy().astype(np.float32)
+                if with_scores:
+                    out.append((xyxy, boxes.conf.cpu().numpy().astype(np.float32)))
+                else:
+                    out.append([tuple(int(v) for v in b) for b in xyxy])
+        return out
+
+
+def box_agreement(reference, candidate, iou_threshold=0.5):
+    """
+    F1 score of candidate boxes against reference boxes (greedy IoU matching).
+    Two empty sets agree perfectly.
+    """
+    if len(reference) == 0 and len(candidate) == 0:
+        return 1.0
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0.0
+
+    A = np.asarray(reference, dtype=np.float32)
+    B = np.asarray(candidate, dtype=np.float32)
+    ix1 = np.maximum(A[:, None, 0], B[None, :, 0])
+    iy1 = np.maximum(A[:, None, 1], B[None, :, 1])
+    ix2 = np.minimum(A[:, None, 2], B[None, :, 2])
+    iy2 = np.minimum(A[:, None, 3], B[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (A[:, 2] - A[:, 0]) * (A[:, 3] - A[:, 1])
+    area_b = (B[:, 2] - B[:, 0]) * (B[:, 3] - B[:, 1])
+    iou = inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+    matches = 0
+    while iou.size and iou.max() >= iou_threshold:
+        r, c = np.unravel_index(iou.argmax(), iou.shape)
+        iou[r, :] = 0
+        iou[:, c] = 0
+        matches += 1
+
+    return 2.0 * matches / (len(reference) + len(candidate))
+
+
+def compare_backends(model_path, frames, configs=None, confidence=0.35, imgsz=DEFAULT_IMGSZ, warmup=3):
+    """
+    Runs every backend config over the same frames and reports FPS and
+    detection agreement (mean per-frame F1 @ IoU 0.5) against PyTorch.
+    configs: list of (backend, int8) tuples.
+    Returns a list of result dicts, baseline first. If the PyTorch baseline
+    fails, speeds are still measured but every agreement is None.
+    """
+    if configs is None:
+        configs = [("onnx", False), ("onnx", True), ("openvino", False), ("openvino", True)]
+
+    results = []
+    baseline_rects = None
+    for backend, int8 in [("pytorch", False)] + list(configs):
+        try:
+            detector = HumanDetector(model_path, confidence, backend=backend, int8=int8, imgsz=imgsz)
+        except Exception as e:
+            results.append({"backend": backend, "int8": int8, "error": str(e)})
+            continue
+        if detector.backend != backend:
+            results.append({"backend": backend, "int8": int8, "error": "export failed"})
+            continue
+
+        for frame in frames[:warmup]:
+            detector.detect(frame)
+
+        rects = []
+        start = time.perf_counter()
+        for frame in frames:
+            rects.append(detector.detect(frame))
+        elapsed = time.perf_counter() - start
+
+        if backend == "pytorch" and not int8:
+            baseline_rects = rects
+        agreement = None
+        if baseline_rects is not None:
+            agreement = float(np.mean([box_agreement(ref, cand) for ref, cand in zip(baseline_rects, rects)]))
+
+        results.append({
+            "backend": backend,
+            "int8": int8,
+            "model": detector.model_path,
+            "fps": len(frames) / elapsed if elapsed > 0 else 0.0,
+            "mean_latency_ms": 1000.0 * elapsed / max(len(frames), 1),
+            "agreement": agreement
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare HumanDetector inference backends")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--source", default="0", help="Video file or camera index")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+    frames = []
+    while len(frames) < args.frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+
+    if not frames:
+        print(f"No frames read from {args.source}")
+    else:
+        print(f"{'backend':<10} {'int8':<5} {'fps':>8} {'ms':>8} {'agree':>7}")
+        results = compare_backends(args.model, frames, imgsz=args.imgsz)
+        for r in results:
+            if "error" in r:
+                print(f"{r['backend']:<10} {str(r['int8']):<5} error: {r['error']}")
+            else:
+                agree = "n/a" if r["agreement"] is None else f"{r['agreement']:.3f}"
+                print(f"{r['backend']:<10} {str(r['int8']):<5} {r['fps']:>8.1f} "
+                      f"{r['mean_latency_ms']:>8.1f} {agree:>7}")
+        if "error" in results[0]:
+            print("PyTorch baseline failed: agreement not measured")
@@ -0,0 +1,218 @@
+import cv2
+import json
+import socket
+import struct
+import numpy as np
+from collections import deque
+from threading import Thread, Condition, Lock
+
+# --- CONFIGURATION ---
+FEED_HOST = "127.0.0.1"
+FEED_PORT = 8765
+CONNECT_TIMEOUT = 0.5
+
+# Wire format (both directions): !II header_len payload_len, JSON header, payload bytes.
+# Publisher -> subscriber: header {"seq", "status"}, payload = JPEG of the processed frame.
+# Subscriber -> publisher: header {"cmd", ...}, empty payload.
+_PREFIX = struct.Struct("!II")
+
+
+def pack_message(header, payload=b""):
+    hdr = json.dumps(header).encode("utf-8")
+    return _PREFIX.pack(len(hdr), len(payload)) + hdr + payload
+
+
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if r == 0:
+            raise ConnectionError("feed closed")
+        got += r
+    return bytes(buf)
+
+
+def recv_message(sock):
+    hdr_len, payload_len = _PREFIX.unpack(_recv_exact(sock, _PREFIX.size))
+    header = json.loads(_recv_exact(sock, hdr_len).decode("utf-8"))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+class FeedPublisher:
+    """
+    Local pub/sub server for the headless service.
+    Each frame is packed into one message once; every subscriber thread sends
+    the newest message when it is ready, so a slow viewer skips frames instead
+    of holding back the pipeline or other viewers.
+    """
+    def __init__(self, host=FEED_HOST, port=FEED_PORT):
+        self.host = host
+        self.port = port
+        self.cond = Condition()
+        self.seq = 0
+        self.message = None
+        self.commands = deque()
+        self.clients = 0
+        self.stopped = False
+        self.server = None
+
+    def start(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen()
+        Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Visual feed publishing on {self.host}:{self.port}")
+        return self
+
+    def publish(self, status, jpeg):
+        message = pack_message({"seq": self.seq + 1, "status": status}, jpeg or b"")
+        with self.cond:
+            self.seq += 1
+            self.message = message
+            self.cond.notify_all()
+
+    def pop_commands(self):
+        """Commands received from subscribers since the last call."""
+        cmds = []
+        while self.commands:
+            cmds.append(self.commands.popleft())
+        return cmds
+
+    def _accept_loop(self):
+        while not self.stopped:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            Thread(target=self._send_loop, args=(conn,), daemon=True).start()
+            Thread(target=self._command_loop, args=(conn,), daemon=True).start()
+
+    def _send_loop(self, conn):
+        last = 0
+        self.clients += 1
+        try:
+            while not self.stopped:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.seq != last or self.stopped)
+                    last = self.seq
+                    message = self.message
+                if message is not None:
+                    conn.sendall(message)
+        except OSError:
+            pass
+        finally:
+            self.clients -= 1
+            conn.close()
+
+    def _command_loop(self, conn):
+        try:
+            while not self.stopped:
+                header, _ = recv_message(conn)
+                self.commands.append(header)
+        except (OSError, ConnectionError, ValueError):
+            pass
+
+    def stop(self):
+        self.stopped = True
+        with self.cond:
+            self.cond.notify_all()
+        if self.server:
+            self.server.close()
+
+
+class RemoteDetectorSettings:
+    """Detector settings proxy; changes are sent to the service."""
+    def __init__(self, remote):
+        self._remote = remote
+        self._confidence = 0.35
+
+    @property
+    def confidence(self):
+        return self._confidence
+
+    @confidence.setter
+    def confidence(self, value):
+        self._confidence = float(value)
+        self._remote.send_command({"cmd": "set_confidence", "value": self._confidence})
+
+
+class RemoteCameraSystem:
+    """
+    Thin subscriber with the CameraSystem interface used by the UIs
+    (read_processed_frame, status_data, open_camera, detector.confidence).
+    Raises ConnectionError if no service is running.
+    """
+    def __init__(self, host=FEED_HOST, port=FEED_PORT):
+        self.sock = socket.create_connection((host, port), timeout=CONNECT_TIMEOUT)
+        self.sock.settimeout(None)
+        self.send_lock = Lock()
+        self.cond = Condition()
+        self.seq = 0
+        self.jpeg = None
+        self.last_seq = 0
+        self.connected = True
+        self.camera_index = 0
+        self.detector = RemoteDetectorSettings(self)
+        self.status_data = {
+            "threat_level": "NORMAL",
+            "threat_color": "var(--status-normal)",
+            "person_count": 0,
+            "chaos_metric": 0.0,
+            "reason": "Connected to visual service. Waiting for frames...",
+            "history": []
+        }
+        Thread(target=self._receive_loop, daemon=True).start()
+
+    def _receive_loop(self):
+        try:
+            while True:
+                header, payload = recv_message(self.sock)
+                with self.cond:
+                    self.seq = header["seq"]
+                    self.status_data = header["status"]
+                    self.camera_index = self.status_data.get("camera_index", self.camera_index)
+                    self.jpeg = payload or None
+                    self.cond.notify_all()
+        except (OSError, ConnectionError, ValueError):
+            with self.cond:
+                self.connected = False
+                self.cond.notify_all()
+
+    def send_command(self, command):
+        with self.send_lock:
+            try:
+                self.sock.sendall(pack_message(command))
+            except OSError:
+                self.connected = False
+
+    def open_camera(self, index):
+        self.camera_index = index
+        self.send_command({"cmd": "open_camera", "index": index})
+
+    def read_jpeg(self, timeout=1.0):
+        """Newest (seq, jpeg_bytes, status) not returned before; jpeg is None on timeout."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq != self.last_seq or not self.connected, timeout)
+            if self.seq == self.last_seq or self.jpeg is None:
+                return self.last_seq, None, self.status_data
+            self.last_seq = self.seq
+            return self.seq, self.jpeg, self.status_data
+
+    def read_processed_frame(self, timeout=1.0):
+        """Returns (frame_rgb, status_data) like CameraSystem."""
+        _, jpeg, status = self.read_jpeg(timeout)
+        if jpeg is None:
+            return None, status
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), status
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
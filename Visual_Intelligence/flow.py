@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+FLOW_SIZE = (160, 120)          # Optical flow resolution (a fraction of the detector's cost)
+FLOW_GRID = (8, 6)              # Cells (columns, rows); FLOW_SIZE must divide evenly
+FLOW_MOVING_THRESHOLD = 3.0     # Cell speed (display pixels/frame) that counts as moving
+# Farneback parameters. OpenCV skips pyramid levels under 32 px, so at 160x120 a 0.5 scale
+# gives only 2 levels and speeds above ~20 px/frame collapse. A 0.75 scale keeps 5 levels
+# and measures translation to ~40 display px/frame, well past SURGE_THRESHOLD_CRITICAL.
+PYR_SCALE, LEVELS, WINSIZE, ITERATIONS, POLY_N, POLY_SIGMA = 0.75, 6, 15, 3, 7, 1.5
+
+COMPASS = ("E", "SE", "S", "SW", "W", "NW", "N", "NE") # Image coordinates: +y points down
+
+
+class FlowEstimator:
+    """
+    Detector-free crowd motion from dense (Farneback) optical flow.
+
+    Every frame is shrunk to FLOW_SIZE grayscale and compared with the previous
+    one. Flow vectors are averaged per grid cell with reshape/mean (no Python
+    loop over pixels) into magnitude, direction and coherence (1 = everyone in
+    the cell moves the same way). Speeds are reported in display pixels/frame
+    so they compare with the tracker-based SURGE_THRESHOLD_* values; they stay
+    accurate and monotonic up to ~40 px/frame (see the Farneback settings above).
+    """
+    def __init__(self, frame_size=(640, 480), size=FLOW_SIZE, grid=FLOW_GRID,
+                 moving_threshold=FLOW_MOVING_THRESHOLD):
+        self.cols, self.rows = grid
+        # Round the flow size down to a multiple of the grid
+        self.size = (size[0] - size[0] % self.cols, size[1] - size[1] % self.rows)
+        self.scale = frame_size[0] / float(self.size[0])
+        self.moving_threshold = moving_threshold
+        self.prev = None
+        self.flow = None
+
+        # Latest per-cell results (rows x cols)
+        self.cell_magnitude = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self.cell_coherence = np.zeros((self.rows, self.cols), dtype=np.float32)
+        self.cell_vector = np.zeros((self.rows, self.cols, 2), dtype=np.float32)
+
+    def update(self, frame):
+        """
+        frame: BGR display frame. Returns a summary dict
+        {speed, moving_area, coherence, direction_deg, direction} or None for the first frame.
+        """
+        gray = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        if self.prev is None or self.prev.shape != gray.shape:
+            self.prev = gray
+            return None
+
+        # Reuse the previous field as the initial guess (faster convergence, no new buffer)
+        flags = cv2.OPTFLOW_USE_INITIAL_FLOW if self.flow is not None else 0
+        self.flow = cv2.calcOpticalFlowFarneback(self.prev, gray, self.flow, PYR_SCALE, LEVELS, WINSIZE,
+                                                 ITERATIONS, POLY_N, POLY_SIGMA, flags)
+        self.prev = gray
+
+        # Per-cell mean vector and mean magnitude, in display pixels/frame
+        h, w = gray.shape
+        ch, cw = h // self.rows, w // self.cols
+        cells = self.flow.reshape(self.rows, ch, self.cols, cw, 2)
+        self.cell_vector = cells.mean(axis=(1, 3)) * self.scale
+        magnitude = cv2.magnitude(self.flow[..., 0], self.flow[..., 1])
+        self.cell_magnitude = magnitude.reshape(self.rows, ch, self.cols, cw).mean(axis=(1, 3)) * self.scale
+        vector_len = np.hypot(self.cell_vector[..., 0], self.cell_vector[..., 1])
+        self.cell_coherence = vector_len / np.maximum(self.cell_magnitude, 1e-6)
+
+        moving = self.cell_magnitude > self.moving_threshold
+        if not moving.any():
+            return {"speed": 0.0, "moving_area": 0.0, "coherence": 0.0, "direction_deg": 0.0, "direction": "-"}
+
+        # Crowd-level summary over the moving cells only
+        speed = float(self.cell_magnitude[moving].mean())
+        total = self.cell_vector[moving].sum(axis=0)
+        coherence = float(np.hypot(*total) / max(self.cell_magnitude[moving].sum(), 1e-6))
+        angle = float(np.degrees(np.arctan2(total[1], total[0])) % 360.0)
+        return {
+            "speed": round(speed, 2),
+            "moving_area": round(float(moving.mean()), 3),
+            "coherence": round(coherence, 2),
+            "direction_deg": round(angle, 1),
+            "direction": COMPASS[int((angle + 22.5) // 45) % 8],
+        }
+
+    def overlay(self, frame, color=(255, 255, 0)):
+        """Draws one arrow per moving cell onto frame (display size) in place."""
+        h, w = frame.shape[:2]
+        ch, cw = h / self.rows, w / self.cols
+        for r, c in zip(*np.nonzero(self.cell_magnitude > self.moving_threshold)):
+            cx, cy = int((c + 0.5) * cw), int((r + 0.5) * ch)
+            dx, dy = self.cell_vector[r, c] * 3.0
+            cv2.arrowedLine(frame, (cx, cy), (int(cx + dx), int(cy + dy)), color, 2, tipLength=0.3)
+        return frame
+
+    def reset(self):
+        self.prev = None
+        self.flow = None
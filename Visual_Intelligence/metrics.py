@@ -0,0 +1,157 @@
+import time
+from bisect import bisect_left
+
+# --- CONFIGURATION ---
+STAGES = ("capture", "resize", "detect", "track", "flow", "analyze", "draw", "encode")
+ROLLING_WINDOW = 256        # Recent samples kept per stage for p50/p95
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)  # Seconds
+SNAPSHOT_INTERVAL = 0.5     # Seconds between status_data["perf"] refreshes
+THREAT_VALUES = {"NORMAL": 0, "WARNING": 1, "CRITICAL": 2}
+
+
+class StageStats:
+    """
+    Rolling window + cumulative histogram for one stage.
+    observe() is a few list writes so it can run on every frame; each stage
+    should be observed from one thread only.
+    """
+    __slots__ = ("window", "pos", "filled", "buckets", "count", "total")
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = [0.0] * window
+        self.pos = 0
+        self.filled = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1) # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.window[self.pos] = seconds
+        self.pos += 1
+        if self.pos == len(self.window):
+            self.pos = 0
+        if self.filled < len(self.window):
+            self.filled += 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self):
+        """(p50, p95, max) of the rolling window in seconds."""
+        if not self.filled:
+            return 0.0, 0.0, 0.0
+        recent = sorted(self.window[:self.filled])
+        n = len(recent)
+        return recent[n // 2], recent[min(n - 1, int(n * 0.95))], recent[-1]
+
+
+class PipelineMetrics:
+    """
+    Per-stage timers, frame counters and camera health for one CameraSystem.
+
+        t0 = time.perf_counter()
+        ...
+        metrics.observe("detect", time.perf_counter() - t0)
+
+    snapshot() feeds status_data["perf"]; prometheus() renders the /metrics page.
+    """
+    def __init__(self, stages=STAGES):
+        self.stages = {name: StageStats() for name in stages}
+        self.lag = StageStats()     # Capture timestamp -> processed frame
+        self.frames = 0
+        self.camera = None          # ThreadedCamera whose counters are reported
+        self.gauges = {}
+        self._snapshot = None
+        self._snapshot_time = 0.0
+        self._fps_frames = 0
+        self._fps = 0.0
+
+    def observe(self, stage, seconds):
+        self.stages[stage].observe(seconds)
+
+    def frame_done(self, capture_timestamp=None):
+        """Call once per processed frame, with the camera timestamp when known."""
+        self.frames += 1
+        if capture_timestamp:
+            self.lag.observe(max(0.0, time.time() - capture_timestamp))
+
+    def set_status(self, status):
+        self.gauges["person_count"] = status.get("person_count", 0)
+        self.gauges["chaos_metric"] = status.get("chaos_metric", 0.0)
+        self.gauges["threat_level"] = THREAT_VALUES.get(status.get("threat_level"), 0)
+
+    def camera_counters(self):
+        cam = self.camera
+        if cam is None:
+            return {"frames_captured": 0, "frames_dropped": 0, "read_failures": 0}
+        return {"frames_captured": cam.frames_captured,
+                "frames_dropped": cam.frames_dropped,
+                "read_failures": cam.read_failures}
+
+    def snapshot(self):
+        """Compact summary for status_data; recomputed at most every SNAPSHOT_INTERVAL."""
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._snapshot_time < SNAPSHOT_INTERVAL:
+            return self._snapshot
+
+        if self._snapshot_time:
+            self._fps = (self.frames - self._fps_frames) / (now - self._snapshot_time)
+        self._fps_frames = self.frames
+        self._snapshot_time = now
+
+        stages = {}
+        for name, stats in self.stages.items():
+            p50, p95, _ = stats.percentiles()
+            stages[name] = {"p50_ms": round(p50 * 1000, 2), "p95_ms": round(p95 * 1000, 2)}
+        lag_p50, lag_p95, _ = self.lag.percentiles()
+        self._snapshot = {
+            "fps": round(self._fps, 1),
+            "frames": self.frames,
+            "lag_ms": round(lag_p50 * 1000, 1),
+            "lag_p95_ms": round(lag_p95 * 1000, 1),
+            "stages": stages,
+            "camera": self.camera_counters(),
+        }
+        return self._snapshot
+
+    def prometheus(self):
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP crowdlumen_stage_seconds Per-frame latency of each processing stage.",
+            "# TYPE crowdlumen_stage_seconds histogram",
+        ]
+        for name, stats in self.stages.items():
+            lines += _histogram_lines("crowdlumen_stage_seconds", stats, f'stage="{name}",')
+        lines += [
+            "# HELP crowdlumen_frame_lag_seconds Time from camera capture to processed frame.",
+            "# TYPE crowdlumen_frame_lag_seconds histogram",
+        ]
+        lines += _histogram_lines("crowdlumen_frame_lag_seconds", self.lag, "")
+
+        lines += [
+            "# HELP crowdlumen_frames_processed_total Frames processed by the visual pipeline.",
+            "# TYPE crowdlumen_frames_processed_total counter",
+            f"crowdlumen_frames_processed_total {self.frames}",
+            "# HELP crowdlumen_fps Processed frames per second.",
+            "# TYPE crowdlumen_fps gauge",
+            f"crowdlumen_fps {self.snapshot()['fps']}",
+        ]
+        for name, value in self.camera_counters().items():
+            lines += [f"# TYPE crowdlumen_camera_{name}_total counter",
+                      f"crowdlumen_camera_{name}_total {value}"]
+        for name, value in self.gauges.items():
+            lines += [f"# TYPE crowdlumen_{name} gauge", f"crowdlumen_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric, stats, labels):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels}le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_bucket{{{labels}le="+Inf"}} {stats.count}')
+    label_set = "{" + labels.rstrip(",") + "}" if labels else ""
+    lines.append(f"{metric}_sum{label_set} {stats.total:.6f}")
+    lines.append(f"{metric}_count{label_set} {stats.count}")
+    return lines
@@ -0,0 +1,164 @@
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Condition
+
+# --- CONFIGURATION ---
+MJPEG_HOST = "127.0.0.1"  # Local only: the stream has no authentication. Set "0.0.0.0" (or
+                          # service.py --mjpeg-host) to expose it on the network deliberately.
+MJPEG_PORT = 8080
+STREAM_FPS = 15           # Display frame-rate cap for every client
+BOUNDARY = "crowdlumenframe"
+
+INDEX_HTML = b"""<!doctype html>
+<html><head><title>CrowdLumen Live</title></head>
+<body style="margin:0;background:#0e1117;display:flex;justify-content:center;align-items:center;height:100vh">
+<img src="/stream" style="max-width:100%;max-height:100%">
+</body></html>"""
+
+
+class MJPEGBroadcaster:
+    """
+    Holds the newest JPEG and fans it out to every connected client.
+    Frames are accepted at most STREAM_FPS times per second; a client that
+    is still sending an older frame simply skips to the newest one.
+    """
+    def __init__(self, fps=STREAM_FPS):
+        self.min_interval = 1.0 / fps if fps else 0.0
+        self.cond = Condition()
+        self.seq = 0
+        self.jpeg = None
+        self.last_publish = 0.0
+        self.clients = 0
+        self.frames_sent = 0
+        self.stopped = False
+
+    def due(self):
+        """True when a new frame would be accepted (lets callers skip encoding)."""
+        return time.monotonic() - self.last_publish >= self.min_interval
+
+    def publish(self, jpeg):
+        if jpeg is None or not self.due():
+            return False
+        with self.cond:
+            self.jpeg = jpeg
+            self.seq += 1
+            self.last_publish = time.monotonic()
+            self.cond.notify_all()
+        return True
+
+    def wait(self, last_seq, timeout=1.0):
+        """(seq, jpeg) newer than last_seq, or (last_seq, None) on timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq != last_seq or self.stopped, timeout):
+                return last_seq, None
+            return self.seq, self.jpeg
+
+    def stop(self):
+        self.stopped = True
+        with self.cond:
+            self.cond.notify_all()
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    # Routes can be extended by subclasses / callers: path -> method name
+    routes = {
+        "/": "send_index",
+        "/stream": "send_stream",
+        "/frame.jpg": "send_snapshot",
+        "/metrics": "send_metrics",
+    }
+
+    def do_GET(self):
+        handler = self.routes.get(self.path.split("?")[0])
+        if handler is None:
+            self.send_error(404)
+            return
+        getattr(self, handler)()
+
+    def log_message(self, format, *args):
+        # Keep the service console quiet; one line per request is too chatty
+        pass
+
+    def send_index(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(INDEX_HTML)))
+        self.end_headers()
+        self.wfile.write(INDEX_HTML)
+
+    def send_snapshot(self):
+        _, jpeg = self.server.broadcaster.wait(-1, timeout=0)
+        if jpeg is None:
+            self.send_error(503, "No frame yet")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def send_metrics(self):
+        metrics = self.server.metrics
+        if metrics is None:
+            self.send_error(404)
+            return
+        body = metrics.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self):
+        broadcaster = self.server.broadcaster
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache, private")
+        self.send_header("Pragma", "no-cache")
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.end_headers()
+
+        broadcaster.clients += 1
+        last_seq = 0
+        try:
+            while not broadcaster.stopped:
+                seq, jpeg = broadcaster.wait(last_seq)
+                if jpeg is None:
+                    continue
+                last_seq = seq
+                # The same bytes object goes to every client - no per-client encode
+                self.wfile.write(b"--" + BOUNDARY.encode() + b"\r\n"
+                                 b"Content-Type: image/jpeg\r\n"
+                                 b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n")
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+                broadcaster.frames_sent += 1
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            broadcaster.clients -= 1
+
+
+class MJPEGServer:
+    """
+    MJPEG/HTTP endpoint: / (viewer page), /stream (multipart MJPEG), /frame.jpg (snapshot)
+    and /metrics (Prometheus text, when a PipelineMetrics is given).
+    """
+    def __init__(self, broadcaster, host=MJPEG_HOST, port=MJPEG_PORT, handler=StreamHandler, metrics=None):
+        self.broadcaster = broadcaster
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.broadcaster = broadcaster
+        self.httpd.metrics = metrics
+        self.thread = None
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.httpd.server_address[:2]
+        print(f"MJPEG stream on http://{host}:{port}/stream")
+        return self
+
+    def stop(self):
+        self.broadcaster.stop()
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,75 @@
+import time
+import numpy as np
+from threading import Lock
+
+# --- CONFIGURATION ---
+WARMUP_RUNS = 1     # Dummy inferences after loading (first call pays for graph / kernel setup)
+
+# Process-wide cache: (weights, task) -> ModelEntry. Survives Streamlit reruns and
+# session resets because the module stays imported for the life of the server process.
+_models = {}
+_registry_lock = Lock()
+
+
+class ModelEntry:
+    """One loaded model shared by every detector in the process."""
+    def __init__(self, weights, task):
+        self.weights = weights
+        self.task = task
+        self.model = None
+        self.lock = Lock()      # Serializes loading, and inference (predictors are not thread-safe)
+        self.load_seconds = 0.0
+        self.warm_sizes = set()
+
+    def warm(self, imgsz):
+        """Runs a dummy inference at imgsz once, so the first real frame is fast."""
+        if imgsz in self.warm_sizes:
+            return
+        dummy = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        for _ in range(WARMUP_RUNS):
+            self.model(dummy, verbose=False, imgsz=imgsz)
+        self.warm_sizes.add(imgsz)
+
+
+def get_model(weights, task="detect", imgsz=None):
+    """
+    Returns the shared ModelEntry for weights, loading (and warming at imgsz)
+    on first use. Later calls - from any session or thread - return instantly.
+    """
+    key = (weights, task)
+    with _registry_lock:
+        entry = _models.get(key)
+        if entry is None:
+            entry = _models[key] = ModelEntry(weights, task)
+
+    with entry.lock:
+        if entry.model is None:
+            # Heavy import deferred to the first model load (pulls in torch)
+            from ultralytics import YOLO
+            start = time.perf_counter()
+            print(f"Loading YOLO model from {weights}...")
+            entry.model = YOLO(weights, task=task)
+            entry.load_seconds = time.perf_counter() - start
+        if imgsz:
+            entry.warm(imgsz)
+    return entry
+
+
+def preload(weights_list, task="detect", imgsz=None):
+    """Loads and warms several models up front (e.g. every auto-tune tier)."""
+    return [get_model(w, task, imgsz) for w in weights_list]
+
+
+def loaded_models():
+    """Summary of what is resident, for diagnostics."""
+    with _registry_lock:
+        entries = list(_models.values())
+    return [{"weights": e.weights, "task": e.task, "loaded": e.model is not None,
+             "load_seconds": round(e.load_seconds, 2), "warm_sizes": sorted(e.warm_sizes)}
+            for e in entries]
+
+
+def clear():
+    """Drops every cached model (they are reloaded on next use)."""
+    with _registry_lock:
+        _models.clear()
@@ -0,0 +1,300 @@
+import cv2
+import queue
+import time
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from threading import Thread, Condition, Event
+
+# --- CONFIGURATION ---
+STAGE_QUEUE_SIZE = 2      # Bounded hand-off between threads; oldest item dropped when full
+DETECT_SLOTS = 2          # Shared-memory frame slots for the detector process
+STAGE_POLL = 0.05         # Max wait on an empty stage queue before re-checking for stop
+
+
+def _put_latest(q, item):
+    """Put into a bounded queue, dropping the oldest item instead of blocking."""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def _detector_worker(shm_name, shape, slots, requests, results, detector_kwargs, confidence,
+                     roi_polygons, display_size, appearance):
+    """
+    Detection process: frames arrive through shared memory, boxes (and, with
+    appearance on, their embeddings) go back on a queue. Runs on its own core,
+    outside the GIL of the UI / tracking process.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=shm.buf)
+    try:
+        # Imported here so the model is loaded in the child only
+        from detector import HumanDetector
+        from roi import RegionTiler
+        from appearance import AppearanceEncoder
+
+        detector = HumanDetector(**detector_kwargs)
+        tiler = RegionTiler(shape, roi_polygons, tile_size=detector.imgsz) if roi_polygons is not None else None
+        encoder = AppearanceEncoder() if appearance else None
+        results.put(("ready", None, 0.0, None))
+
+        while True:
+            item = requests.get()
+            if item is None:
+                break
+            slot, seq = item
+            detector.confidence = confidence.value
+            frame = frames[slot]
+            t0 = time.perf_counter()
+
+            try:
+                boxes = detector.detect(frame) if tiler is None else tiler.detect(detector, frame)
+                elapsed = time.perf_counter() - t0
+                # Appearance from the very frame detected on (the tracking stage
+                # applies the boxes a few frames later, when people have moved)
+                embeddings = encoder.encode(frame, boxes) if encoder is not None else None
+                rects = boxes
+                if tiler is not None:
+                    # Native-resolution tiled detection, boxes scaled to the display frame
+                    sx = display_size[0] / float(shape[1])
+                    sy = display_size[1] / float(shape[0])
+                    rects = [(int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy))
+                             for (x1, y1, x2, y2) in boxes]
+            except Exception as e:
+                # One bad frame: report it and keep serving
+                results.put(("error", f"Detection failed: {e}", 0.0, None))
+                continue
+            results.put((seq, rects, elapsed, embeddings))
+    except Exception as e:
+        # Model load (or anything else) failed: the parent must not mistake this for an empty scene
+        results.put(("error", f"Detector process failed: {e}", 0.0, None))
+    finally:
+        del frames
+        shm.close()
+
+
+class DetectorProcessHandle:
+    """Stands in for HumanDetector on the UI side; settings are shared with the process."""
+    def __init__(self, confidence, imgsz, backend):
+        self._confidence = confidence
+        self.imgsz = imgsz
+        self.backend = backend
+
+    @property
+    def confidence(self):
+        return self._confidence.value
+
+    @confidence.setter
+    def confidence(self, value):
+        self._confidence.value = float(value)
+
+
+class VisualPipeline:
+    """
+    Multi-stage visual processing for one CameraSystem:
+
+        capture/resize (thread) -> detection (process, shared memory)
+                                -> tracking/analysis (thread) -> render (thread)
+
+    Stages are linked by bounded queues that drop the oldest item, so the slowest
+    stage never stalls the others. Detection is fed a new frame whenever the
+    detector process is idle; tracking runs on every frame with the newest boxes.
+    """
+    def __init__(self, camera, detector_kwargs, display_size, detect_shape=None, roi_polygons=None,
+                 appearance=False):
+        self.camera = camera
+        self.display_size = display_size
+        self.detect_shape = detect_shape or (display_size[1], display_size[0], 3)
+        self.roi_polygons = roi_polygons
+        self.stream = None
+
+        self.tracking_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+        self.render_queue = queue.Queue(maxsize=STAGE_QUEUE_SIZE)
+
+        # Shared memory frame slots + control queues for the detector process
+        ctx = mp.get_context("spawn")
+        nbytes = DETECT_SLOTS * int(np.prod(self.detect_shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.detect_frames = np.ndarray((DETECT_SLOTS,) + tuple(self.detect_shape),
+                                        dtype=np.uint8, buffer=self.shm.buf)
+        self.requests = ctx.Queue(maxsize=1)
+        self.results = ctx.Queue()
+        self.confidence = ctx.Value("d", detector_kwargs.get("confidence", 0.35))
+        self.detector = DetectorProcessHandle(self.confidence,
+                                              detector_kwargs.get("imgsz"),
+                                              detector_kwargs.get("backend"))
+        self.process = ctx.Process(target=_detector_worker,
+                                   args=(self.shm.name, self.detect_shape, DETECT_SLOTS,
+                                         self.requests, self.results, detector_kwargs,
+                                         self.confidence, roi_polygons, display_size, appearance),
+                                   daemon=True)
+        self.detector_idle = Event()
+        self.next_slot = 0
+        self.error = None # Last detector failure, None while detection works
+        self.detector_dead = False
+
+        # Latest rendered output
+        self.output_cond = Condition()
+        self.output_bgr = None
+        self.output_seq = 0
+        self.output_status = None
+
+        self.stopped = False
+        self.threads = []
+
+    def start(self, stream):
+        self.stream = stream
+        self.process.start()
+        for target in (self._capture_stage, self._tracking_stage, self._render_stage):
+            t = Thread(target=target, daemon=True)
+            t.start()
+            self.threads.append(t)
+        return self
+
+    def set_stream(self, stream):
+        """Switch cameras without restarting the detector process."""
+        self.stream = stream
+
+    # --- Stage 1: capture / resize ---
+    def _capture_stage(self):
+        metrics = self.camera.metrics
+        last_seq = 0
+        stream = None
+        while not self.stopped:
+            if stream is not self.stream:
+                stream = self.stream
+                last_seq = 0
+            if stream is None:
+                time.sleep(STAGE_POLL)
+                continue
+
+            packet = stream.read_next(last_seq, timeout=0.5)
+            if packet is None:
+                continue
+            last_seq = packet.seq
+
+            t0 = time.perf_counter()
+            frame = cv2.resize(packet.frame, self.display_size)
+            metrics.observe("resize", time.perf_counter() - t0)
+
+            # Hand a frame to the detector whenever it is free
+            if self.detector_idle.is_set():
+                slot = self.next_slot
+                self.next_slot = (slot + 1) % DETECT_SLOTS
+                src = frame if self.roi_polygons is None else packet.frame
+                h, w = self.detect_shape[:2]
+                if src.shape[:2] != (h, w):
+                    cv2.resize(src, (w, h), dst=self.detect_frames[slot])
+                else:
+                    self.detect_frames[slot][...] = src
+                self.detector_idle.clear()
+                self.requests.put((slot, packet.seq))
+
+            _put_latest(self.tracking_queue, (packet.seq, packet.timestamp, frame))
+
+    # --- Stage 2 (other process): detection, see _detector_worker ---
+
+    # --- Stage 3: tracking / analysis ---
+    def _tracking_stage(self):
+        metrics = self.camera.metrics
+        rects = []
+        embeddings = None
+        fresh = False # New boxes not yet applied to the tracker
+        while not self.stopped:
+            # Pick up finished detections without blocking
+            try:
+                while True:
+                    seq, result, elapsed, result_embeddings = self.results.get_nowait()
+                    if seq == "error":
+                        if result != self.error:
+                            print(f"Pipeline: {result}")
+                        self.error = result
+                    elif seq != "ready":
+                        rects = result
+                        embeddings = result_embeddings
+                        fresh = True
+                        self.error = None
+                        metrics.observe("detect", elapsed)
+                    self.detector_idle.set()
+            except queue.Empty:
+                pass
+            if not self.detector_dead and not self.stopped and not self.process.is_alive():
+                # Crashed (or exited after reporting): no more boxes will come
+                self.detector_dead = True
+                if self.error is None:
+                    self.error = f"Detector process exited (code {self.process.exitcode})"
+                    print(f"Pipeline: {self.error}")
+
+            try:
+                seq, timestamp, frame = self.tracking_queue.get(timeout=STAGE_POLL)
+            except queue.Empty:
+                continue
+
+            t0 = time.perf_counter()
+            # Appearance (computed by the detector process) only accompanies fresh boxes;
+            # in between, the same boxes are re-matched on distance alone
+            objects = self.camera.tracker.update(rects, embeddings if fresh else None)
+            fresh = False
+            metrics.observe("track", time.perf_counter() - t0)
+            self.camera.update_flow(frame)
+            t1 = time.perf_counter()
+            self.camera.analyze_threats(objects)
+            if self.error is not None:
+                self.camera.detector_failed(self.error)
+            metrics.observe("analyze", time.perf_counter() - t1)
+            _put_latest(self.render_queue, (seq, timestamp, frame, rects, self.camera.status_data))
+
+    # --- Stage 4: render ---
+    def _render_stage(self):
+        metrics = self.camera.metrics
+        while not self.stopped:
+            try:
+                seq, timestamp, frame, rects, status = self.render_queue.get(timeout=STAGE_POLL)
+            except queue.Empty:
+                continue
+
+            t0 = time.perf_counter()
+            self.camera.draw_overlay(frame, rects, status["threat_level"])
+            metrics.observe("draw", time.perf_counter() - t0)
+            metrics.frame_done(timestamp)
+
+            with self.output_cond:
+                self.output_bgr = frame
+                self.output_status = status
+                self.output_seq = seq
+                self.output_cond.notify_all()
+
+    def read(self, last_seq=0, timeout=1.0):
+        """
+        Newest rendered frame as (seq, frame_bgr, status), blocking until one newer
+        than last_seq exists. Returns (last_seq, None, None) on timeout.
+        """
+        with self.output_cond:
+            if not self.output_cond.wait_for(lambda: self.output_seq != last_seq or self.stopped, timeout):
+                return last_seq, None, None
+            return self.output_seq, self.output_bgr, self.output_status
+
+    def stop(self):
+        self.stopped = True
+        with self.output_cond:
+            self.output_cond.notify_all()
+        for t in self.threads:
+            t.join(timeout=1.0)
+        try:
+            self.requests.put(None, timeout=1.0)
+        except queue.Full:
+            pass
+        if self.process.is_alive():
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        del self.detect_frames
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,141 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+TILE_SIZE = 640            # Square tile edge in native pixels (matches detector imgsz)
+TILE_OVERLAP = 0.2         # Fraction of a tile shared with its neighbour
+MIN_TILE_COVERAGE = 0.02   # Skip tiles with less ROI than this
+NMS_IOU = 0.5              # Cross-tile duplicate suppression
+# A person cut by a tile seam gives a partial box inside the full one (low IoU), so boxes
+# touching an inner tile edge are compared by intersection over the smaller box instead
+SEAM_IOS = 0.6
+EDGE_MARGIN = 4            # Native pixels from a tile edge that count as touching it
+
+
+def nms(boxes, scores, iou_threshold=NMS_IOU, clipped=None, ios_threshold=SEAM_IOS):
+    """
+    Greedy non-maximum suppression over (N, 4) xyxy boxes. Returns the kept boxes.
+
+    clipped marks boxes cut by a tile seam. Unclipped boxes are kept first (highest
+    score first), a pair involving a clipped box is a duplicate when its intersection
+    covers ios_threshold of the smaller box, and partial boxes of a person no tile
+    saw whole are merged into their union.
+    """
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=boxes.dtype)
+    if clipped is None:
+        clipped = np.zeros(len(boxes), dtype=bool)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.lexsort((-scores, clipped))
+    keep = []
+    while len(order):
+        i = order[0]
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        ios = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        duplicate = np.where(clipped[i] | clipped[rest], ios >= ios_threshold, iou >= iou_threshold)
+
+        box = boxes[i].copy()
+        if clipped[i]:
+            # Only partial boxes are left for this person: grow it by the other parts
+            parts = boxes[rest[duplicate]]
+            if len(parts):
+                box[:2] = np.minimum(box[:2], parts[:, :2].min(axis=0))
+                box[2:] = np.maximum(box[2:], parts[:, 2:].max(axis=0))
+        keep.append(box)
+        order = rest[~duplicate]
+    return np.asarray(keep)
+
+
+def _tile_starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile + 1, stride))
+    if starts[-1] != length - tile:
+        starts.append(length - tile)
+    return starts
+
+
+class RegionTiler:
+    """
+    Region-of-interest, mask-aware tiled inference for high-resolution frames.
+
+    The ROI polygons (native pixel coordinates) are rasterised once into a mask.
+    Only tiles that overlap the mask are cropped at native resolution, sent to the
+    detector as one batch, shifted back into frame coordinates and merged with
+    cross-tile NMS. Boxes whose centre falls outside the ROI are dropped.
+    Boxes cut off by a seam between tiles are merged with the other views of the
+    same person, so people on a seam are counted once.
+    """
+    def __init__(self, frame_shape, polygons=None, tile_size=TILE_SIZE, overlap=TILE_OVERLAP,
+                 min_coverage=MIN_TILE_COVERAGE, nms_iou=NMS_IOU, seam_ios=SEAM_IOS):
+        h, w = frame_shape[:2]
+        self.frame_shape = (h, w)
+        self.nms_iou = nms_iou
+        self.seam_ios = seam_ios
+
+        self.mask = np.zeros((h, w), dtype=np.uint8)
+        if polygons:
+            cv2.fillPoly(self.mask, [np.asarray(p, dtype=np.int32).reshape(-1, 2) for p in polygons], 1)
+        else:
+            self.mask[:] = 1
+
+        tile_w = min(tile_size, w)
+        tile_h = min(tile_size, h)
+        stride_x = max(1, int(tile_w * (1 - overlap)))
+        stride_y = max(1, int(tile_h * (1 - overlap)))
+
+        # Integral image gives ROI coverage of every candidate tile in O(1)
+        integral = cv2.integral(self.mask)
+        self.tiles = []
+        for y in _tile_starts(h, tile_h, stride_y):
+            for x in _tile_starts(w, tile_w, stride_x):
+                covered = (integral[y + tile_h, x + tile_w] - integral[y, x + tile_w]
+                           - integral[y + tile_h, x] + integral[y, x])
+                if covered / float(tile_w * tile_h) >= min_coverage:
+                    self.tiles.append((x, y, tile_w, tile_h))
+
+        self.offsets = np.array([(x, y, x, y) for (x, y, _, _) in self.tiles], dtype=np.float32)
+        # Tile edges that are seams with a neighbour (not the frame border), as
+        # (left, top, right, bottom) limits in tile coordinates; inf = no seam
+        self.seams = np.array([(EDGE_MARGIN if x > 0 else -np.inf,
+                                EDGE_MARGIN if y > 0 else -np.inf,
+                                tw - EDGE_MARGIN if x + tw < w else np.inf,
+                                th - EDGE_MARGIN if y + th < h else np.inf)
+                               for (x, y, tw, th) in self.tiles], dtype=np.float32)
+
+    def detect(self, detector, frame):
+        """
+        Runs batched detection over the ROI tiles of a native-resolution frame.
+        Returns boxes [(x1, y1, x2, y2), ...] in frame coordinates.
+        """
+        if not self.tiles:
+            return []
+
+        crops = [frame[y:y + th, x:x + tw] for (x, y, tw, th) in self.tiles]
+        results = detector.detect_batch(crops, with_scores=True)
+
+        boxes = np.concatenate([b + self.offsets[i] for i, (b, _) in enumerate(results)])
+        scores = np.concatenate([s for (_, s) in results])
+        clipped = np.concatenate([(b[:, :2] <= self.seams[i, :2]).any(axis=1) |
+                                  (b[:, 2:] >= self.seams[i, 2:]).any(axis=1)
+                                  for i, (b, _) in enumerate(results)])
+        if len(boxes) == 0:
+            return []
+
+        # Keep only detections centred inside the ROI mask
+        h, w = self.frame_shape
+        cx = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2).astype(np.int32), 0, w - 1)
+        cy = np.clip(((boxes[:, 1] + boxes[:, 3]) / 2).astype(np.int32), 0, h - 1)
+        inside = self.mask[cy, cx] > 0
+        boxes = boxes[inside]
+        scores = scores[inside]
+        clipped = clipped[inside]
+
+        kept = nms(boxes, scores, self.nms_iou, clipped, self.seam_ios)
+        return [tuple(int(v) for v in b) for b in kept]
@@ -0,0 +1,75 @@
+"""
+Headless CrowdLumen visual-analytics service.
+
+Runs capture, detection and analysis continuously, independent of any open
+dashboard, and publishes status_data plus JPEG frames on a local socket.
+The Streamlit and CustomTkinter apps subscribe to it when it is running.
+The same JPEG bytes are served as an MJPEG stream at http://<host>:8080/stream,
+with Prometheus metrics (stage latencies, FPS, dropped frames) at /metrics.
+
+    python service.py --camera 0 --port 8765 --mjpeg-port 8080
+"""
+import argparse
+import time
+from camera_system import CameraSystem
+from feed import FeedPublisher, FEED_HOST, FEED_PORT
+from mjpeg import MJPEGBroadcaster, MJPEGServer, MJPEG_HOST, MJPEG_PORT
+
+
+def handle_command(cam, command):
+    cmd = command.get("cmd")
+    if cmd == "open_camera":
+        cam.open_camera(int(command["index"]))
+    elif cmd == "set_confidence":
+        cam.detector.confidence = float(command["value"])
+    else:
+        print(f"Unknown feed command: {command}")
+
+
+def run(camera_index=0, host=FEED_HOST, port=FEED_PORT, mjpeg_port=MJPEG_PORT, mjpeg_host=MJPEG_HOST):
+    cam = CameraSystem()
+    if camera_index != cam.camera_index:
+        cam.open_camera(camera_index)
+    publisher = FeedPublisher(host, port).start()
+    broadcaster = MJPEGBroadcaster()
+    stream_server = None
+    if mjpeg_port:
+        if mjpeg_host not in ("127.0.0.1", "localhost", "::1"):
+            print(f"WARNING: unauthenticated MJPEG stream exposed on {mjpeg_host}:{mjpeg_port}")
+        stream_server = MJPEGServer(broadcaster, mjpeg_host, mjpeg_port, metrics=cam.metrics).start()
+
+    try:
+        while True:
+            for command in publisher.pop_commands():
+                handle_command(cam, command)
+
+            # Encoded once (get_frame()); the feed and every MJPEG client share the bytes
+            _, jpeg, status = cam.read_jpeg()
+            status = dict(status, camera_index=cam.camera_index)
+            if jpeg is None:
+                # Keep subscribers informed even without video
+                publisher.publish(status, None)
+                time.sleep(0.5)
+                continue
+
+            publisher.publish(status, jpeg)
+            broadcaster.publish(jpeg)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.stop()
+        if stream_server:
+            stream_server.stop()
+        cam.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CrowdLumen headless visual-analytics service")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--host", default=FEED_HOST)
+    parser.add_argument("--port", type=int, default=FEED_PORT)
+    parser.add_argument("--mjpeg-port", type=int, default=MJPEG_PORT, help="0 disables the MJPEG stream")
+    parser.add_argument("--mjpeg-host", default=MJPEG_HOST,
+                        help="Interface for the (unauthenticated) MJPEG stream, e.g. 0.0.0.0 for the network")
+    args = parser.parse_args()
+    run(args.camera, args.host, args.port, args.mjpeg_port, args.mjpeg_host)
@@ -1,8 +1,13 @@
 import streamlit as st
-import cv2
 import numpy as np
 import time
 from camera_system import CameraSystem
+from feed import RemoteCameraSystem
+
+# --- CONFIGURATION ---
+# Frames are sent to the browser as the JPEG bytes CameraSystem.get_frame() encodes once per
+# frame (size / quality: JPEG_SIZE / JPEG_QUALITY in camera_system.py), shared by every session
+CHART_INTERVAL = 2.0    # Seconds between Chaos Trends redraws (the history changes every frame)
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -67,12 +72,41 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Session State ---
-if 'camera_system' not in st.session_state:
-    st.session_state.camera_system = CameraSystem()
+@st.cache_resource
+def local_camera_system():
+    """One local pipeline shared by every browser session (when service.py is not running)."""
+    return CameraSystem()
+
+def connect_camera_system():
+    """Subscribe to the headless service (service.py) if it is running, else run locally."""
+    try:
+        return RemoteCameraSystem()
+    except OSError:
+        return local_camera_system()
+
+if 'camera_system' not in st.session_state or getattr(st.session_state.camera_system, "closed", False):
+    # (A local system closed by "Reload System Logic" in another session is replaced too)
+    st.session_state.camera_system = connect_camera_system()
     st.session_state.run_loop = True
+    st.session_state.view_seq = 0
 
 cam = st.session_state.camera_system
 
+
+def read_view(cam):
+    """
+    (jpeg, status) for the next frame this session has not shown yet, or (None, status)
+    if none arrived within the camera timeout. Blocks, so the loop never spins on
+    unchanged data. The bytes are forwarded untouched: encoded once by the service or
+    the shared local CameraSystem, never converted or re-encoded per viewer.
+    """
+    if isinstance(cam, RemoteCameraSystem):
+        _, jpeg, status = cam.read_jpeg()
+        return jpeg, status
+    st.session_state.view_seq, jpeg, status = cam.read_jpeg(st.session_state.view_seq)
+    return jpeg, status
+
+
 # --- Sidebar ---
 with st.sidebar:
     st.title("CrowdLumen")
@@ -94,12 +128,14 @@ with st.sidebar:
     st.subheader("AI Sensitivity")
     conf_val = st.slider("Detection Confidence", 0.1, 0.9, cam.detector.confidence, 0.05)
     if conf_val != cam.detector.confidence:
-        cam.detector.confidence = conf_val
-        cam.detector.model.conf = conf_val # Update model config if accessible directly or just used in predict
+        cam.detector.confidence = conf_val # Passed to the model on every predict call
 
     if st.button("Reload System Logic", use_container_width=True):
+        # Resets camera / tracking state only; YOLO weights stay loaded and warm
+        # in the process-wide model_registry, so the new system starts instantly
         st.cache_resource.clear()
         if 'camera_system' in st.session_state:
+            st.session_state.camera_system.close()
             del st.session_state['camera_system']
         st.rerun()
 
@@ -152,36 +188,72 @@ with col2:
     with m1:
         chaos_placeholder = st.empty()
         chaos_bar = st.progress(0)
+        zones_placeholder = st.empty()
     
     st.markdown("### Chaos Trends")
     chart_placeholder = st.empty()
+    perf_placeholder = st.empty()
 
 
 # --- Video Loop ---
+# Every element is only re-sent when what it shows has changed; each update
+# is a websocket message and a browser re-render per viewer.
+rendered = {}
+
+def changed(key, value):
+    if rendered.get(key) == value:
+        return False
+    rendered[key] = value
+    return True
+
+last_chart = 0.0
 try:
     while True:
-        frame, status = cam.read_processed_frame()
+        jpeg, status = read_view(cam)
         
-        if frame is not None:
+        if jpeg is not None:
             # Update Video
-            video_placeholder.image(frame, channels="RGB", use_container_width=True)
+            video_placeholder.image(jpeg, use_container_width=True)
+            rendered.pop("signal", None)
             
             # Update Metrics
-            count_placeholder.metric("Person Count", status["person_count"])
+            if changed("count", status["person_count"]):
+                count_placeholder.metric("Person Count", status["person_count"])
             
             c_val = status["chaos_metric"]
-            chaos_placeholder.metric("Chaos / Flux", f"{c_val:.1f}")
-            chaos_bar.progress(min(int(c_val), 100))
+            if changed("chaos", round(c_val, 1)):
+                chaos_placeholder.metric("Chaos / Flux", f"{c_val:.1f}")
+                chaos_bar.progress(min(int(c_val), 100))
+
+            # Per-zone occupancy (DENSITY_ZONES in camera_system.py)
+            density = status.get("density")
+            if density and density["zones"]:
+                zones_text = "\n".join(
+                    f"- **{z['name']}**: {z['count']}/{z['capacity']} ({z['occupancy'] * 100:.0f}%) {z['level']}"
+                    for z in density["zones"])
+                if changed("zones", zones_text):
+                    zones_placeholder.markdown(zones_text)
             
-            # Update Chart
-            if "history" in status:
+            # Update Chart (throttled)
+            now = time.monotonic()
+            if "history" in status and now - last_chart >= CHART_INTERVAL:
+                last_chart = now
                 chart_placeholder.area_chart(status["history"], height=150)
+
+            # Pipeline health (FPS, inference latency, camera lag / drops)
+            perf = status.get("perf")
+            if perf:
+                perf_text = (f"{perf['fps']:.1f} FPS · detect {perf['stages']['detect']['p50_ms']:.0f} ms · "
+                             f"lag {perf['lag_ms']:.0f} ms · dropped {perf['camera']['frames_dropped']}")
+                if changed("perf", perf_text):
+                    perf_placeholder.caption(perf_text)
                 
         else:
-            video_placeholder.error("No Video Signal. Check Camera.")
+            if getattr(cam, "closed", False):
+                st.rerun() # Reloaded from another session; pick up the new shared system
+            if changed("signal", "lost"):
+                video_placeholder.error("No Video Signal. Check Camera.")
             time.sleep(1)
 
-        time.sleep(0.01) # Faster loop, threaded camera handles FPS
-
 except Exception as e:
     st.error(f"An error occurred: {e}")
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+import pytest
+
+import batch_analysis
+import camera_system as cs
+
+FRAMES = 120
+
+
+def people_at(frame_index):
+    """
+    Boxes in the synthetic clip: a tight cluster (density grid hotspot), then a
+    crowd over the head-count limit, then a few people while the view pans.
+    """
+    if frame_index <= 40:
+        return [(307 + 5 * i, 170 + 3 * i, 337 + 5 * i, 230 + 3 * i) for i in range(5)]
+    count = 10 if frame_index <= 80 else 6
+    return [(60 * i, 100 + 40 * (i % 3), 60 * i + 30, 180 + 40 * (i % 3)) for i in range(count)]
+
+
+def pan_at(frame_index):
+    return 30 * max(0, frame_index - 80)
+
+
+class ScriptedDetector:
+    """Stands in for HumanDetector: the n-th detection call sees the n-th detection frame."""
+    def __init__(self, **kwargs):
+        self.calls = 0
+
+    def detect(self, frame):
+        self.calls += 1
+        return people_at(self.calls * cs.DETECT_INTERVAL)
+
+    def detect_batch(self, frames):
+        return [self.detect(frame) for frame in frames]
+
+
+class RowCollector:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, **row):
+        self.rows.append(row)
+
+    def extend(self, **columns):
+        pass
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / "crowd.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (cs.WIDTH, cs.HEIGHT))
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (cs.HEIGHT, cs.WIDTH + pan_at(FRAMES)), dtype=np.uint8).astype(np.float32)
+    background = cv2.cvtColor(cv2.GaussianBlur(noise, (0, 0), 3).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+    person = rng.integers(0, 255, (80, 30, 3), dtype=np.uint8)
+    for n in range(1, FRAMES + 1):
+        frame = background[:, pan_at(n):pan_at(n) + cs.WIDTH].copy()
+        for (x1, y1, x2, y2) in people_at(n):
+            frame[y1:y2, x1:x2] = person[:y2 - y1, :x2 - x1]
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.mark.parametrize("flow_mode", ["off", "assist"])
+def test_batch_and_live_classify_frames_the_same(clip, monkeypatch, flow_mode):
+    monkeypatch.setattr(cs, "HumanDetector", ScriptedDetector)
+    monkeypatch.setattr(cs, "FLOW_MODE", flow_mode)
+
+    live = cs.CameraSystem(start_camera=False)
+    cap = cv2.VideoCapture(clip)
+    live_levels = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        live.process_ai(cv2.resize(frame, (cs.WIDTH, cs.HEIGHT)))
+        live_levels.append(live.status_data["threat_level"])
+    cap.release()
+
+    frames = RowCollector()
+    n = batch_analysis.analyze_video(clip, ScriptedDetector(), frames, RowCollector(),
+                                     detect_interval=cs.DETECT_INTERVAL, motion_gate=False)
+    batch_levels = [row["threat_level"] for row in frames.rows]
+
+    assert n == len(live_levels) == FRAMES
+    assert batch_levels == live_levels
+    # The hotspot (density grid) and, with flow on, the pan (flow surge) must both register
+    assert batch_levels[35] == "CRITICAL"
+    assert batch_levels[-1] == ("CRITICAL" if flow_mode == "assist" else "NORMAL")
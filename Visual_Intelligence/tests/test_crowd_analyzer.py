@@ -0,0 +1,38 @@
+from crowd_analyzer import CrowdAnalyzer
+from tracker import CentroidTracker
+
+
+def standing_crowd(people):
+    tracker = CentroidTracker()
+    rects = [(40 * i, 200, 40 * i + 30, 280) for i in range(people)]
+    for _ in range(3):
+        tracker.update(rects)
+    return tracker
+
+
+def fast_flow(moving_area=0.5, coherence=0.95):
+    return {"speed": 30.0, "moving_area": moving_area, "coherence": coherence,
+            "direction_deg": 0.0, "direction": "E"}
+
+
+def test_coherent_flow_in_a_crowd_is_a_surge():
+    analyzer = CrowdAnalyzer(flow_mode="replace")
+    result = analyzer.analyze(standing_crowd(6), fast_flow())
+    assert result["threat_level"] == "CRITICAL"
+    assert result["surge_source"] == "flow"
+
+
+def test_one_large_blob_is_not_a_surge():
+    analyzer = CrowdAnalyzer(flow_mode="assist")
+    # A single person close to the lens
+    assert analyzer.analyze(standing_crowd(1), fast_flow())["threat_level"] == "NORMAL"
+    # Scattered motion in every direction
+    assert analyzer.analyze(standing_crowd(6), fast_flow(coherence=0.3))["threat_level"] == "NORMAL"
+    # A small moving patch
+    assert analyzer.analyze(standing_crowd(6), fast_flow(moving_area=0.1))["threat_level"] == "NORMAL"
+
+
+def test_flow_is_ignored_by_default():
+    result = CrowdAnalyzer().analyze(standing_crowd(6), fast_flow())
+    assert result["threat_level"] == "NORMAL"
+    assert result["surge_source"] == "tracks"
@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+import pytest
+
+from flow import FlowEstimator
+
+SHIFTS = (5, 10, 15, 20, 25, 30, 35, 40)
+
+
+def textured_strip(width):
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 255, (480, width), dtype=np.uint8).astype(np.float32)
+    gray = cv2.normalize(cv2.GaussianBlur(noise, (0, 0), 3), None, 0, 255, cv2.NORM_MINMAX)
+    return cv2.cvtColor(gray.astype(np.uint8), cv2.COLOR_GRAY2BGR)
+
+
+def measured_speed(strip, shift, frames=5):
+    estimator = FlowEstimator()
+    summary = None
+    for k in range(frames):
+        summary = estimator.update(strip[:, k * shift:k * shift + 640])
+    return summary["speed"]
+
+
+def test_speed_tracks_translation_past_surge_thresholds():
+    strip = textured_strip(640 + 5 * max(SHIFTS))
+    speeds = [measured_speed(strip, shift) for shift in SHIFTS]
+
+    assert speeds == sorted(speeds)
+    for shift, speed in zip(SHIFTS, speeds):
+        assert speed == pytest.approx(shift, rel=0.15)
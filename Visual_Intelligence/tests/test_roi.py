@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+from roi import RegionTiler, nms
+
+
+class BlobDetector:
+    """Stands in for HumanDetector: every white blob in a crop is a person, cut off at the crop edge."""
+    def detect_batch(self, crops, with_scores=False):
+        out = []
+        for crop in crops:
+            contours, _ = cv2.findContours(np.ascontiguousarray(crop[..., 0]), cv2.RETR_EXTERNAL,
+                                           cv2.CHAIN_APPROX_SIMPLE)
+            boxes = np.array([(x, y, x + w, y + h) for (x, y, w, h) in map(cv2.boundingRect, contours)],
+                             dtype=np.float32).reshape(-1, 4)
+            # Partial views score higher than whole ones (the worst case for NMS)
+            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+            out.append((boxes, (1.0 - areas / 1e6).astype(np.float32)))
+        return out
+
+
+def frame_with(people, shape=(1080, 1920)):
+    frame = np.zeros(shape + (3,), dtype=np.uint8)
+    for (x1, y1, x2, y2) in people:
+        frame[y1:y2, x1:x2] = 255
+    return frame
+
+
+def test_person_on_a_tile_seam_is_counted_once():
+    # Tiles start at x = 0, 512, 1024, 1280: the first tile ends at 640, the second at 1152
+    people = [(600, 300, 700, 500),     # cut by the right edge of the first tile
+              (1100, 300, 1200, 500),   # cut by the right edge of the second tile
+              (200, 300, 260, 500)]     # inside one tile only
+    tiler = RegionTiler((1080, 1920))
+    boxes = tiler.detect(BlobDetector(), frame_with(people))
+    assert sorted(boxes) == sorted(people)
+
+
+def test_person_no_tile_sees_whole_is_merged():
+    # Wider than the 128 px tile overlap: each tile only sees part of it
+    person = (480, 300, 690, 500)
+    boxes = RegionTiler((1080, 1920)).detect(BlobDetector(), frame_with([person]))
+    assert boxes == [person]
+
+
+def test_neighbours_on_a_seam_stay_separate():
+    people = [(560, 300, 630, 500), (650, 300, 720, 500)]
+    boxes = RegionTiler((1080, 1920)).detect(BlobDetector(), frame_with(people))
+    assert sorted(boxes) == people
+
+
+def test_plain_nms_uses_iou():
+    boxes = np.array([(0, 0, 100, 100), (10, 0, 110, 100), (0, 0, 40, 100)], dtype=np.float32)
+    kept = nms(boxes, np.array([0.9, 0.8, 0.7], dtype=np.float32))
+    assert kept.tolist() == [[0, 0, 100, 100], [0, 0, 40, 100]]
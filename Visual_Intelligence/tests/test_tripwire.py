@@ -0,0 +1,22 @@
+from tracker import CentroidTracker
+from tripwire import TripwireCounter
+
+
+def crossings(gate, path):
+    tracker = CentroidTracker()
+    counter = TripwireCounter([gate])
+    for (x, y) in path:
+        tracker.update([(x - 10, y - 10, x + 10, y + 10)])
+        counter.update(tracker)
+    return int(counter.entries[0]), int(counter.exits[0])
+
+
+def test_gate_drawn_top_to_bottom_counts_right_to_left_as_entry():
+    gate = {"name": "Door A", "p1": (320, 0), "p2": (320, 480)}
+    assert crossings(gate, [(400, 200), (350, 200), (300, 200)]) == (1, 0)
+    assert crossings(gate, [(300, 200), (350, 200), (400, 200)]) == (0, 1)
+
+
+def test_gate_drawn_left_to_right_counts_downward_as_entry():
+    gate = {"name": "Door B", "p1": (0, 240), "p2": (640, 240)}
+    assert crossings(gate, [(300, 200), (300, 230), (300, 260)]) == (1, 0)
@@ -1,150 +1,293 @@
 import numpy as np
-from collections import OrderedDict
+from collections.abc import Mapping
+from appearance import appearance_distance
+
+# --- CONFIGURATION ---
+INITIAL_CAPACITY = 64   # Track slots preallocated up front (grows by doubling)
+SPEED_HISTORY_LEN = 10  # Per-track speed samples kept in the history ring
+
+# Appearance-aware association (only when update() is given embeddings)
+APPEARANCE_WEIGHT = 0.5 # Share of the matching cost from appearance (0 = distance only)
+DISTANCE_SCALE = 60.0   # Pixels of centroid distance that cost as much as a full appearance mismatch
+EMBEDDING_ALPHA = 0.3   # Moving-average weight of each new embedding in a track's cached one
+UNKNOWN_APPEARANCE = 0.5 # Appearance cost for tracks that have no embedding yet
+
+
+class TrackView(Mapping):
+    """
+    Read-only {objectID: centroid} view over the tracker's slot arrays.
+    Nothing is copied when the tracker returns it; entries are resolved lazily.
+    """
+    def __init__(self, tracker):
+        self._tracker = tracker
+
+    def __getitem__(self, objectID):
+        t = self._tracker
+        return t.centroids[t.slot_of[objectID]]
+
+    def __iter__(self):
+        t = self._tracker
+        return iter(t.ids[t.active_slots()].tolist())
+
+    def __len__(self):
+        return self._tracker.count
+
+    def __contains__(self, objectID):
+        return objectID in self._tracker.slot_of
+
 
 class CentroidTracker:
-    def __init__(self, max_disappeared=50):
-        # Initialize the next unique object ID along with two ordered
-        # dictionaries used to keep track of mapping a given object
-        # ID to its centroid and number of consecutive frames it has
-        # been marked as "disappeared", respectively
+    def __init__(self, max_disappeared=50, capacity=INITIAL_CAPACITY,
+                 speed_history=SPEED_HISTORY_LEN, appearance_weight=APPEARANCE_WEIGHT,
+                 distance_scale=DISTANCE_SCALE):
+        # Track state is kept as a struct of arrays indexed by "slot". A slot
+        # is reused once its object is deregistered, so steady-state updates
+        # never allocate per object.
         self.nextObjectID = 0
-        self.objects = OrderedDict()
-        self.disappeared = OrderedDict()
         self.max_disappeared = max_disappeared
+        self.speed_history = speed_history
+        self.appearance_weight = appearance_weight
+        self.distance_scale = distance_scale
+        self.embedding_dim = None # Set by the first update() that passes embeddings
+        self.count = 0
+
+        self._allocate(capacity)
+        self.free_slots = list(range(capacity - 1, -1, -1))
 
-    def register(self, centroid):
+        # objectID -> slot, only touched on register / deregister
+        self.slot_of = {}
+
+        # Global write column of the speed ring (all live tracks advance together)
+        self.hist_pos = 0
+
+        # Object IDs registered / deregistered by the last update() (track events
+        # for consumers such as trajectory.TrajectoryRecorder)
+        self.appeared = []
+        self.vanished = []
+
+        self.objects = TrackView(self)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.centroids = np.zeros((capacity, 2), dtype=np.int32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self.disappeared = np.zeros(capacity, dtype=np.int32)
+        self.speed_hist = np.zeros((capacity, self.speed_history), dtype=np.float32)
+        self.hist_count = np.zeros(capacity, dtype=np.int32)
+        # Cached appearance embedding per track (see appearance.py)
+        self.has_embedding = np.zeros(capacity, dtype=bool)
+        self.embeddings = None
+        if self.embedding_dim is not None:
+            self.embeddings = np.zeros((capacity, self.embedding_dim), dtype=np.float32)
+
+    def _arrays(self):
+        arrays = [self.ids, self.active, self.centroids, self.velocities,
+                  self.disappeared, self.speed_hist, self.hist_count, self.has_embedding]
+        if self.embeddings is not None:
+            arrays.append(self.embeddings)
+        return arrays
+
+    def _grow(self):
+        # Double every array; the only allocation on the hot path and it is
+        # amortised away once the tracker has seen its peak crowd size.
+        old = self._arrays()
+        old_capacity = self.capacity
+        self._allocate(old_capacity * 2)
+        for src, dst in zip(old, self._arrays()):
+            dst[:old_capacity] = src
+        self.free_slots = list(range(self.capacity - 1, old_capacity - 1, -1)) + self.free_slots
+
+    def register(self, centroid, embedding=None):
         # When registering an object we use the next available object
-        # ID to store the centroid
-        self.objects[self.nextObjectID] = centroid
-        self.disappeared[self.nextObjectID] = 0
+        # ID and the most recently freed slot to store the centroid
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+
+        self.ids[slot] = self.nextObjectID
+        self.active[slot] = True
+        self.centroids[slot] = centroid
+        self.velocities[slot] = 0
+        self.disappeared[slot] = 0
+        self.speed_hist[slot] = 0
+        self.hist_count[slot] = 0
+        self.has_embedding[slot] = embedding is not None
+        if embedding is not None:
+            self.embeddings[slot] = embedding
+
+        self.slot_of[self.nextObjectID] = slot
+        self.appeared.append(self.nextObjectID)
         self.nextObjectID += 1
+        self.count += 1
 
     def deregister(self, objectID):
-        # To deregister an object ID we delete the object ID from
-        # both of our respective dictionaries
-        del self.objects[objectID]
-        del self.disappeared[objectID]
+        # To deregister an object ID we release its slot for reuse
+        slot = self.slot_of.pop(objectID)
+        self.active[slot] = False
+        self.ids[slot] = -1
+        self.free_slots.append(slot)
+        self.vanished.append(objectID)
+        self.count -= 1
+
+    def _expire(self, slots):
+        # deregister every slot that has been missing for too long
+        for slot in slots[self.disappeared[slots] > self.max_disappeared]:
+            self.deregister(int(self.ids[slot]))
+
+    def update(self, rects, embeddings=None):
+        # embeddings, when given, holds one appearance vector per rect
+        # (AppearanceEncoder, computed on detection frames only); matching
+        # then weighs color similarity as well as distance.
+        if embeddings is not None:
+            self._enable_embeddings(embeddings.shape[1])
+        self.appeared = []
+        self.vanished = []
+
+        # remember where every live track was so velocities can be derived
+        # in one pass at the end of the update (kept in ID order so that
+        # matching ties resolve the same way regardless of slot reuse)
+        live = self.active_slots()
+        prev_centroids = self.centroids[live]
 
-    def update(self, rects):
         # check to see if the list of input bounding box rectangles
         # is empty
         if len(rects) == 0:
-            # loop over any existing tracked objects and mark them
-            # as disappeared
-            for objectID in list(self.disappeared.keys()):
-                self.disappeared[objectID] += 1
-
-                # if we have reached a maximum number of consecutive
-                # frames where a given object has been marked as
-                # missing, deregister it
-                if self.disappeared[objectID] > self.max_disappeared:
-                    self.deregister(objectID)
-
-            # return early as there are no centroids or tracking info
-            # to update
-            return self.objects
+            # mark every existing tracked object as disappeared and
+            # deregister those missing for too long
+            self.disappeared[live] += 1
+            self._record_motion(live, prev_centroids)
+            self._expire(live)
 
-        # initialize an array of input centroids for the current frame
-        inputCentroids = np.zeros((len(rects), 2), dtype="int")
+            # return early as there are no centroids to match
+            return self.objects
 
-        # loop over the bounding box rectangles
-        for (i, (startX, startY, endX, endY)) in enumerate(rects):
-            # use the bounding box coordinates to derive the centroid
-            cX = int((startX + endX) / 2.0)
-            cY = int((startY + endY) / 2.0)
-            inputCentroids[i] = (cX, cY)
+        # derive all input centroids from the bounding boxes at once
+        boxes = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        inputCentroids = (boxes[:, :2] + boxes[:, 2:]) // 2
 
         # if we are currently not tracking any objects, take the input
         # centroids and register each of them
-        if len(self.objects) == 0:
-            for i in range(0, len(inputCentroids)):
-                self.register(inputCentroids[i])
+        if len(live) == 0:
+            for i, centroid in enumerate(inputCentroids):
+                self.register(centroid, None if embeddings is None else embeddings[i])
+            return self.objects
+
+        # compute the distance between each pair of object centroids
+        # and input centroids, respectively -- our goal will be to match
+        # an input centroid to an existing object centroid
+        D = self.dist_euclidean(prev_centroids, inputCentroids)
+        if embeddings is not None:
+            D = self.association_cost(D, live, embeddings)
+
+        # greedy matching: rows ordered by their cheapest input centroid,
+        # each row paired with its cheapest column
+        rows = D.min(axis=1).argsort()
+        cols = D.argmin(axis=1)[rows]
+
+        usedRows = np.zeros(D.shape[0], dtype=bool)
+        usedCols = np.zeros(D.shape[1], dtype=bool)
+        matchRows = []
+        matchCols = []
+        for (row, col) in zip(rows.tolist(), cols.tolist()):
+            # if we have already examined either the row or
+            # column, ignore it
+            if usedRows[row] or usedCols[col]:
+                continue
+            usedRows[row] = True
+            usedCols[col] = True
+            matchRows.append(row)
+            matchCols.append(col)
+
+        # apply every match in one scatter: set the new centroid and
+        # reset the disappeared counter
+        matched = live[matchRows]
+        self.centroids[matched] = inputCentroids[matchCols]
+        self.disappeared[matched] = 0
+        if embeddings is not None:
+            self._refresh_embeddings(matched, embeddings[matchCols])
 
-        # otherwise, are are currently tracking objects so we need to
-        # try to match the input centroids to existing object centroids
+        self._record_motion(live, prev_centroids)
+
+        # in the event that the number of object centroids is equal or
+        # greater than the number of input centroids we need to check and
+        # see if some of these objects have potentially disappeared
+        if D.shape[0] >= D.shape[1]:
+            missing = live[~usedRows]
+            self.disappeared[missing] += 1
+            self._expire(missing)
+
+        # otherwise, if the number of input centroids is greater than the
+        # number of existing object centroids we need to register each
+        # new input centroid as a trackable object
         else:
-            # grab the set of object IDs and corresponding centroids
-            objectIDs = list(self.objects.keys())
-            objectCentroids = list(self.objects.values())
-
-            # compute the distance between each pair of object
-            # centroids and input centroids, respectively -- our
-            # goal will be to match an input centroid to an existing
-            # object centroid
-            D = self.dist_euclidean(np.array(objectCentroids), inputCentroids)
-
-            # in order to perform this matching we must (1) find the
-            # smallest value in each row and then (2) sort the row
-            # indexes based on their minimum values so that the row
-            # with the smallest value is at the *front* of the index
-            # list
-            rows = D.min(axis=1).argsort()
-
-            # next, we perform a similar process on the columns by
-            # finding the smallest value in each column and then
-            # sorting using the previously computed row index list
-            cols = D.argmin(axis=1)[rows]
-
-            # in order to keep track of which of the rows and
-            # column indexes we have already examined, we initialize
-            # two sets
-            usedRows = set()
-            usedCols = set()
-
-            # loop over the combination of the (row, column) index
-            # tuples
-            for (row, col) in zip(rows, cols):
-                # if we have already examined either the row or
-                # column, ignore it
-                if row in usedRows or col in usedCols:
-                    continue
-
-                # otherwise, grab the object ID for the current row,
-                # set its new centroid, and reset the disappeared
-                # counter
-                objectID = objectIDs[row]
-                self.objects[objectID] = inputCentroids[col]
-                self.disappeared[objectID] = 0
-
-                # indicate that we have examined each of the row and
-                # column indexes, respectively
-                usedRows.add(row)
-                usedCols.add(col)
-
-            # compute both the row and column indexes we have NOT
-            # yet examined
-            unusedRows = set(range(0, D.shape[0])) - usedRows
-            unusedCols = set(range(0, D.shape[1])) - usedCols
-
-            # in the event that the number of object centroids is
-            # equal or greater than the number of input centroids
-            # we need to check and see if some of these objects have
-            # potentially disappeared
-            if D.shape[0] >= D.shape[1]:
-                for row in unusedRows:
-                    objectID = objectIDs[row]
-                    self.disappeared[objectID] += 1
-
-                    if self.disappeared[objectID] > self.max_disappeared:
-                        self.deregister(objectID)
-
-            # otherwise, if the number of input centroids is greater
-            # than the number of existing object centroids we need to
-            # register each new input centroid as a trackable object
-            else:
-                for col in unusedCols:
-                    self.register(inputCentroids[col])
+            for col in np.flatnonzero(~usedCols):
+                self.register(inputCentroids[col], None if embeddings is None else embeddings[col])
 
         # return the set of trackable objects
         return self.objects
 
+    def _record_motion(self, slots, prev_centroids):
+        # velocity and speed of every track that existed before this update,
+        # written into the shared column of the speed ring
+        if len(slots):
+            self.velocities[slots] = self.centroids[slots] - prev_centroids
+            speeds = np.hypot(self.velocities[slots, 0], self.velocities[slots, 1])
+            self.speed_hist[slots, self.hist_pos] = speeds
+            self.hist_count[slots] = np.minimum(self.hist_count[slots] + 1, self.speed_history)
+        self.hist_pos = (self.hist_pos + 1) % self.speed_history
+
+    def _enable_embeddings(self, dim):
+        if self.embedding_dim is None:
+            self.embedding_dim = dim
+            self.embeddings = np.zeros((self.capacity, dim), dtype=np.float32)
+
+    def association_cost(self, D, live, embeddings):
+        """
+        Matching cost (live tracks x inputs): normalized centroid distance
+        blended with appearance distance to each track's cached embedding.
+        """
+        A = np.full(D.shape, UNKNOWN_APPEARANCE, dtype=np.float64)
+        known = self.has_embedding[live]
+        if known.any():
+            A[known] = appearance_distance(self.embeddings[live[known]], embeddings)
+        w = self.appearance_weight
+        return (1.0 - w) * D / self.distance_scale + w * A
+
+    def _refresh_embeddings(self, slots, new):
+        # moving average of the track's appearance, kept unit length; tracks
+        # seen for the first time take the new embedding as is
+        fresh = ~self.has_embedding[slots]
+        blended = (1.0 - EMBEDDING_ALPHA) * self.embeddings[slots] + EMBEDDING_ALPHA * new
+        blended[fresh] = new[fresh]
+        norms = np.linalg.norm(blended, axis=1, keepdims=True)
+        self.embeddings[slots] = blended / np.maximum(norms, 1e-6)
+        self.has_embedding[slots] = True
+
+    def active_slots(self):
+        """Slot indices of all live tracks, oldest object ID first."""
+        slots = np.flatnonzero(self.active)
+        return slots[np.argsort(self.ids[slots], kind="stable")]
+
+    def mean_speeds(self):
+        """
+        Smoothed speed (pixels/frame) of every live track with speed history.
+        Returns (slots, speeds) as arrays.
+        """
+        slots = np.flatnonzero(self.active & (self.hist_count > 0))
+        speeds = self.speed_hist[slots].sum(axis=1) / self.hist_count[slots]
+        return slots, speeds
+
     def dist_euclidean(self, A, B):
         # Compute the euclidean distance between each pair of points
         # A is a (N, 2) array, B is a (M, 2) array
         # Returns a (N, M) distance matrix
-        
+
         # Using cdist from scipy is standard but to avoid scipy dependency
         # we can do it with numpy
+        A = A.astype(np.float64)
+        B = B.astype(np.float64)
         P = np.add.outer(np.sum(A**2, axis=1), np.sum(B**2, axis=1))
         N = np.dot(A, B.T)
-        return np.sqrt(P - 2*N)
+        return np.sqrt(np.maximum(P - 2*N, 0))
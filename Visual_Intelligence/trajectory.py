@@ -0,0 +1,269 @@
+"""
+Compact trajectory archive for CentroidTracker output.
+
+Writing: TrajectoryRecorder.record(tracker, timestamp) after every tracker
+update. A position is stored when a track appears, whenever its quantized
+centroid moves, and when it disappears (closing the track). Each chunk also
+starts with a keyframe point for every live track, so people standing still
+stay findable in any window. Every CHUNK_SECONDS the buffered points are
+written as one chunk file:
+
+    header | segment table | zlib payload per segment
+
+One segment is one track's points inside the chunk: the first point is kept
+absolute in the table entry, the rest as (dt ms, dx, dy) int16 deltas. The
+table also holds each segment's time span (to the end of the chunk for tracks
+still live) and bounding box, and index.bin (one fixed-size record per chunk)
+holds each chunk's time span.
+
+Reading: TrajectoryArchive(directory).query(t0, t1, region) opens only chunks
+overlapping the window, reads only their segment tables, and decompresses
+only segments whose time span and bounding box can match.
+"""
+import os
+import time
+import zlib
+import numpy as np
+
+# --- CONFIGURATION ---
+ARCHIVE_DIR = "trajectories"
+CHUNK_SECONDS = 60.0    # One chunk file per minute of footage (max 65: time deltas are uint16 ms)
+POSITION_QUANT = 2      # Pixels per stored position unit
+COMPRESS_LEVEL = 6
+MAGIC = b"CLTR"
+VERSION = 1
+INDEX_FILE = "index.bin"
+
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u2"), ("quant", "<u2"),
+                         ("session", "<f8"), ("t_start", "<f8"), ("t_end", "<f8"),
+                         ("n_segments", "<u4")])
+SEGMENT_DTYPE = np.dtype([("track_id", "<i8"), ("t_start", "<f8"), ("t_end", "<f8"),
+                          ("x0", "<u2"), ("y0", "<u2"),
+                          ("x_min", "<u2"), ("y_min", "<u2"), ("x_max", "<u2"), ("y_max", "<u2"),
+                          ("n", "<u4"), ("offset", "<u8"), ("size", "<u4"), ("closed", "u1")])
+ROW_DTYPE = np.dtype([("dt", "<u2"), ("dx", "<i2"), ("dy", "<i2")])
+INDEX_DTYPE = np.dtype([("t_start", "<f8"), ("t_end", "<f8"), ("session", "<f8"),
+                        ("n_segments", "<u4"), ("name", "S40")])
+
+
+class TrajectoryRecorder:
+    """Turns tracker updates into appear / move / disappear points and writes chunks."""
+    def __init__(self, directory=ARCHIVE_DIR, chunk_seconds=CHUNK_SECONDS, quant=POSITION_QUANT):
+        self.directory = directory
+        self.chunk_seconds = chunk_seconds
+        self.quant = quant
+        self.session = time.time() # Track IDs restart per process; (session, track_id) is unique
+        os.makedirs(directory, exist_ok=True)
+
+        self.last_q = np.full((0, 2), -1, dtype=np.int32) # Last stored position per tracker slot
+        self.slot_ids = np.full(0, -1, dtype=np.int64)      # Track stored last in each slot
+        self.times = []         # Buffered points of the open chunk, one array set per update
+        self.ids = []
+        self.points = []
+        self.ended = {}         # track_id -> disappear time within the open chunk
+        self.chunk_start = None
+        self.last_time = None   # Latest update recorded in the open chunk
+
+    def record(self, tracker, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        if len(self.last_q) < tracker.capacity:
+            grown = np.full((tracker.capacity, 2), -1, dtype=np.int32)
+            grown[:len(self.last_q)] = self.last_q
+            self.last_q = grown
+            grown_ids = np.full(tracker.capacity, -1, dtype=np.int64)
+            grown_ids[:len(self.slot_ids)] = self.slot_ids
+            self.slot_ids = grown_ids
+
+        # Disappearances close the track with its last stored position (before any
+        # chunk switch, so the track ends in the chunk that holds its points)
+        for object_id in tracker.vanished:
+            slot = np.flatnonzero(self.slot_ids == object_id)
+            if len(slot):
+                self._add(timestamp, np.array([object_id]), self.last_q[slot[:1]])
+                self.slot_ids[slot] = -1
+            self.ended[object_id] = timestamp
+
+        if self.chunk_start is None or timestamp - self.chunk_start >= self.chunk_seconds:
+            if self.chunk_start is not None:
+                self.flush()
+            self.chunk_start = timestamp
+            self.last_q[:] = -1 # Keyframe: every live track gets a point in the new chunk
+
+        # New tracks always get a first point, even in a slot freed this update
+        for object_id in tracker.appeared:
+            slot = tracker.slot_of.get(object_id)
+            if slot is not None:
+                self.last_q[slot] = -1
+
+        slots = tracker.active_slots()
+        q = tracker.centroids[slots] // self.quant
+        moved = (q != self.last_q[slots]).any(axis=1)
+        if moved.any():
+            slots = slots[moved]
+            self.last_q[slots] = q[moved]
+            self.slot_ids[slots] = tracker.ids[slots]
+            self._add(timestamp, tracker.ids[slots].copy(), q[moved])
+        self.last_time = timestamp
+
+    def _add(self, timestamp, ids, q):
+        self.times.append(np.full(len(ids), timestamp, dtype=np.float64))
+        self.ids.append(ids)
+        self.points.append(q)
+
+    def flush(self):
+        """Writes the buffered chunk (if any) and records it in the time index."""
+        if not self.times and not self.ended:
+            return None
+        t = np.concatenate(self.times) if self.times else np.zeros(0)
+        ids = np.concatenate(self.ids) if self.ids else np.zeros(0, dtype=np.int64)
+        q = np.concatenate(self.points) if self.points else np.zeros((0, 2), dtype=np.int32)
+        ended = self.ended
+        self.times, self.ids, self.points, self.ended = [], [], [], {}
+        if not len(t):
+            return None
+        # Tracks still live at the end of the chunk span all of it (they continue in the next)
+        t_start = float(t.min())
+        t_end = float(max(t.max(), self.last_time or 0.0))
+
+        # Group by track, time ordered
+        order = np.lexsort((t, ids))
+        t, ids, q = t[order], ids[order], q[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+        ends = np.append(starts[1:], len(ids))
+
+        # Deltas for all rows at once; each segment's first row is stored absolute in its table entry
+        rows = np.zeros(len(t), dtype=ROW_DTYPE)
+        rows["dt"][1:] = np.clip(np.round(np.diff(t) * 1000), 0, 65535)
+        rows["dx"][1:] = np.diff(q[:, 0])
+        rows["dy"][1:] = np.diff(q[:, 1])
+
+        table = np.zeros(len(starts), dtype=SEGMENT_DTYPE)
+        payloads = []
+        offset = 0
+        for i, (a, b) in enumerate(zip(starts.tolist(), ends.tolist())):
+            track_id = int(ids[a])
+            blob = zlib.compress(rows[a + 1:b].tobytes(), COMPRESS_LEVEL)
+            seg = q[a:b]
+            table[i] = (track_id, t[a], ended.get(track_id, t_end), seg[0, 0], seg[0, 1],
+                        seg[:, 0].min(), seg[:, 1].min(), seg[:, 0].max(), seg[:, 1].max(),
+                        b - a, offset, len(blob), track_id in ended)
+            payloads.append(blob)
+            offset += len(blob)
+
+        name = f"traj_{int(self.session)}_{t_start:.3f}.bin"
+        header = np.array([(MAGIC, VERSION, self.quant, self.session, t_start, t_end, len(table))],
+                          dtype=HEADER_DTYPE)
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(header.tobytes())
+            f.write(table.tobytes())
+            for blob in payloads:
+                f.write(blob)
+
+        entry = np.array([(t_start, t_end, self.session, len(table), name)], dtype=INDEX_DTYPE)
+        with open(os.path.join(self.directory, INDEX_FILE), "ab") as f:
+            f.write(entry.tobytes())
+        return name
+
+    def close(self):
+        self.flush()
+
+
+class TrajectoryArchive:
+    """Read side: time-window / region queries over a recorder's directory."""
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+
+    def chunks(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        return np.fromfile(path, dtype=INDEX_DTYPE)
+
+    def query(self, t0, t1, region=None):
+        """
+        Trajectories with points between t0 and t1 (epoch seconds) that pass
+        through region ((x1, y1, x2, y2) display pixels, None = anywhere).
+        Returns [{session, track_id, t, xy, closed}] with every point of the
+        track inside the window, so you can see where people came from. A track
+        already present at t0 starts with its last known position, stamped t0.
+        """
+        index = self.chunks()
+        names = [e["name"].decode() for e in index[(index["t_end"] >= t0) & (index["t_start"] <= t1)]]
+
+        # Pass 1: segments whose bounding box can touch the region
+        found = {}
+        for name in names:
+            self._read_chunk(name, t0, t1, found, region=region)
+        if region is not None:
+            hits = {key for key, parts in found.items()
+                    if any(_in_rect(_window(t, xy, t0, t1)[1], region).any() for t, xy, _, _ in parts)}
+            found = {key: found[key] for key in hits}
+            # Pass 2: the rest of those tracks (outside the region, possibly other chunks)
+            for name in names:
+                self._read_chunk(name, t0, t1, found, tracks=hits)
+
+        results = []
+        for (session, track_id), parts in sorted(found.items()):
+            t = np.concatenate([p[0] for p in parts])
+            xy = np.concatenate([p[1] for p in parts])
+            order = np.argsort(t, kind="stable")
+            t, xy = _window(t[order], xy[order], t0, t1)
+            if not len(t):
+                continue
+            results.append({"session": session, "track_id": track_id, "t": t, "xy": xy,
+                            "closed": any(p[2] for p in parts)})
+        return results
+
+    def _read_chunk(self, name, t0, t1, found, region=None, tracks=None):
+        """Decodes the matching segments of one chunk into found[(session, track_id)]."""
+        with open(os.path.join(self.directory, name), "rb") as f:
+            header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+            if header["magic"] != MAGIC:
+                print(f"Trajectory Archive: skipping {name} (not a trajectory chunk)")
+                return
+            n = int(header["n_segments"])
+            table = np.frombuffer(f.read(n * SEGMENT_DTYPE.itemsize), dtype=SEGMENT_DTYPE)
+            payload_start = HEADER_DTYPE.itemsize + n * SEGMENT_DTYPE.itemsize
+            quant = int(header["quant"])
+            session = float(header["session"])
+
+            # Prune on the table alone: time overlap, then bounding box vs region
+            mask = (table["t_end"] >= t0) & (table["t_start"] <= t1)
+            if region is not None:
+                x1, y1, x2, y2 = (v / quant for v in region)
+                mask &= (table["x_max"] >= x1) & (table["x_min"] <= x2) & \
+                        (table["y_max"] >= y1) & (table["y_min"] <= y2)
+
+            for i in np.flatnonzero(mask):
+                seg = table[i]
+                key = (session, int(seg["track_id"]))
+                if tracks is not None:
+                    # Second pass: only wanted tracks, and not segments decoded already
+                    if key not in tracks or any(p[3] == (name, i) for p in found[key]):
+                        continue
+                f.seek(payload_start + int(seg["offset"]))
+                rows = np.frombuffer(zlib.decompress(f.read(int(seg["size"]))), dtype=ROW_DTYPE)
+                t = seg["t_start"] + np.concatenate(([0], np.cumsum(rows["dt"], dtype=np.int64))) / 1000.0
+                x = int(seg["x0"]) + np.concatenate(([0], np.cumsum(rows["dx"], dtype=np.int64)))
+                y = int(seg["y0"]) + np.concatenate(([0], np.cumsum(rows["dy"], dtype=np.int64)))
+                xy = np.stack((x, y), axis=1).astype(np.float32) * quant
+                found.setdefault(key, []).append((t, xy, bool(seg["closed"]), (name, i)))
+
+
+def _window(t, xy, t0, t1):
+    """
+    Points of one (time-sorted) track between t0 and t1. Positions are only stored
+    on change, so the last point before t0 is carried forward to t0.
+    """
+    first = np.searchsorted(t, t0, side="left")
+    last = np.searchsorted(t, t1, side="right")
+    if first > 0 and (first == len(t) or t[first] > t0):
+        first -= 1
+        t = t.copy()
+        t[first] = t0
+    return t[first:last], xy[first:last]
+
+
+def _in_rect(xy, region):
+    x1, y1, x2, y2 = region
+    return (xy[:, 0] >= x1) & (xy[:, 0] <= x2) & (xy[:, 1] >= y1) & (xy[:, 1] <= y2)
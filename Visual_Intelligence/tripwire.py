@@ -0,0 +1,159 @@
+import cv2
+import json
+import time
+import numpy as np
+import urllib.error
+import urllib.request
+from threading import Thread, Lock, Event
+
+# --- CONFIGURATION ---
+BACKEND_URL = "http://127.0.0.1:5000/api/venue_counts" # RFID dashboard backend
+POST_INTERVAL = 5.0     # Seconds between batched posts
+POST_TIMEOUT = 2.0
+
+
+class Gate:
+    """
+    Virtual line from p1 to p2 in display pixels (y pointing down).
+    Crossing onto the side where (p2 - p1) x (c - p1) > 0, i.e. the side p1 -> p2
+    turns to when rotated clockwise on screen, is an entry; the opposite direction
+    is an exit. A gate from (320, 0) to (320, 480) therefore counts right-to-left
+    movement as entries. Swap p1/p2 to flip it.
+    """
+    def __init__(self, name, p1, p2, venue_id=None):
+        self.name = name
+        self.p1 = tuple(int(v) for v in p1)
+        self.p2 = tuple(int(v) for v in p2)
+        self.venue_id = venue_id
+
+
+def _cross(o, a, b):
+    """z of (a - o) x (b - o), broadcast over leading axes."""
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+class TripwireCounter:
+    """
+    Entry/exit counting on virtual gates from CentroidTracker output.
+
+    Every frame, each live track contributes the segment from its previous
+    centroid (centroid - velocity) to its current one. All tracks are tested
+    against all gates at once with a (gates x tracks) segment-intersection test,
+    so there is no Python loop over people.
+    """
+    def __init__(self, gates):
+        self.gates = [g if isinstance(g, Gate) else Gate(**g) for g in gates]
+        self.a = np.array([g.p1 for g in self.gates], dtype=np.float32).reshape(-1, 1, 2)
+        self.b = np.array([g.p2 for g in self.gates], dtype=np.float32).reshape(-1, 1, 2)
+        n = len(self.gates)
+        self.entries = np.zeros(n, dtype=np.int64)    # Totals since start
+        self.exits = np.zeros(n, dtype=np.int64)
+        self.pending_entries = np.zeros(n, dtype=np.int64) # Not yet posted to the backend
+        self.pending_exits = np.zeros(n, dtype=np.int64)
+        self.lock = Lock()
+
+    def update(self, tracker):
+        """Counts this frame's crossings. Returns (entries, exits) per gate for the frame."""
+        slots = tracker.active_slots()
+        if not len(self.gates) or not len(slots):
+            return np.zeros(len(self.gates), int), np.zeros(len(self.gates), int)
+
+        cur = tracker.centroids[slots].astype(np.float32)[None]     # (1, N, 2)
+        prev = cur - tracker.velocities[slots][None]
+
+        # Side of each gate line before / after the move, and side of the track
+        # segment for each gate end: the segments cross when both pairs differ.
+        # Sides are half-open (on the line counts as left) so a centroid landing
+        # exactly on the line is still counted once.
+        right_prev = _cross(self.a, self.b, prev) > 0               # (G, N)
+        right_cur = _cross(self.a, self.b, cur) > 0
+        straddles = (_cross(prev, cur, self.a) > 0) != (_cross(prev, cur, self.b) > 0)
+        crossed = (right_prev != right_cur) & straddles
+
+        entered = (crossed & right_cur).sum(axis=1)
+        exited = (crossed & ~right_cur).sum(axis=1)
+        with self.lock:
+            self.entries += entered
+            self.exits += exited
+            self.pending_entries += entered
+            self.pending_exits += exited
+        return entered, exited
+
+    def take_pending(self):
+        """Per-gate counts not yet reported, and resets them."""
+        with self.lock:
+            batch = [{"gate": g.name, "venue_id": g.venue_id, "entries": int(e), "exits": int(x)}
+                     for g, e, x in zip(self.gates, self.pending_entries, self.pending_exits) if e or x]
+            self.pending_entries[:] = 0
+            self.pending_exits[:] = 0
+        return batch
+
+    def restore_pending(self, batch):
+        """Puts back counts whose post failed so they go out with the next batch."""
+        index = {g.name: i for i, g in enumerate(self.gates)}
+        with self.lock:
+            for item in batch:
+                i = index[item["gate"]]
+                self.pending_entries[i] += item["entries"]
+                self.pending_exits[i] += item["exits"]
+
+    def summary(self):
+        return [{"name": g.name, "entries": int(e), "exits": int(x), "net": int(e - x)}
+                for g, e, x in zip(self.gates, self.entries, self.exits)]
+
+    def overlay(self, frame, color=(255, 0, 255)):
+        for g, e, x in zip(self.gates, self.entries, self.exits):
+            cv2.line(frame, g.p1, g.p2, color, 2)
+            cv2.putText(frame, f"{g.name} in:{e} out:{x}", (g.p1[0] + 4, g.p1[1] - 6),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, color, 1)
+        return frame
+
+
+class TripwireReporter:
+    """Posts batched gate counts to the RFID backend (/api/venue_counts) every POST_INTERVAL."""
+    def __init__(self, counter, camera_id=0, url=BACKEND_URL, interval=POST_INTERVAL):
+        self.counter = counter
+        self.camera_id = camera_id
+        self.url = url
+        self.interval = interval
+        self.stop_event = Event()
+        self.thread = None
+        self.posts_failed = 0
+
+    def start(self):
+        self.thread = Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        batch = self.counter.take_pending()
+        if not batch:
+            return True
+        body = json.dumps({"camera": self.camera_id, "time": time.time(), "counts": batch}).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=POST_TIMEOUT) as resp:
+                resp.read()
+            return True
+        except OSError as e:
+            if isinstance(e, urllib.error.HTTPError) and 400 <= e.code < 500:
+                # Rejected batch (e.g. a venue_id the backend does not know): resending
+                # it would fail forever and hold back every later count
+                print(f"Tripwire Post Rejected ({e.code}): {e.read().decode('utf-8', 'replace').strip()}")
+                return False
+            # Backend down: keep the counts for the next attempt
+            self.posts_failed += 1
+            self.counter.restore_pending(batch)
+            if self.posts_failed == 1 or self.posts_failed % 60 == 0:
+                print(f"Tripwire Post Error: {e}")
+            return False
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+        self.flush()
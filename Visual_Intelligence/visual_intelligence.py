@@ -6,6 +6,10 @@ import time
 import numpy as np
 from detector import HumanDetector
 from tracker import CentroidTracker
+from crowd_analyzer import CrowdAnalyzer
+from capture import ThreadedCamera
+from autotune import AutoTuner
+from feed import RemoteCameraSystem
 import sys
 
 # --- CONFIGURATION ---
@@ -21,10 +25,208 @@ THREAT_CRITICAL = 2
 
 # Analysis Tuning
 SPEED_HISTORY_LEN = 10
-CHAOS_THRESHOLD_WARNING = 15.0  # Avg pixel movement needed for warning
-CHAOS_THRESHOLD_CRITICAL = 30.0 # Avg pixel movement needed for critical
+CHAOS_THRESHOLD_WARNING = 15.0  # Avg pixel movement (over all tracked people) needed for warning
+CHAOS_THRESHOLD_CRITICAL = 30.0 # Avg pixel movement (over all tracked people) needed for critical
 DENSITY_THRESHOLD_WARNING = 8   # Number of people
 DENSITY_THRESHOLD_CRITICAL = 15
+MOVING_THRESHOLD = 2.0          # Avg pixel movement that counts as "moving"
+
+THREAT_COLORS = {
+    "NORMAL": "green",
+    "WARNING": "#ffff33",   # Yellow
+    "CRITICAL": "#ff3333"   # Bright Red
+}
+
+UI_POLL_MS = 15         # Tk checks for a new frame this often; it never waits on the model
+DISPLAY_BUFFERS = 3     # Reused display-size frame buffers between worker and UI
+
+# Detection (yolov8n on every frame unless auto-tuned)
+DETECT_INTERVAL = 1     # Detect every Nth frame, track in between
+# Latency budget: with AUTOTUNE on, model tier (n/s/m), inference size and detection
+# interval are stepped along autotune.QUALITY_LADDER to hold the p95 latency from capture
+# to display-ready frame under LATENCY_BUDGET_MS. All tiers are preloaded at startup.
+AUTOTUNE = False
+LATENCY_BUDGET_MS = 150
+
+
+def draw_hud(frame, rects, tracker, threat):
+    """Boxes, movement vectors and LIVE marker, drawn onto frame in place."""
+    # Box Color based on threat
+    color = (0, 255, 0) # BGR
+    if threat == "WARNING": color = (0, 255, 255)
+    if threat == "CRITICAL": color = (0, 0, 255)
+
+    for (x1, y1, x2, y2) in rects:
+        # Use corner brackets or thin lines for "Professional"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+
+    # Draw "HUD" lines or tracking vectors
+    for slot in tracker.active_slots():
+        cx, cy = tracker.centroids[slot]
+        vx, vy = tracker.velocities[slot]
+        # Draw small movement vector
+        cv2.line(frame, (int(cx - vx), int(cy - vy)), (int(cx), int(cy)), (0, 255, 255), 2)
+        cv2.circle(frame, (int(cx), int(cy)), 3, (0, 0, 255), -1)
+
+    # Maybe just a "REC" indicator or "LIVE"
+    cv2.circle(frame, (30, 30), 5, (0, 0, 255), -1)
+    cv2.putText(frame, "LIVE", (45, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
+    return frame
+
+
+def fit_size(w, h, max_w, max_h):
+    """Largest (w, h) with the same aspect ratio that fits in max_w x max_h."""
+    ratio = min(max_w / w, max_h / h)
+    return max(1, int(w * ratio)), max(1, int(h * ratio))
+
+
+class VisionWorker(threading.Thread):
+    """
+    Capture, detection, tracking, analysis and HUD drawing off the Tk thread.
+
+    Each processed frame is resized to the current display size and converted
+    to RGB into one of a few reused buffers; only the newest (seq, frame, status)
+    is kept, so the UI shows the latest result and never blocks on inference.
+    With AUTOTUNE, every frame's capture-to-publish latency is fed to an
+    AutoTuner that steps the model / image size / detect interval to stay in
+    budget (the UI adds at most UI_POLL_MS on top). Measured per processed
+    frame: a slow detection frame is often replaced before the UI polls, so
+    displayed frames alone would hide the inference cost.
+    """
+    def __init__(self, camera_index=0):
+        super().__init__(daemon=True)
+        self.camera_index = camera_index
+        self.requested_camera = camera_index
+        self.display_size = None # (w, h) of the video label, set by the UI
+        self.stream = None
+        self.detector = None
+        self.tracker = None
+        self.analyzer = None
+        self.autotuner = None
+        self.detect_interval = DETECT_INTERVAL
+        self.frame_counter = 0
+        self.last_rects = []
+
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.frame = None
+        self.status = None
+        self.error = None
+        self.loading = True
+
+        self.buffers = []
+        self.next_buffer = 0
+        self.running = True
+
+    def run(self):
+        try:
+            if AUTOTUNE:
+                # Preloads every tier and points self.detector / detect_interval at the first level
+                self.autotuner = AutoTuner(dict(confidence=0.35), budget_ms=LATENCY_BUDGET_MS)
+                self.autotuner.apply(self)
+            else:
+                self.detector = HumanDetector(confidence=0.35)
+            self.tracker = CentroidTracker(max_disappeared=10, speed_history=SPEED_HISTORY_LEN)
+            self.analyzer = CrowdAnalyzer(surge_warning=CHAOS_THRESHOLD_WARNING,
+                                          surge_critical=CHAOS_THRESHOLD_CRITICAL,
+                                          density_warning=DENSITY_THRESHOLD_WARNING,
+                                          density_critical=DENSITY_THRESHOLD_CRITICAL,
+                                          moving_threshold=MOVING_THRESHOLD,
+                                          min_moving_people=1,
+                                          average_over="all")
+        except Exception as e:
+            print(f"Error init AI: {e}")
+            self.error = f"Critical Error: {e}"
+            return
+        self.loading = False
+
+        last_seq = 0
+        while self.running:
+            if self.requested_camera != self.camera_index or (self.stream is None and self.error is None):
+                self._open_camera(self.requested_camera)
+                last_seq = 0
+            if self.stream is None:
+                # Camera failed to open: wait for the operator to pick another one
+                time.sleep(0.1)
+                continue
+
+            packet = self.stream.read_next(last_seq, timeout=0.5)
+            if packet is None:
+                continue
+            last_seq = packet.seq
+            # The ring slot stays ours until the next read_next(), so draw on it directly
+            frame = packet.frame
+
+            # 1. Detection (every detect_interval-th frame) / 2. Tracking / 3. Analytics
+            self.frame_counter += 1
+            if self.frame_counter % self.detect_interval == 0:
+                self.last_rects = self.detector.detect(frame)
+            rects = self.last_rects
+            self.tracker.update(rects)
+            status = self.analyzer.analyze(self.tracker)
+            if self.autotuner:
+                status["autotune"] = self.autotuner.status()
+
+            # 4. Visualization
+            draw_hud(frame, rects, self.tracker, status["threat_level"])
+            display = self._to_display(frame)
+
+            with self.lock:
+                self.seq += 1
+                self.frame = display
+                self.status = status
+
+            # Level changes are applied here, between frames, on the worker thread
+            if self.autotuner and self.autotuner.observe(time.time() - packet.timestamp):
+                self.autotuner.apply(self)
+
+    def _open_camera(self, index):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+        self.camera_index = index
+        print(f"Opening camera {index}...")
+        stream = ThreadedCamera(index, 640, 480)
+        if not stream.grabbed:
+            print(f"Failed to open camera {index}")
+            self.error = f"Camera {index} failed to open."
+            stream.stop()
+            return
+        self.error = None
+        self.stream = stream.start()
+
+    def _to_display(self, frame):
+        """Resize (INTER_LINEAR, fast) + BGR->RGB into a reused buffer."""
+        h, w = frame.shape[:2]
+        size = fit_size(w, h, *self.display_size) if self.display_size else (w, h)
+        if not self.buffers or self.buffers[0].shape[:2] != (size[1], size[0]):
+            self.buffers = [np.empty((size[1], size[0], 3), dtype=np.uint8) for _ in range(DISPLAY_BUFFERS)]
+        buf = self.buffers[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % DISPLAY_BUFFERS
+
+        if size == (w, h):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buf)
+        else:
+            cv2.resize(frame, size, dst=buf, interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(buf, cv2.COLOR_BGR2RGB, dst=buf)
+        return buf
+
+    def latest(self, last_seq):
+        """(seq, frame_rgb, status) if newer than last_seq, else (last_seq, None, None)."""
+        with self.lock:
+            if self.seq == last_seq:
+                return last_seq, None, None
+            return self.seq, self.frame, self.status
+
+    def open_camera(self, index):
+        self.requested_camera = index
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=2.0)
+        if self.stream is not None:
+            self.stream.stop()
+
 
 class VisualIntelligenceApp(ctk.CTk):
     def __init__(self):
@@ -39,19 +241,16 @@ class VisualIntelligenceApp(ctk.CTk):
         # --- State ---
         self.running = True
         self.current_camera_index = 0
-        self.cap = None
-        self.detector = None
-        self.tracker = None
-        self.frame_count = 0
+        self.worker = None # Local VisionWorker when no headless service is running
+        self.feed = None # Subscription to the headless service (service.py), if running
+        self.last_seq = 0
+        self.photo = None # Reused Tk image; frames are pasted into it
         
         # Analysis State
-        self.object_speeds = {} # {objID: [speed1, speed2...]}
-        self.prev_centroids = {}
         self.current_threat = "NORMAL"
         self.threat_color = "green"
         self.current_reason = "System Initializing..."
         self.person_count = 0
-        self.chaos_metric = 0.0
 
         # --- Layout ---
         self.grid_columnconfigure(1, weight=1)
@@ -72,9 +271,7 @@ class VisualIntelligenceApp(ctk.CTk):
         self.video_label.pack(expand=True, fill="both", padx=10, pady=10)
 
         # --- Initialization ---
-        # --- Initialization ---
-        self.reason_text.delete("0.0", "end")
-        self.reason_text.insert("0.0", "LOADING MODEL...")
+        self.show_reason("LOADING MODEL...")
         self.update()
         
         # Load AI in background to not freeze UI
@@ -138,216 +335,104 @@ class VisualIntelligenceApp(ctk.CTk):
         self.footer_label.grid(row=9, column=0, padx=20, pady=10)
 
     def _init_ai(self):
+        # Prefer the shared headless service; only load a model here if it is not running
         try:
-            self.detector = HumanDetector(confidence=0.35)
-            self.tracker = CentroidTracker(max_disappeared=10)
-            self.start_camera(0)
-            self.update_video_loop()
-        except Exception as e:
-            print(f"Error init AI: {e}")
-            self.reason_text.delete("0.0", "end")
-            self.reason_text.insert("0.0", f"Critical Error: {e}")
+            self.feed = RemoteCameraSystem()
+            self.footer_label.configure(text="v1.0.0 | Visual Service Feed")
+            self.update_feed_loop()
+            return
+        except OSError:
+            self.feed = None
 
-    def start_camera(self, index):
-        if self.cap is not None:
-            self.cap.release()
-        
-        print(f"Opening camera {index}...")
-        self.cap = cv2.VideoCapture(index)
-        
-        # Set resolution to reasonable HD for performance
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        
-        if not self.cap.isOpened():
-            print(f"Failed to open camera {index}")
+        # Model loading, capture and inference all happen on the worker thread
+        self.worker = VisionWorker(self.current_camera_index)
+        self.worker.start()
+        self.update_video_loop()
+
+    def show_reason(self, text):
+        if text != self.current_reason:
+            self.current_reason = text
             self.reason_text.delete("0.0", "end")
-            self.reason_text.insert("0.0", f"Camera {index} failed to open.")
+            self.reason_text.insert("0.0", text)
 
     def change_camera(self, selection):
         idx = 0
         if "Camera 1" in selection:
             idx = 1
         self.current_camera_index = idx
-        self.start_camera(idx)
+        if self.feed:
+            self.feed.open_camera(idx)
+        elif self.worker:
+            self.worker.open_camera(idx)
 
     def update_video_loop(self):
-        start_time = time.time()
-        
-        if self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if ret:
-                # 1. Detection
-                rects = self.detector.detect(frame)
-                
-                # 2. Tracking
-                objects = self.tracker.update(rects)
-                
-                # 3. Analytics
-                self.analyze_crowd(objects)
-                
-                # 4. Visualization
-                frame = self.draw_hud(frame, rects, objects)
-                
-                # 5. Convert to Tkinter Image
-                # Convert BGR to RGB
-                img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                # Resize to fit the label if needed (keep aspect ratio)
-                # But for now let's just use the frame size or stretch slightly
-                # To make it look "Matte" and fit, we usually resize to container.
-                # Just using simple resize for performance/simplicity in this step.
-                
-                display_h = self.video_label.winfo_height()
-                display_w = self.video_label.winfo_width()
-                
-                # Simple aspect ratio keep
-                if display_w > 10 and display_h > 10:
-                    img_pil = Image.fromarray(img_rgb)
-                    # Resize nicely
-                    img_pil = self._resize_image_keep_aspect(img_pil, display_w, display_h)
-                    ctk_img = ctk.CTkImage(light_image=img_pil, dark_image=img_pil, size=img_pil.size)
-                    self.video_label.configure(image=ctk_img)
-                    self.video_label.image = ctk_img # Keep ref
-
-        # Schedule next update (aim for ~30 FPS -> 33ms, but process takes time)
-        # Adaptive delay
-        elapsed = time.time() - start_time
-        delay = max(5, int(33 - (elapsed * 1000)))
-        self.after(delay, self.update_video_loop)
-
-    def _resize_image_keep_aspect(self, img, max_w, max_h):
-        w, h = img.size
-        ratio = min(max_w/w, max_h/h)
-        new_w = max(1, int(w * ratio))
-        new_h = max(1, int(h * ratio))
-        return img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-    def analyze_crowd(self, objects):
-        # objects is {ID: (centerX, centerY)}
-        
-        total_speed = 0
-        count = len(objects)
-        moving_people = 0
-        
-        current_ids = list(objects.keys())
-        
-        # Calculate speeds
-        for obj_id, centroid in objects.items():
-            if obj_id in self.prev_centroids:
-                prev_c = self.prev_centroids[obj_id]
-                dist = np.linalg.norm(np.array(centroid) - np.array(prev_c))
-                
-                # Update speed history
-                if obj_id not in self.object_speeds:
-                    self.object_speeds[obj_id] = []
-                self.object_speeds[obj_id].append(dist)
-                if len(self.object_speeds[obj_id]) > SPEED_HISTORY_LEN:
-                    self.object_speeds[obj_id].pop(0)
-                    
-                # Smooth speed
-                avg_speed = np.mean(self.object_speeds[obj_id])
-                total_speed += avg_speed
-                if avg_speed > 2.0: # threshold for "moving"
-                    moving_people += 1
-            
-            # Store current as prev for next frame
-            self.prev_centroids[obj_id] = centroid
-
-        # Cleanup old IDs
-        for old_id in list(self.prev_centroids.keys()):
-            if old_id not in current_ids:
-                del self.prev_centroids[old_id]
-                if old_id in self.object_speeds:
-                    del self.object_speeds[old_id]
-
-        # Metric Logic
-        avg_crowd_speed = total_speed / count if count > 0 else 0
-        self.chaos_metric = avg_crowd_speed # Use speed as chaos proxy for now
-        self.person_count = count
-        
-        # --- Threat Classification ---
-        # Heuristics:
-        # 1. High Density + Any Movement -> WARNING
-        # 2. High Speed (Surge) -> CRITICAL
-        # 3. Very High Density -> WARNING/CRITICAL
-        
-        status = "NORMAL"
-        color = "green"
-        reason = "Stable Conditions"
-        
-        # Chaos Progress Bar (Scale 0-50 pixels avg speed)
-        norm_chaos = min(avg_crowd_speed / 20.0, 1.0) 
-        self.chaos_progress.set(norm_chaos)
-        
-        # Logic
-        if avg_crowd_speed > CHAOS_THRESHOLD_CRITICAL:
-            status = "CRITICAL"
-            color = "#ff3333" # Bright Red
-            reason = "CRITICAL: Detected sudden crowd surge/panic!"
-        
-        elif avg_crowd_speed > CHAOS_THRESHOLD_WARNING:
-            status = "WARNING"
-            color = "#ffff33" # Yellow
-            reason = "WARNING: Increasing crowd movement speed."
-            
-        elif count > DENSITY_THRESHOLD_CRITICAL:
-            status = "CRITICAL"
-            color = "#ff3333"
-            reason = "CRITICAL: Extreme overcrowding detected."
-            
-        elif count > DENSITY_THRESHOLD_WARNING:
-            if status != "CRITICAL": # Don't downgrade
-                status = "WARNING"
-                color = "#ffff33"
-                reason = "WARNING: Crowd density is high."
-        
-        self.current_threat = status
-        self.threat_color = color
-        self.current_reason = reason
-        
-        # Update Sidebar
-        self.threat_val_label.configure(text=status, text_color=color)
-        self.reason_text.delete("0.0", "end")
-        self.reason_text.insert("0.0", reason)
-        self.count_label.configure(text=f"Person Count: {count}")
-
-    def draw_hud(self, frame, rects, objects):
-        # Draw bounding boxes (subtle)
-        # Use simple CV2 drawing on the frame
-        
-        overlay = frame.copy()
-        
-        for (x1, y1, x2, y2) in rects:
-            # Box Color based on threat
-            color = (0, 255, 0) # BGR
-            if self.current_threat == "WARNING": color = (0, 255, 255)
-            if self.current_threat == "CRITICAL": color = (0, 0, 255)
-            
-            # Use corner brackets or thin lines for "Professional"
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Optional: Add ID
-            # Find closest centroid (skip for performance clean look)
-
-        # Draw "HUD" lines or tracking vectors
-        for obj_id, centroid in objects.items():
-            if obj_id in self.prev_centroids:
-                prev = self.prev_centroids[obj_id]
-                # Draw small movement vector
-                cv2.line(frame, (prev[0], prev[1]), (centroid[0], centroid[1]), (0, 255, 255), 2)
-                cv2.circle(frame, (centroid[0], centroid[1]), 3, (0, 0, 255), -1)
-
-        # Add timestamp/fps? Clean dashboard has that info on side.
-        # Maybe just a "REC" indicator or "LIVE"
-        cv2.circle(frame, (30, 30), 5, (0, 0, 255), -1)
-        cv2.putText(frame, "LIVE", (45, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,255), 1)
-
-        return frame
+        # Display only: the worker has already processed, resized and converted the frame
+        if not self.running:
+            return
+        self.worker.display_size = (self.video_label.winfo_width(), self.video_label.winfo_height())
+
+        seq, frame_rgb, status = self.worker.latest(self.last_seq)
+        if frame_rgb is not None:
+            self.last_seq = seq
+            self.show_status(status)
+            self.show_frame(frame_rgb)
+        elif self.worker.error:
+            self.show_reason(self.worker.error)
+        elif self.worker.loading:
+            self.show_reason("LOADING MODEL...")
+
+        self.after(UI_POLL_MS, self.update_video_loop)
+
+    def update_feed_loop(self):
+        # Thin subscriber: the service does capture, detection and analysis
+        frame_rgb, status = self.feed.read_processed_frame(timeout=0)
+        if frame_rgb is not None:
+            self.show_status(status)
+            self.show_frame(frame_rgb)
+        elif not self.feed.connected:
+            self.show_reason("Visual service disconnected.")
+            return
+        self.after(UI_POLL_MS, self.update_feed_loop)
+
+    def show_frame(self, img_rgb):
+        # Resize to fit the label (keep aspect ratio)
+        display_h = self.video_label.winfo_height()
+        display_w = self.video_label.winfo_width()
+        if display_w <= 10 or display_h <= 10:
+            return
+
+        h, w = img_rgb.shape[:2]
+        size = fit_size(w, h, display_w, display_h)
+        if size != (w, h):
+            # Feed frames arrive at source size; worker frames are already fitted
+            img_rgb = cv2.resize(img_rgb, size, interpolation=cv2.INTER_LINEAR)
+
+        img_pil = Image.fromarray(img_rgb)
+        if self.photo is None or (self.photo.width(), self.photo.height()) != img_pil.size:
+            # New Tk image only when the display size changes
+            self.photo = ImageTk.PhotoImage(img_pil)
+            self.video_label.configure(image=self.photo)
+        else:
+            self.photo.paste(img_pil)
+
+    def show_status(self, status):
+        threat = status["threat_level"]
+        self.current_threat = threat
+        self.threat_color = THREAT_COLORS.get(threat, "green")
+        self.person_count = status["person_count"]
+
+        # Chaos Progress Bar (0-100 scale from the analyzer)
+        self.chaos_progress.set(status["chaos_metric"] / 100.0)
+        self.threat_val_label.configure(text=threat, text_color=self.threat_color)
+        self.show_reason(status["reason"])
+        self.count_label.configure(text=f"Person Count: {self.person_count}")
 
     def on_close(self):
         self.running = False
-        if self.cap:
-            self.cap.release()
+        if self.feed:
+            self.feed.close()
+        if self.worker:
+            self.worker.stop()
         self.destroy()
 
 if __name__ == "__main__":